@@ -0,0 +1,528 @@
+"""
+Performance measurements for the OORMS system: model, controller and
+rendering hot paths, on the real floor and on large synthetic floors.
+Run from the command line:
+
+    python benchmarks.py --output results.json
+    python benchmarks.py --compare results.json --threshold 0.2
+
+Rendering benchmarks draw on a RecordingCanvas, which stands in for
+tk.Canvas; pass --tk to draw on a real canvas instead (this needs a
+display, e.g. Xvfb).
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import itertools
+import json
+import statistics
+import sys
+import threading
+import time
+import timeit
+import tracemalloc
+
+from constants import TABLES, MENU_ITEMS, RESTAURANT_SCALE, FLOOR_ZOOM_STEP, FLOOR_MIN_SCALE
+from controller import BillsController, FusionController, RestaurantController
+from headless import HeadlessView, RecordingPrinter
+from model import Restaurant, Order, OrderItem, Bill, move_item, split_item, split_bill
+
+
+class LegacyOrderItem:
+    """The string-state, __dict__-backed OrderItem, kept for comparison."""
+
+    def __init__(self, menu_item):
+        self.details = menu_item
+        self.state = "unordered"
+
+    def mark_as_ordered(self):
+        self.state = "ordered"
+
+    def has_been_ordered(self):
+        return self.state == "ordered"
+
+
+class LegacyOrder:
+    """The __dict__-backed Order, kept for comparison."""
+
+    def __init__(self, seat_number):
+        self.items = []
+        self.seat_number = seat_number
+
+
+class RecordingCanvas:
+    """
+    Stands in for tk.Canvas in the rendering benchmarks: it keeps the items
+    drawn and counts operations like oorms.CountingCanvas, without Tk.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.ops = 0
+        self.ids = itertools.count(1)
+
+    def create(self, kind, coords, options):
+        self.ops += 1
+        item_id = next(self.ids)
+        self.items[item_id] = [kind, list(coords), options]
+        return item_id
+
+    def create_rectangle(self, *coords, **options):
+        return self.create('rectangle', coords, options)
+
+    def create_oval(self, *coords, **options):
+        return self.create('oval', coords, options)
+
+    def create_text(self, *coords, **options):
+        return self.create('text', coords, options)
+
+    def delete(self, *item_ids):
+        self.ops += 1
+        for item_id in item_ids:
+            if item_id == 'all':
+                self.items.clear()
+            else:
+                self.items.pop(item_id, None)
+
+    def itemconfig(self, item_id, **options):
+        self.ops += 1
+        self.items[item_id][2].update(options)
+
+    def itemcget(self, item_id, option):
+        return self.items[item_id][2].get(option)
+
+    def coords(self, item_id, *coords):
+        if coords:
+            self.ops += 1
+            self.items[item_id][1] = list(coords)
+        return self.items[item_id][1]
+
+    def move(self, item_id, dx, dy):
+        self.ops += 1
+        for moved in (self.items if item_id == 'all' else [item_id]):
+            coords = self.items[moved][1]
+            self.items[moved][1] = [c + (dy if ix % 2 else dx) for ix, c in enumerate(coords)]
+
+    def tag_bind(self, item_id, sequence, func, add=None):
+        self.ops += 1
+
+    def bind(self, sequence=None, func=None, add=None):
+        pass
+
+    def unbind(self, sequence, funcid=None):
+        pass
+
+    def grid(self, **options):
+        pass
+
+
+def synthetic_floor(n_tables, seats_per_table):
+    """A grid of n_tables identical tables, spaced so that none overlap."""
+    rows = -(-seats_per_table // 2)
+    width, height = 250, rows * 50 + 30
+    columns = max(1, int(n_tables ** 0.5))
+    return [(seats_per_table, ((ix % columns) * width, (ix // columns) * height))
+            for ix in range(n_tables)]
+
+
+def synthetic_menu(n_items, categories=('Starters', 'Mains', 'Desserts', 'Drinks')):
+    """n_items (name, price, category) entries with distinct names."""
+    return [(f'Dish {ix}', 5 + ix % 30, categories[ix % len(categories)]) for ix in range(n_items)]
+
+
+FLOORS = {
+    'real': TABLES,
+    'hall': synthetic_floor(300, 12),
+    'banquet': synthetic_floor(4, 48),
+}
+
+
+def populated_restaurant(floor, items_per_seat=3, ordered=True):
+    restaurant = Restaurant(FLOORS[floor], MENU_ITEMS)
+    menu_items = restaurant.menu_items
+    for table in restaurant.tables:
+        for order in table.orders:
+            for ix in range(items_per_seat):
+                order.add_item(menu_items[(order.seat_number + ix) % len(menu_items)])
+            if ordered:
+                order.place_new_orders()
+    return restaurant
+
+
+def time_calls(run, setup=None, repeat=20, number=1):
+    """
+    Times run() number times in a row, repeat times, calling setup() (whose
+    result is passed to run) before each timed batch. Returns the median and
+    minimum seconds per call.
+    """
+    samples = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        for _ in range(number):
+            run(argument) if setup else run()
+        samples.append((time.perf_counter() - start) / number)
+    return {'median_s': statistics.median(samples), 'min_s': min(samples)}
+
+
+def bytes_per_object(factory, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def ns_per_call(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e9
+
+
+def bench_item_representation(count=100_000):
+    menu_item = Restaurant().menu_items[0]
+    legacy_item = LegacyOrderItem(menu_item)
+    legacy_item.mark_as_ordered()
+    item = OrderItem(menu_item)
+    item.mark_as_ordered()
+    return {
+        'legacy_order_item_bytes': bytes_per_object(lambda: LegacyOrderItem(menu_item), count),
+        'order_item_bytes': bytes_per_object(lambda: OrderItem(menu_item), count),
+        'legacy_order_bytes': bytes_per_object(lambda: LegacyOrder(0), count),
+        'order_bytes': bytes_per_object(lambda: Order(0), count),
+        'legacy_has_been_ordered_ns': ns_per_call(legacy_item.has_been_ordered, count),
+        'has_been_ordered_ns': ns_per_call(item.has_been_ordered, count),
+        'legacy_details_access_ns': ns_per_call(lambda: legacy_item.details, count),
+        'details_access_ns': ns_per_call(lambda: item.details, count),
+    }
+
+
+def bench_model(floor):
+    restaurant = populated_restaurant(floor)
+    table = max(restaurant.tables, key=lambda t: t.n_seats)
+    bill = Bill(None)
+    for order in table.orders:
+        bill.add_order(order)
+    tables = restaurant.tables
+    other = Bill(None)
+    item = table.orders[0].items[0]
+
+    def table_bill():
+        whole = Bill(None)
+        for order in table.orders:
+            whole.add_order(order)
+        return whole
+
+    def move_back_and_forth():
+        move_item(item, bill, other)
+        move_item(item, other, bill)
+
+    def split_and_rejoin():
+        split_item(item, bill, [bill, other, other])
+        move_item(item, other, bill)
+
+    return {
+        'Bill.update_items': time_calls(bill.update_items, number=10),
+        'move_item (there and back)': time_calls(move_back_and_forth, number=10),
+        'split_item (3 ways and back)': time_calls(split_and_rejoin, number=10),
+        'split_bill (whole table, 4 ways)': time_calls(lambda b: split_bill(b, 4), setup=table_bill),
+        'Table.has_any_active_orders (all tables)':
+            time_calls(lambda: [t.has_any_active_orders() for t in tables], number=10),
+        'Table.has_order_for (all seats)':
+            time_calls(lambda: [t.has_order_for(s) for t in tables for s in range(t.n_seats)], number=10),
+    }
+
+
+def bench_controllers(floor):
+    restaurant = populated_restaurant(floor)
+    view = HeadlessView(restaurant)
+    table = max(restaurant.tables, key=lambda t: t.n_seats)
+
+    def fusion_setup():
+        bills = BillsController(view, restaurant, table).bills
+        controller = FusionController(view, restaurant, table, bills)
+        view.set_controller(controller)
+        controller.create_ui()
+        controller.selected = set(range(0, table.n_seats, 2))
+        return controller
+
+    def merge(controller):
+        controller.merge_selected_orders(controller.selected, controller.bills)
+
+    return {
+        'BillsController.__init__': time_calls(lambda: BillsController(view, restaurant, table), number=5),
+        'FusionController.merge_selected_orders': time_calls(merge, fusion_setup),
+    }
+
+
+def offscreen_server_view(restaurant, canvas=None):
+    """
+    A ServerView that draws on canvas (a RecordingCanvas by default) without
+    a Tk root. Frame initialisation is skipped; the create_*_ui methods only
+    need the attributes set here.
+    """
+    from oorms import ServerView
+
+    view = ServerView.__new__(ServerView)
+    view.init_screens(restaurant)
+    view.canvas = canvas if canvas is not None else RecordingCanvas()
+    view.restaurant = restaurant
+    view.printer_window = RecordingPrinter()
+    view.controller = RestaurantController(view, restaurant)
+    return view
+
+
+def tk_server_view(restaurant):
+    import tkinter as tk
+    from oorms import ServerView
+
+    root = tk.Tk()
+    view = ServerView(root, restaurant, RecordingPrinter())
+    view.scheduler.request = view.redraw  # measure drawing, not the event loop
+    return view
+
+
+def bench_rendering(floor, use_tk=False):
+    restaurant = populated_restaurant(floor, ordered=False)
+    view = tk_server_view(restaurant) if use_tk else offscreen_server_view(restaurant)
+    table = max(restaurant.tables, key=lambda t: t.n_seats)
+    order = table.order_for(0)
+    menu_item = restaurant.menu_items[0]
+
+    def full(draw):
+        def run():
+            view.screen = None
+            draw()
+        return run
+
+    def add_and_redraw():
+        order.add_item(menu_item)
+        view.create_order_ui(order)
+        order.remove_item(order.items[-1])
+
+    def measure(run):
+        result = time_calls(run, number=5)
+        ops_before = view.canvas.ops
+        run()
+        result['canvas_ops'] = view.canvas.ops - ops_before
+        return result
+
+    results = {
+        'create_restaurant_ui (full)': measure(full(view.create_restaurant_ui)),
+        'create_restaurant_ui (unchanged)': measure(view.create_restaurant_ui),
+        'create_table_ui (full)': measure(full(lambda: view.create_table_ui(table))),
+        'create_order_ui (full)': measure(full(lambda: view.create_order_ui(order))),
+    }
+    view.create_order_ui(order)
+    results['create_order_ui (add item)'] = measure(add_and_redraw)
+    menu_before = list(restaurant.menu.items)
+    restaurant.menu.update(synthetic_menu(300))
+    results['create_order_ui (full, 300-item menu)'] = measure(full(lambda: view.create_order_ui(order)))
+    restaurant.menu.update([(item.name, item.price) for item in menu_before])
+    clicks = [(x * RESTAURANT_SCALE, y * RESTAURANT_SCALE)
+              for t in restaurant.tables[::max(1, len(restaurant.tables) // 50)]
+              for x, y in [t.location]]
+    results['floor_at (50 clicks)'] = measure(lambda: [view.floor_at(x + 70, y + 20) for x, y in clicks])
+    order.place_new_orders()
+    view.controller = BillsController(view, restaurant, table)
+    results['create_bills_ui'] = measure(
+        lambda: view.create_bills_ui(view.controller.bills, view.controller.current_bill))
+    view.controller = FusionController(view, restaurant, table, view.controller.bills)
+    results['create_fusion_ui'] = measure(lambda: view.create_fusion_ui(table))
+    return results
+
+
+def bench_floor_navigation(floor, use_tk=False):
+    """
+    Frame times of the restaurant screen while panning across the floor
+    and zooming out until the seats are no longer drawn, and back.
+    """
+    restaurant = populated_restaurant(floor, ordered=True)
+    view = tk_server_view(restaurant) if use_tk else offscreen_server_view(restaurant)
+    viewport = view.viewport
+    view.create_restaurant_ui()
+
+    def frames(steps):
+        samples, ops = [], 0
+        for step in steps:
+            step()
+            ops_before = view.canvas.ops
+            start = time.perf_counter()
+            view.create_restaurant_ui()
+            samples.append(time.perf_counter() - start)
+            ops += view.canvas.ops - ops_before
+        samples.sort()
+        return {'median_s': statistics.median(samples), 'min_s': samples[0],
+                'p95_s': samples[int(0.95 * (len(samples) - 1))], 'canvas_ops': ops / len(samples)}
+
+    def pan():
+        for dx, dy in ([(-40, -25)] * 10 + [(40, 25)] * 10) * 2:
+            yield lambda dx=dx, dy=dy: viewport.pan(dx, dy)
+
+    def reset(scale=RESTAURANT_SCALE):
+        viewport.scale, viewport.origin = scale, (0, 0)
+        view.create_restaurant_ui()
+
+    centre = viewport.width / 2, viewport.height / 2
+    results = {'pan frame': frames(pan())}
+    reset()
+    results['zoom frame'] = frames([lambda: viewport.zoom(1 / FLOOR_ZOOM_STEP, *centre)] * 6 +
+                                   [lambda: viewport.zoom(FLOOR_ZOOM_STEP, *centre)] * 6)
+    reset(FLOOR_MIN_SCALE)
+    results['pan frame (zoomed out)'] = frames(pan())
+    return results
+
+
+def bench_kitchen(open_tickets=(100, 1000, 5000)):
+    """
+    Time to queue a new ticket and fire the oldest, with open_tickets
+    tickets waiting. Flat times mean the queue scales with the backlog.
+    """
+    from kitchen import KitchenQueue
+
+    results = {}
+    for n in open_tickets:
+        restaurant = Restaurant(synthetic_floor(n + 1, 2), MENU_ITEMS)
+        queue = KitchenQueue(restaurant, clock=itertools.count().__next__)
+        menu_item = restaurant.menu_items[0]
+        for table in restaurant.tables[:n]:
+            queue.enqueue(table, OrderItem(menu_item))
+        tables = itertools.cycle(restaurant.tables)
+
+        def enqueue_and_fire():
+            queue.enqueue(next(tables), OrderItem(menu_item))
+            queue.fire_next()
+
+        results[f'kitchen enqueue+fire ({n} open)'] = time_calls(enqueue_and_fire, number=200)
+    return results
+
+
+def bench_metrics(floor='real'):
+    """
+    One order screen tap (adding an item, then removing it) before metrics
+    are turned on, with every controller and screen timed, and after the
+    original methods are restored. The first and last should match: turning
+    metrics off leaves no wrapper behind.
+    """
+    from metrics import Metrics, instrument_all
+
+    restaurant = populated_restaurant(floor, items_per_seat=1, ordered=False)
+    view = HeadlessView(restaurant)
+    view.controller.table_touched(0)
+    view.controller.seat_touched(0)
+    menu_item = restaurant.menu_items[0]
+
+    def tap():
+        view.controller.add_item(menu_item)
+        view.controller.remove(view.controller.order.items[-1])
+
+    results = {'order tap (metrics never enabled)': time_calls(tap, number=200)}
+    metrics = Metrics()
+    instrument_all(metrics, HeadlessView)
+    results['order tap (metrics enabled)'] = time_calls(tap, number=200)
+    metrics.restore()
+    results['order tap (metrics disabled again)'] = time_calls(tap, number=200)
+    return results
+
+
+def concurrent_order_entry(restaurant, threads, operations):
+    """
+    Has each thread add, place and remove items on its own share of the
+    tables. Returns the elapsed seconds.
+    """
+    menu_item = restaurant.menu_items[0]
+    start_line = threading.Barrier(threads + 1)
+
+    def worker(ix):
+        tables = restaurant.tables[ix::threads]
+        start_line.wait()
+        for n in range(operations):
+            order = tables[n % len(tables)].order_for(n % 2)
+            order.add_item(menu_item)
+            order.place_new_orders()
+            order.remove_item(order.items[0])
+
+    workers = [threading.Thread(target=worker, args=(ix,)) for ix in range(threads)]
+    for thread in workers:
+        thread.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def bench_threads(operations=20_000):
+    """Throughput of order entry on the hall floor by 1, 2, 4 and 8 threads."""
+    results = {}
+    for threads in (1, 2, 4, 8):
+        restaurant = Restaurant(FLOORS['hall'], MENU_ITEMS)
+        elapsed = concurrent_order_entry(restaurant, threads, operations // threads)
+        results[f'{threads} threads'] = 3 * operations / elapsed
+    return results
+
+
+def run_all(use_tk=False):
+    results = bench_kitchen()
+    results.update(bench_metrics())
+    for floor in FLOORS:
+        for group in (bench_model(floor), bench_controllers(floor), bench_rendering(floor, use_tk),
+                      bench_floor_navigation(floor, use_tk)):
+            for name, result in group.items():
+                results[f'{floor}: {name}'] = result
+    return results
+
+
+def compare(baseline, results, threshold):
+    """Returns (name, baseline median, new median, ratio) for each regression beyond threshold."""
+    regressions = []
+    for name, result in results.items():
+        if name in baseline:
+            old, new = baseline[name]['median_s'], result['median_s']
+            if old > 0 and new / old > 1 + threshold:
+                regressions.append((name, old, new, new / old))
+    return regressions
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the OORMS hot paths')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown reported as a regression (default 0.2)')
+    parser.add_argument('--tk', action='store_true', help='render on a real Tk canvas')
+    parser.add_argument('--memory', action='store_true',
+                        help='also compare OrderItem/Order with their previous representation')
+    parser.add_argument('--threads', action='store_true',
+                        help='also measure order entry throughput with several threads')
+    args = parser.parse_args()
+
+    if args.memory:
+        for name, value in bench_item_representation().items():
+            print(f'{name:<50}{value:>12.1f}')
+    if args.threads:
+        for name, ops_per_second in bench_threads().items():
+            print(f'{name:<50}{ops_per_second:>12,.0f} ops/s')
+    results = run_all(args.tk)
+    for name, result in results.items():
+        ops = f'{result["canvas_ops"]:>8.1f} ops' if 'canvas_ops' in result else ''
+        print(f'{name:<60}{result["median_s"] * 1e6:>12.1f} us{ops}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for name, old, new, ratio in regressions:
+            print(f'REGRESSION {name}: {old * 1e6:.1f} us -> {new * 1e6:.1f} us ({ratio:.2f}x)')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Undo and redo for the actions taken through the controllers. Each action is
+a command that makes its change and remembers only what it needs to reverse
+it: the OrderItems it took out and where they were, or the shares it moved
+between bills. These are references to the model's own objects rather than
+copies, so a command costs a few tuples however big the restaurant is.
+
+Undoing and redoing change the model through its usual methods, so the
+journal, the kitchen and the views see them as ordinary model events.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+from collections import deque
+
+from constants import UNDO_LIMIT
+from model import Bill, merge_orders, move_item, split_bill
+
+
+def adopt(bill, fresh):
+    """
+    Returns bill, made the same as fresh, or fresh if bill is None. Redoing
+    a command keeps the bills it made the first time, which the commands
+    done after it refer to.
+    """
+    if bill is None:
+        return fresh
+    with bill.lock:
+        bill.orders, bill.shares = fresh.orders, fresh.shares
+        bill.update_items()
+    return bill
+
+
+class CommandLog:
+    """
+    The commands done, most recent last, and those undone since, ready to be
+    redone. Only the last capacity commands are kept: the deque drops the
+    oldest one as a new one arrives. Doing a new command forgets those undone.
+
+    Listeners are called with ('do', 'undo' or 'redo', command) after each
+    step, e.g. to count actions for analytics.
+    """
+
+    def __init__(self, capacity=UNDO_LIMIT):
+        self.done = deque(maxlen=capacity)
+        self.undone = []
+        self.listeners = []
+
+    def __len__(self):
+        return len(self.done)
+
+    def execute(self, command):
+        command.do()
+        self.done.append(command)
+        self.undone.clear()
+        self.notify('do', command)
+        return command
+
+    def undo(self):
+        """Undoes the last command done and returns it, or returns None if there is none."""
+        if not self.done:
+            return None
+        command = self.done.pop()
+        command.undo()
+        self.undone.append(command)
+        self.notify('undo', command)
+        return command
+
+    def redo(self):
+        """Does the last command undone again and returns it, or returns None if there is none."""
+        if not self.undone:
+            return None
+        command = self.undone.pop()
+        command.do()
+        self.done.append(command)
+        self.notify('redo', command)
+        return command
+
+    def forget(self, table):
+        """
+        Drops the commands that changed table, e.g. because bills were made
+        for it and its items are now charged on them.
+        """
+        kept = [command for command in self.done if command.table is not table]
+        self.done.clear()
+        self.done.extend(kept)
+        self.undone[:] = [command for command in self.undone if command.table is not table]
+
+    def notify(self, step, command):
+        for listener in self.listeners:
+            listener(step, command)
+
+
+class Command:
+    """An action on a table that can be undone. do() is called again to redo it."""
+
+    name = 'command'
+    table = None
+
+    def do(self):
+        raise NotImplementedError
+
+    def undo(self):
+        raise NotImplementedError
+
+
+class ItemCommand(Command):
+    """
+    Adds or removes one OrderItem. Taking the item out records its index and
+    state; putting it back restores both. The order is looked up again from
+    the table each time, as clearing a table gives it new Order objects.
+    """
+
+    def __init__(self, order, item=None):
+        self.order = order
+        self.table = order.table
+        self.item = item
+        self.index = None
+        self.state = None
+
+    def current_order(self):
+        if self.table is None:
+            return self.order
+        return self.table.order_for(self.order.seat_number)
+
+    def take_out(self):
+        order = self.item.order
+        with order.lock:
+            self.index = order.items.index(self.item)
+            self.state = self.item.state
+            order.remove_item(self.item)
+
+    def put_back(self):
+        self.current_order().insert_item(self.item, self.index, self.state)
+
+
+class AddItem(ItemCommand):
+    name = 'add item'
+
+    def __init__(self, order, menu_item):
+        super().__init__(order)
+        self.menu_item = menu_item
+
+    def do(self):
+        if self.item is None:
+            order = self.current_order()
+            with order.lock:
+                order.add_item(self.menu_item)
+                self.item = order.items[-1]
+        else:
+            self.put_back()
+
+    def undo(self):
+        self.take_out()
+
+
+class RemoveItem(ItemCommand):
+    name = 'remove item'
+
+    def __init__(self, item):
+        super().__init__(item.order, item)
+
+    def do(self):
+        self.take_out()
+
+    def undo(self):
+        self.put_back()
+
+
+class Batch(Command):
+    """Several commands done as one, and undone in reverse order."""
+
+    def __init__(self, name, table, commands):
+        self.name = name
+        self.table = table
+        self.commands = commands
+
+    def do(self):
+        for command in self.commands:
+            command.do()
+
+    def undo(self):
+        for command in reversed(self.commands):
+            command.undo()
+
+
+def cancel_changes(order):
+    """The command removing the items of order not yet sent to the kitchen."""
+    # last first, so that each index recorded is still right when undone in reverse
+    return Batch('cancel changes', order.table, [RemoveItem(item) for item in reversed(order.unordered_items())])
+
+
+class MergeBills(Command):
+    """
+    Moves the orders of the given seats into a new bill at the end of bills,
+    dropping the bills left without orders. Undoing puts each share taken
+    back on the bill it came from, and bills back as they were.
+    """
+    name = 'merge bills'
+
+    def __init__(self, table, bills, seat_numbers):
+        self.table = table
+        self.bills = bills
+        self.seat_numbers = set(seat_numbers)
+        self.bill = None
+        self.previous = None
+        self.taken = None
+
+    def do(self):
+        self.previous = list(self.bills)
+        self.taken = []
+        for bill in self.bills:
+            with bill.lock:
+                orders = [order for order in bill.orders if order.seat_number in self.seat_numbers]
+                if orders:
+                    shares = [(item, bill.shares[item]) for order in orders
+                              for item in order.items if item in bill.shares]
+                    self.taken.append((bill, list(bill.orders), shares))
+        bill, emptied = merge_orders(self.bills, self.seat_numbers, self.table)
+        self.bill = adopt(self.bill, bill)
+        emptied = set(emptied)
+        self.bills[:] = [bill for bill in self.bills if bill not in emptied]
+        self.bills.append(self.bill)
+
+    def undo(self):
+        for bill, orders, shares in self.taken:
+            with bill.lock:
+                bill.orders = orders
+                for item, share in shares:
+                    bill.charge(item, share)
+        self.bills[:] = self.previous
+
+
+class SplitBill(Command):
+    """
+    Replaces bill in bills by the bills split_bill makes of it. Undoing
+    gives bill back its own orders and shares, which split_bill took.
+    """
+    name = 'split bill'
+
+    def __init__(self, table, bills, bill, parts):
+        self.table = table
+        self.bills = bills
+        self.bill = bill
+        self.parts = parts
+        self.split = []
+        self.orders = None
+        self.shares = None
+
+    def do(self):
+        with self.bill.lock:
+            self.orders, self.shares = list(self.bill.orders), dict(self.bill.shares)
+            split = split_bill(self.bill, self.parts)
+        self.split = [adopt(old, new) for old, new in zip(self.split, split)] or split
+        ix = self.bills.index(self.bill)
+        self.bills[ix:ix + 1] = self.split
+
+    def undo(self):
+        ix = self.bills.index(self.split[0])
+        self.bills[ix:ix + len(self.split)] = [self.bill]
+        with self.bill.lock:
+            self.bill.orders, self.bill.shares = self.orders, self.shares
+            self.bill.update_items()
+
+
+class MoveItem(Command):
+    """
+    Moves the share of item on source to the bill after it in bills, making
+    a new bill at the end if needed. Undoing moves the share back and puts
+    back whatever share of item the other bill held before.
+    """
+    name = 'move item'
+
+    def __init__(self, table, bills, source, item):
+        self.table = table
+        self.bills = bills
+        self.source = source
+        self.item = item
+        self.target = None
+        self.appended = False
+        self.share = None
+        self.previous = None
+
+    def do(self):
+        ix = self.bills.index(self.source) + 1
+        self.appended = ix == len(self.bills)
+        if self.appended:
+            self.bills.append(self.target if self.target is not None else Bill(None))
+        self.target = self.bills[ix]
+        self.share = self.source.shares[self.item]
+        self.previous = self.target.shares.get(self.item)
+        move_item(self.item, self.source, self.target)
+
+    def undo(self):
+        self.target.discharge(self.item)
+        if self.previous is not None:
+            self.target.charge(self.item, self.previous)
+        self.source.charge(self.item, self.share)
+        if self.appended:
+            self.bills.remove(self.target)
+
+
+class SettleTable(Command):
+    """
+    Records a table's bills in the history, if there is one, and clears the
+    table. Undoing deletes the bills recorded and puts every item back on
+    its seat in the state it was in.
+    """
+    name = 'settle table'
+
+    def __init__(self, table, bills, history=None):
+        self.table = table
+        self.bills = bills
+        self.history = history
+        self.bill_ids = []
+        self.seats = []
+
+    def do(self):
+        if self.history is not None:
+            self.bill_ids = self.history.record_bills(self.table.number, self.bills)
+        with self.table.lock:
+            self.seats = [(order.seat_number, [(item, item.state) for item in order.items])
+                          for order in self.table.orders if order.items]
+            self.table.clear_table()
+
+    def undo(self):
+        if self.history is not None:
+            self.history.delete_bills(self.bill_ids)
+        with self.table.lock:
+            for seat, items in self.seats:
+                order = self.table.order_for(seat)
+                for index, (item, state) in enumerate(items):
+                    order.insert_item(item, index, state)
@@ -0,0 +1,131 @@
+"""
+Loads the restaurant layout and menu from a data file (JSON, or TOML if
+the name ends in .toml) instead of the defaults in constants.py, and
+reloads it into a running Restaurant when the file changes.
+
+    {"tables": [{"seats": 6, "location": [20, 20]}, ...],
+     "menu": [{"name": "House burger", "price": 16, "category": "Mains"}, ...]}
+
+The category of a menu item is optional.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import os
+
+# path -> (mtime_ns, size, RestaurantConfig)
+_cache = {}
+
+
+class RestaurantConfig:
+    """A validated layout and menu, shaped like constants.TABLES and MENU_ITEMS."""
+
+    def __init__(self, tables, menu_items):
+        self.tables = tables
+        self.menu_items = menu_items
+
+
+def load_config(path):
+    """
+    Returns the configuration in path. The parsed form is cached and only
+    re-read when the file's modification time or size changes. Raises
+    ValueError if the file is not a valid configuration.
+    """
+    status = os.stat(path)
+    cached = _cache.get(path)
+    if cached is not None and cached[:2] == (status.st_mtime_ns, status.st_size):
+        return cached[2]
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        if path.endswith('.toml'):
+            import tomllib
+            data = tomllib.loads(raw.decode('utf-8'))
+        else:
+            import json
+            data = json.loads(raw)
+        config = validate(data)
+    except ValueError as error:  # includes JSON and TOML syntax errors
+        raise ValueError(f'{path}: {error}') from error
+    _cache[path] = (status.st_mtime_ns, status.st_size, config)
+    return config
+
+
+def validate(data):
+    if not isinstance(data, dict):
+        raise ValueError('expected an object with "tables" and "menu"')
+    tables = data.get('tables')
+    if not isinstance(tables, list) or not tables:
+        raise ValueError('"tables" must be a non-empty list')
+    layout = []
+    for ix, table in enumerate(tables):
+        seats = table.get('seats') if isinstance(table, dict) else None
+        location = table.get('location') if isinstance(table, dict) else None
+        if not isinstance(seats, int) or isinstance(seats, bool) or seats < 1:
+            raise ValueError(f'table {ix}: "seats" must be a positive integer')
+        if (not isinstance(location, list) or len(location) != 2 or
+                not all(is_number(c) and c >= 0 for c in location)):
+            raise ValueError(f'table {ix}: "location" must be [x, y] with x, y >= 0')
+        layout.append((seats, tuple(location)))
+    menu = data.get('menu')
+    if not isinstance(menu, list) or not menu:
+        raise ValueError('"menu" must be a non-empty list')
+    menu_items, names = [], set()
+    for ix, item in enumerate(menu):
+        name = item.get('name') if isinstance(item, dict) else None
+        price = item.get('price') if isinstance(item, dict) else None
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError(f'menu item {ix}: "name" must be a non-empty string')
+        if name in names:
+            raise ValueError(f'menu item {ix}: duplicate name {name!r}')
+        if not is_number(price) or price < 0:
+            raise ValueError(f'menu item {ix}: "price" must be a non-negative number')
+        category = item.get('category')
+        if category is not None and not isinstance(category, str):
+            raise ValueError(f'menu item {ix}: "category" must be a string')
+        names.add(name)
+        menu_items.append((name, price) if category is None else (name, price, category))
+    return RestaurantConfig(layout, menu_items)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class ConfigWatcher:
+    """
+    Reloads the configuration into restaurant whenever the file changes;
+    call poll() periodically. A file that is invalid, or that would drop
+    seats with open orders, is reported through on_error and otherwise
+    ignored until it changes again.
+    """
+
+    def __init__(self, path, restaurant, on_error=None):
+        self.path = path
+        self.restaurant = restaurant
+        self.on_error = on_error
+        self.applied = load_config(path)
+
+    def poll(self):
+        """Returns True if a new configuration was applied."""
+        try:
+            config = load_config(self.path)
+        except (OSError, ValueError) as error:
+            self.report(error)
+            return False
+        if config is self.applied:
+            return False
+        self.applied = config
+        try:
+            self.restaurant.reconfigure(config.tables, config.menu_items)
+        except ValueError as error:
+            self.report(error)
+            return False
+        return True
+
+    def report(self, error):
+        if self.on_error is not None:
+            self.on_error(error)
@@ -42,17 +42,48 @@ SINGLE_TABLE_LOCATION = (30, 30)
 SEAT_DIAM = 40
 SEAT_SPACING = 10
 
+FLOOR_INDEX_CELL_SIZE = 100
+FLOOR_MIN_SCALE = 0.1
+FLOOR_MAX_SCALE = 2
+FLOOR_ZOOM_STEP = 1.25
+FLOOR_DETAIL_SCALE = 0.4  # seats are drawn only at this scale or larger
+FLOOR_DRAG_THRESHOLD = 5  # pixels a press may move and still count as a touch
+
 EMPTY_SEAT_STYLE = {'fill': '#ccc', 'outline': '#999'}
 FULL_SEAT_STYLE = {'fill': '#090', 'outline': '#090'}
 
 SERVER_VIEW_WIDTH = 380
 SERVER_VIEW_HEIGHT = 500
 
+MAX_REDRAWS_PER_SECOND = 30
+
+# Persistence constants
+
+JOURNAL_SYNC_MS = 500
+
+# Undo constants
+
+UNDO_LIMIT = 100
+
+# Configuration constants
+
+CONFIG_POLL_MS = 1000
+
 # Printer constants
 
 TAPE_FONT = ('Consolas', '14')
 TAPE_WIDTH = 40
 VISIBLE_LINES = 40
+TAPE_HISTORY_LINES = 2000
+PRINTER_POLL_MS = 20
+
+# Receipt constants
+
+RECEIPT_HEADER = ('Stressed & Koultoure',
+                  '15, Valour Drive',
+                  'Kingston, Ontario, G5X 2J9')
+TAX_NAME = 'HST'
+TAX_RATE_PERCENT = 13
 
 # Button constants
 
@@ -79,6 +110,7 @@ BUTTON_SIZE_UNIT = (14,2)
 # Order view constants
 
 MENU_ITEM_SIZE = (150, 20, 5)
+MENU_PAGE_SIZE = 16  # menu buttons per page, leaving room for the buttons at the bottom
 
 ORDER_ITEM_LOCATION = (230, 20, 5)
 DOT_SIZE = 15
@@ -88,4 +120,16 @@ CANCEL_STYLE = {'fill': '#900', 'outline': '#900'}
 NOT_YET_ORDERED_STYLE = {'fill': '#fff', 'outline': '#090'}
 ORDERED_STYLE = BUTTON_STYLE
 
+# Kitchen view constants
+
+KITCHEN_VIEW_WIDTH = 420
+KITCHEN_VIEW_HEIGHT = 500
+KITCHEN_POLL_MS = 250
+TICKET_WIDTH = 400
+TICKET_LINE_HEIGHT = 18
+TICKET_MARGIN = 10
+TICKET_STYLES = ({'fill': '#fff', 'outline': '#999'},  # queued
+                 {'fill': '#fd8', 'outline': '#c90'},  # fired
+                 {'fill': '#9e9', 'outline': '#090'})  # ready
+
 
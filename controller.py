@@ -6,7 +6,8 @@ Submission date: [date here]
 
 Original code by EEE320 instructors.
 """
-from model import Bill
+from commands import AddItem, RemoveItem, MergeBills, MoveItem, SettleTable, SplitBill, cancel_changes
+from model import Bill, merge_orders
 
 
 class Controller:
@@ -15,6 +16,21 @@ class Controller:
         self.view = view
         self.restaurant = restaurant
 
+    def execute(self, command):
+        """Does command, through the restaurant's command log if it keeps one, so it can be undone."""
+        if self.restaurant.commands is None:
+            command.do()
+        else:
+            self.restaurant.commands.execute(command)
+
+    def undo(self):
+        if self.restaurant.commands is not None and self.restaurant.commands.undo():
+            self.restaurant.notify_views()
+
+    def redo(self):
+        if self.restaurant.commands is not None and self.restaurant.commands.redo():
+            self.restaurant.notify_views()
+
 
 class RestaurantController(Controller):
 
@@ -58,14 +74,15 @@ class OrderController(Controller):
         self.order = self.table.order_for(seat_number)
 
     def create_ui(self):
+        self.order = self.table.order_for(self.order.seat_number)  # replaced if the table was cleared
         self.view.create_order_ui(self.order)
 
     def add_item(self, menu_item):
-        self.order.add_item(menu_item)
+        self.execute(AddItem(self.order, menu_item))
         self.restaurant.notify_views()
 
     def remove(self, order_item):
-        self.order.remove_item(order_item)
+        self.execute(RemoveItem(order_item))
         self.restaurant.notify_views()
 
     def update_order(self):
@@ -74,39 +91,33 @@ class OrderController(Controller):
         self.restaurant.notify_views()
 
     def cancel_changes(self):
-        self.order.remove_unordered_items()
+        self.execute(cancel_changes(self.order))
         self.view.set_controller(TableController(self.view, self.restaurant, self.table))
         self.restaurant.notify_views()
 
 
 class BillsController(Controller):
-    def __init__(self, view, restaurant, table):
+    def __init__(self, view, restaurant, table, bills=None, current_bill=None):
         super().__init__(view, restaurant)
-        self.bills = []
         self.table = table
-        for order in table.orders:
-            if not order.is_empty():
-                order.remove_unordered_items()
-                self.bills.append(Bill(order))
-        self.current_bill = self.bills[0]
+        if bills is None:
+            bills = []
+            for order in table.orders:
+                if not order.is_empty():
+                    order.remove_unordered_items()
+                    bills.append(Bill(order))
+            if restaurant.commands is not None:
+                # the items are charged on the bills from now on, so
+                # earlier changes to the table can no longer be undone
+                restaurant.commands.forget(table)
+        self.bills = bills
+        self.current_bill = current_bill if current_bill is not None else self.bills[0]
 
     def print_bill(self, bill):
-        date_str = "YYYY-MM-DD"
-        time_str = "HH:MM"
-
-        self.view.printer_window.print("----------Stressed & Koultoure----------\n")
-        self.view.printer_window.print("            15, Valour Drive            ")
-        self.view.printer_window.print("       Kingston, Ontario, G5X 2J9       ")
-        self.view.printer_window.print(f"{date_str:<32}{time_str}\n")
-        # Items
-        for menu_item, qty in bill.items.items():
-            line_total = menu_item.price * qty
-            self.view.printer_window.print(f"{qty:<5} {menu_item.name:<20} {line_total:>10}$")
+        from receipts import ReceiptEngine, TapeBackend, receipt_from_bill  # only needed once a bill is printed
 
-        self.view.printer_window.print(f"\nTotal:{bill.total_cost():>30}$")
-
-        self.view.printer_window.print("\nMéthode de paiement")
-        self.view.printer_window.print("-"*40)
+        engine = ReceiptEngine(TapeBackend(self.view.printer_window))
+        engine.print(receipt_from_bill(bill, self.table.number))
 
     def remove_bill(self, bill):
         self.bills.remove(bill)
@@ -118,8 +129,24 @@ class BillsController(Controller):
         self.current_bill = new_bill
         self.restaurant.notify_views()
 
+    def split_current(self, parts=2):
+        """Replaces the current bill with parts bills, each paying an equal share of every item."""
+        split = SplitBill(self.table, self.bills, self.current_bill, parts)
+        self.execute(split)
+        self.current_bill = split.split[0]
+        self.restaurant.notify_views()
+
+    def move_to_next_bill(self, menu_item):
+        """Moves one whole menu_item from the current bill to the next one, making one if needed."""
+        item = next((item for item, share in self.current_bill.shares.items()
+                     if item.details is menu_item and share.is_whole()), None)
+        if item is None:
+            return
+        self.execute(MoveItem(self.table, self.bills, self.current_bill, item))
+        self.restaurant.notify_views()
+
     def done(self):
-        self.table.clear_table()
+        self.execute(SettleTable(self.table, self.bills, self.restaurant.history))
         self.view.set_controller(RestaurantController(self.view, self.restaurant))
         self.view.update()
 
@@ -128,38 +155,43 @@ class BillsController(Controller):
         self.restaurant.notify_views()
 
     def create_ui(self):
+        if self.current_bill not in self.bills:  # e.g. a merge was undone
+            self.current_bill = self.bills[0]
         self.view.create_bills_ui(self.bills, self.current_bill)
 
 class FusionController(Controller):
     def __init__(self, view, restaurant, table, bills):
         super().__init__(view, restaurant)
         self.seat_ids = {}
+        self.seat_for_id = {}
         self.table_id = None
-        self.selected = []
+        self.selected = set()
         self.bills = bills
         self.table = table
 
     def create_ui(self):
         self.view.create_fusion_ui(self.table)
 
+    def set_seat_ids(self, table_id, seat_ids):
+        """
+        Records the canvas ids drawn for the table and its seats (None for
+        seats without an order) and indexes the seats by canvas id.
+        """
+        self.table_id = table_id
+        self.seat_ids = seat_ids
+        self.seat_for_id = {seat_id: seat for seat, seat_id in seat_ids.items()
+                            if seat_id is not None}
+
     def seat_touched(self, seat_id):
         if seat_id is None:
             self.view.printer_window.print("Invalid seat clicked")
             return
-        seat_number = None
-        for key, value in self.seat_ids.items():
-            if value == seat_id:
-                seat_number = key
-                break
+        seat_number = self.seat_for_id.get(seat_id)
         if seat_number is None:
             self.view.printer_window.print("Seat ID not found in seat_ids")
             return
         self.view.change_seat_style(seat_id)
-        if seat_number in self.selected:
-            self.selected.remove(seat_number)
-        else:
-            self.selected.append(seat_number)
-
+        self.selected ^= {seat_number}
 
     def remove_bill(self, bill):
         self.bills.remove(bill)
@@ -168,25 +200,15 @@ class FusionController(Controller):
         self.bills.append(bill)
 
     def done(self):
-        new_bill, bills_to_remove = self.merge_selected_orders(self.selected, self.bills)
-        new_bill.update_items()
-        for bill in bills_to_remove:
-            self.view.controller.remove_bill(bill)
-        self.view.controller.add_bill(new_bill)
-        self.view.set_controller(BillsController(self.view, self.restaurant, self.table))
-        self.view.controller.bills = self.bills
+        current_bill = None
+        if self.selected:
+            merge = MergeBills(self.table, self.bills, self.selected)
+            self.execute(merge)
+            current_bill = merge.bill
+        self.view.set_controller(BillsController(self.view, self.restaurant, self.table,
+                                                 self.bills, current_bill))
         self.view.update()
 
     def merge_selected_orders(self, select, bills):
-        new_bill = Bill(None)
-        bills_to_remove = []
-
-        for bill in bills:
-            orders_to_move = [o for o in bill.orders if o.seat_number in select]
-            for order in orders_to_move:
-                new_bill.orders.append(order)
-                bill.orders.remove(order)
-            if not bill.orders:
-                bills_to_remove.append(bill)
-
-        return new_bill, bills_to_remove
\ No newline at end of file
+        return merge_orders(bills, select, self.table)
+
@@ -0,0 +1,106 @@
+"""
+A view of the OORMS system that draws nothing. It drives the controller
+layer exactly as the ServerView does, and records which screen would be on
+display, for tests, scripted sessions and load tests.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+from enum import Enum, auto
+
+from controller import RestaurantController
+
+
+class UI(Enum):
+    restaurant = auto()
+    table = auto()
+    order = auto()
+    bills = auto()
+    fusion = auto()
+
+
+class RecordingPrinter:
+    """Stands in for the printer tape, keeping the printed texts. Jobs run at once."""
+
+    def __init__(self):
+        self.lines = []
+
+    def print(self, text):
+        self.lines.append(text)
+
+    def print_job(self, job):
+        self.print(job() if callable(job) else job)
+
+
+class HeadlessView:
+    """
+    Stands in for ServerView. last_UI_created is UI.restaurant or a tuple
+    (UI.<screen>, <model object shown>). In the fusion screen, seat n of
+    the table is given the fake canvas id SEAT_ID_BASE + n.
+    """
+
+    SEAT_ID_BASE = 100
+
+    def __init__(self, restaurant, printer_window=None):
+        self.controller = None
+        self.last_UI_created = None
+        self.restaurant = restaurant
+        self.printer_window = printer_window if printer_window is not None else RecordingPrinter()
+        restaurant.add_view(self)
+        self.set_controller(RestaurantController(self, self.restaurant))
+        self.update()
+
+    def set_controller(self, controller):
+        self.controller = controller
+
+    def update(self):
+        self.controller.create_ui()
+
+    def create_restaurant_ui(self):
+        self.last_UI_created = UI.restaurant
+
+    def create_table_ui(self, table):
+        self.last_UI_created = (UI.table, table)
+
+    def create_order_ui(self, order):
+        self.last_UI_created = (UI.order, order)
+
+    def create_bills_ui(self, bills, current_bill):
+        self.last_UI_created = (UI.bills, current_bill)
+
+    def create_fusion_ui(self, table):
+        self.last_UI_created = (UI.fusion, table)
+        seat_ids = {seat: self.SEAT_ID_BASE + seat if table.has_order_for(seat) else None
+                    for seat in range(table.n_seats)}
+        self.controller.set_seat_ids(None, seat_ids)
+
+    def change_seat_style(self, seat_id):
+        pass
+
+
+class HeadlessKitchen:
+    """
+    Drains a KitchenQueue without a screen, the way a kitchen would: fires
+    the next ticket, marks it ready and serves it. served keeps the tickets
+    served, in order.
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.served = []
+
+    def run(self, max_tickets=None):
+        """Serves queued tickets until none is left or max_tickets are served; returns how many."""
+        count = 0
+        while max_tickets is None or count < max_tickets:
+            ticket = self.queue.fire_next()
+            if ticket is None:
+                break
+            self.queue.ready(ticket)
+            self.queue.serve(ticket)
+            self.served.append(ticket)
+            count += 1
+        return count
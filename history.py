@@ -0,0 +1,167 @@
+"""
+SQLite-backed history of the bills closed in the restaurant, with the
+queries used for end-of-day and longer-term reporting.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import sqlite3
+from datetime import datetime
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS bills (
+    id INTEGER PRIMARY KEY,
+    table_number INTEGER NOT NULL,
+    closed_at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    total_cents INTEGER NOT NULL,
+    settlement INTEGER
+);
+CREATE TABLE IF NOT EXISTS bill_lines (
+    bill_id INTEGER NOT NULL REFERENCES bills (id),
+    seat INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    share REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    unit_cents INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bills_by_day ON bills (day, total_cents);
+CREATE INDEX IF NOT EXISTS bills_by_table ON bills (table_number, day, closed_at);
+CREATE INDEX IF NOT EXISTS lines_by_bill ON bill_lines (bill_id);
+CREATE INDEX IF NOT EXISTS lines_by_item ON bill_lines (item);
+'''
+
+INSERT_BILL = 'INSERT INTO bills (id, table_number, closed_at, day, total_cents, settlement) VALUES (?, ?, ?, ?, ?, ?)'
+INSERT_LINE = 'INSERT INTO bill_lines (bill_id, seat, item, share, quantity, unit_cents) VALUES (?, ?, ?, ?, ?, ?)'
+
+REVENUE_BY_DAY = '''
+SELECT day, COUNT(*), SUM(total_cents) FROM bills
+WHERE day BETWEEN ? AND ? GROUP BY day ORDER BY day
+'''
+
+ITEM_POPULARITY = '''
+SELECT item, SUM(quantity * share), SUM(quantity * unit_cents) FROM bill_lines
+JOIN bills ON bills.id = bill_lines.bill_id
+WHERE bills.day BETWEEN ? AND ?
+GROUP BY item ORDER BY SUM(quantity * share) DESC, item LIMIT ?
+'''
+
+CLOSED_BILLS = '''
+SELECT bills.id, table_number, closed_at, item, share, SUM(quantity), unit_cents FROM bills
+JOIN bill_lines ON bills.id = bill_lines.bill_id
+WHERE bills.day BETWEEN ? AND ?
+GROUP BY bills.id, item, share, unit_cents ORDER BY bills.id, MIN(bill_lines.rowid)
+'''
+
+DELETE_LINES = 'DELETE FROM bill_lines WHERE bill_id = ?'
+DELETE_BILL = 'DELETE FROM bills WHERE id = ?'
+
+COUNT_BILLS = '''
+SELECT COUNT(DISTINCT bills.id) FROM bills
+JOIN bill_lines ON bills.id = bill_lines.bill_id
+WHERE bills.day BETWEEN ? AND ?
+'''
+
+TABLE_TURNOVER = '''
+SELECT table_number, COUNT(DISTINCT settlement) FROM bills
+WHERE day BETWEEN ? AND ? GROUP BY table_number ORDER BY table_number
+'''
+
+
+class BillHistory:
+    """
+    Stores closed bills with their lines (seat, item, share of the item,
+    quantity and unit price). All the bills of a table are written in one transaction with
+    executemany; the SQL is kept in module constants so sqlite3 reuses the
+    prepared statements.
+
+    Dates are ISO strings (YYYY-MM-DD) and the ranges given to the queries
+    are inclusive.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def record_bills(self, table_number, bills, closed_at=None):
+        """
+        Stores the bills with which a table was settled; returns their ids.
+        They are one settlement, numbered by the id of the first bill.
+        """
+        closed_at = (closed_at or datetime.now()).isoformat(timespec='seconds')
+        day = closed_at[:10]
+        with self.connection:
+            next_id = self.connection.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM bills').fetchone()[0]
+            bill_rows, line_rows = [], []
+            for bill_id, bill in enumerate(bills, next_id):
+                bill_rows.append((bill_id, table_number, closed_at, day, bill.total_cents, next_id))
+                line_rows.extend((bill_id, *line) for line in bill_lines(bill))
+            self.connection.executemany(INSERT_BILL, bill_rows)
+            self.connection.executemany(INSERT_LINE, line_rows)
+        return [row[0] for row in bill_rows]
+
+    def delete_bills(self, bill_ids):
+        """Removes bills recorded by record_bills, e.g. when settling a table is undone."""
+        rows = [(bill_id,) for bill_id in bill_ids]
+        with self.connection:
+            self.connection.executemany(DELETE_LINES, rows)
+            self.connection.executemany(DELETE_BILL, rows)
+
+    def revenue_by_day(self, first_day, last_day):
+        """Returns (day, number of bills, revenue in cents) for each day with bills."""
+        return self.connection.execute(REVENUE_BY_DAY, (first_day, last_day)).fetchall()
+
+    def item_popularity(self, first_day, last_day, limit=-1):
+        """
+        Returns (item name, quantity sold, revenue in cents), most sold first.
+        The shares of an item split between bills add up to the one item.
+        """
+        return self.connection.execute(ITEM_POPULARITY, (first_day, last_day, limit)).fetchall()
+
+    def closed_bills(self, first_day, last_day):
+        """
+        Yields (bill id, table number, closed_at, [(item name, share,
+        quantity, unit price in cents), ...]) for each bill, in the order they were closed,
+        reading the rows as they are needed.
+        """
+        current, lines = None, []
+        for bill_id, table_number, closed_at, item, share, quantity, unit_cents in \
+                self.connection.execute(CLOSED_BILLS, (first_day, last_day)):
+            if current is not None and bill_id != current[0]:
+                yield (*current, lines)
+                lines = []
+            current = (bill_id, table_number, closed_at)
+            lines.append((item, share, quantity, unit_cents))
+        if current is not None:
+            yield (*current, lines)
+
+    def count_bills(self, first_day, last_day):
+        """The number of bills closed_bills yields: those with at least one line."""
+        return self.connection.execute(COUNT_BILLS, (first_day, last_day)).fetchone()[0]
+
+    def table_turnover(self, first_day, last_day):
+        """Returns (table number, number of times the table was settled)."""
+        return self.connection.execute(TABLE_TURNOVER, (first_day, last_day)).fetchall()
+
+
+def bill_lines(bill):
+    """
+    Yields (seat, item name, share, quantity, unit price in cents) for the
+    items of bill. The share is 1 for a whole item; an item split between
+    bills is recorded with the fraction on this bill and the price of that
+    share, so revenue adds up to the cent.
+    """
+    quantities = {}
+    for item, share in bill.shares.items():
+        key = (item.order.seat_number, item.details.name, float(share.fraction), share.cents)
+        quantities[key] = quantities.get(key, 0) + 1
+    for (seat, name, fraction, unit_cents), quantity in quantities.items():
+        yield seat, name, fraction, quantity, unit_cents
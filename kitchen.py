@@ -0,0 +1,199 @@
+"""
+The kitchen's side of OORMS: items placed by the servers become tickets
+in a priority queue, which the kitchen fires, marks ready and hands over
+as served, marking their items served in the model.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from enum import IntEnum
+
+from model import ItemStateChanged, ItemRemoved, TableCleared, ORDERED
+
+
+class TicketState(IntEnum):
+    QUEUED = 0
+    FIRED = 1
+    READY = 2
+    SERVED = 3
+    CANCELLED = 4
+
+
+QUEUED, FIRED, READY, SERVED, CANCELLED = TicketState
+
+TICKET_TRANSITIONS = {
+    QUEUED: {FIRED, CANCELLED},
+    FIRED: {READY, CANCELLED},
+    READY: {SERVED, CANCELLED},
+    SERVED: set(),
+    CANCELLED: set(),
+}
+
+
+class Ticket:
+    """
+    The items of one table sent to the kitchen together. While a ticket is
+    queued, items the table orders join it; once it is fired, they start a
+    new ticket.
+    """
+    __slots__ = ('number', 'table', 'items', 'placed_at', 'priority', 'state')
+
+    def __init__(self, number, table, placed_at):
+        self.number = number
+        self.table = table
+        self.items = []
+        self.placed_at = placed_at
+        self.priority = placed_at
+        self.state = QUEUED
+
+
+class KitchenQueue:
+    """
+    The open tickets of a restaurant, fed by its model events. Tickets are
+    fired oldest first; an expedited ticket goes to the front. Queued
+    tickets are kept in a heap, and entries whose ticket was fired,
+    cancelled or re-prioritised are discarded when they reach the top, so
+    adding and firing a ticket take logarithmic time however many are open.
+
+    Model events can arrive from any thread. The queue's lock is only ever
+    taken inside a table's lock, never the other way round, so the model is
+    changed after the queue's lock has been released.
+    """
+
+    def __init__(self, restaurant, clock=time.monotonic):
+        self.restaurant = restaurant
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.heap = []
+        self.open = {}  # ticket number -> Ticket, in the order placed
+        self.queued_for = {}  # table -> its queued Ticket
+        self.ticket_for = {}  # OrderItem -> Ticket
+        self.numbers = itertools.count(1)
+        self.version = 0
+        restaurant.events.subscribe(ItemStateChanged, self.item_changed)
+        restaurant.events.subscribe(ItemRemoved, self.item_removed)
+        restaurant.events.subscribe(TableCleared, self.table_cleared)
+        for table in restaurant.tables:  # e.g. restored from a journal
+            with table.lock:
+                for order in table.orders:
+                    for item in order.items:
+                        if item.is_active():
+                            self.enqueue(table, item)
+
+    def close(self):
+        self.restaurant.events.unsubscribe(ItemStateChanged, self.item_changed)
+        self.restaurant.events.unsubscribe(ItemRemoved, self.item_removed)
+        self.restaurant.events.unsubscribe(TableCleared, self.table_cleared)
+
+    def __len__(self):
+        return len(self.open)
+
+    def item_changed(self, event):
+        if event.new_state == ORDERED:
+            self.enqueue(event.table, event.item)
+        else:
+            self.drop(event.item)  # served without going through the kitchen
+
+    def item_removed(self, event):
+        self.drop(event.item)
+
+    def table_cleared(self, event):
+        with self.lock:
+            for ticket in [t for t in self.open.values() if t.table is event.table]:
+                self.finish(ticket, CANCELLED)
+
+    def enqueue(self, table, item):
+        with self.lock:
+            ticket = self.queued_for.get(table)
+            if ticket is None:
+                ticket = Ticket(next(self.numbers), table, self.clock())
+                self.queued_for[table] = ticket
+                self.open[ticket.number] = ticket
+                heapq.heappush(self.heap, (ticket.priority, ticket.number, ticket))
+            ticket.items.append(item)
+            self.ticket_for[item] = ticket
+            self.version += 1
+            return ticket
+
+    def drop(self, item):
+        with self.lock:
+            ticket = self.ticket_for.pop(item, None)
+            if ticket is None:
+                return
+            ticket.items.remove(item)
+            if not ticket.items:
+                self.finish(ticket, CANCELLED)
+            self.version += 1
+
+    def expedite(self, ticket):
+        """Moves a queued ticket ahead of every ticket not already expedited."""
+        with self.lock:
+            if ticket.state != QUEUED:
+                raise ValueError(f'Ticket {ticket.number} is not queued')
+            ticket.priority = float('-inf')
+            heapq.heappush(self.heap, (ticket.priority, ticket.number, ticket))
+            self.version += 1
+
+    def peek(self):
+        """Returns the ticket that would be fired next, or None."""
+        with self.lock:
+            heap = self.heap
+            while heap and (heap[0][2].state != QUEUED or heap[0][0] != heap[0][2].priority):
+                heapq.heappop(heap)  # stale entry
+            return heap[0][2] if heap else None
+
+    def fire_next(self):
+        """Fires the next queued ticket and returns it, or returns None if none is queued."""
+        with self.lock:
+            ticket = self.peek()
+            if ticket is not None:
+                self.fire(ticket)
+            return ticket
+
+    def fire(self, ticket):
+        with self.lock:
+            self.advance(ticket, FIRED)
+            if self.queued_for.get(ticket.table) is ticket:
+                del self.queued_for[ticket.table]
+
+    def ready(self, ticket):
+        with self.lock:
+            self.advance(ticket, READY)
+
+    def serve(self, ticket):
+        """Hands a ready ticket over and marks its items served."""
+        with self.lock:
+            self.advance(ticket, SERVED)
+            items = self.finish(ticket, SERVED)
+        for item in items:
+            if item.is_active():
+                item.mark_as_served()
+
+    def advance(self, ticket, state):
+        if state not in TICKET_TRANSITIONS[ticket.state]:
+            raise ValueError(f'Ticket {ticket.number} cannot go from {ticket.state.name} to {state.name}')
+        ticket.state = state
+        self.version += 1
+
+    def finish(self, ticket, state):
+        """Closes a ticket, forgetting its items; returns them."""
+        ticket.state = state
+        del self.open[ticket.number]
+        if self.queued_for.get(ticket.table) is ticket:
+            del self.queued_for[ticket.table]
+        for item in ticket.items:
+            self.ticket_for.pop(item, None)
+        self.version += 1
+        return ticket.items
+
+    def tickets(self, state=None):
+        """The open tickets, oldest first, optionally only those in state."""
+        with self.lock:
+            return [t for t in self.open.values() if state is None or t.state == state]
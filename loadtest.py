@@ -0,0 +1,138 @@
+"""
+Load generator for the OORMS model and controller layer. Replays randomized
+sessions (seating, ordering, billing, fusing and settling tables) through a
+HeadlessView and reports throughput and per-method latency. Run from the
+command line:
+
+    python loadtest.py --sessions 5000 --seed 1
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import random
+import time
+
+from headless import HeadlessView
+from model import Restaurant
+
+
+class LatencyRecorder:
+    """Collects the duration of every call, keyed by Class.method."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.samples = {}
+
+    def call(self, controller, method, *args):
+        bound = getattr(controller, method)
+        start = self.clock()
+        result = bound(*args)
+        elapsed = self.clock() - start
+        self.samples.setdefault(f'{type(controller).__name__}.{method}', []).append(elapsed)
+        return result
+
+    def operations(self):
+        return sum(len(samples) for samples in self.samples.values())
+
+    def report(self):
+        """Returns {name: (count, p50, p90, p99, max)} with latencies in seconds."""
+        report = {}
+        for name, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+            report[name] = (len(samples), percentile(samples, 50), percentile(samples, 90),
+                            percentile(samples, 99), samples[-1])
+        return report
+
+
+def percentile(sorted_samples, p):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, -(-len(sorted_samples) * p // 100))
+    return sorted_samples[int(rank) - 1]
+
+
+class LoadGenerator:
+    """
+    Plays random sessions against one Restaurant. A session picks a table,
+    orders for some of its seats (sometimes removing or cancelling items),
+    and, half of the time, bills the table, possibly fusing some bills,
+    printing one and settling the table.
+    """
+
+    def __init__(self, restaurant=None, seed=None, recorder=None):
+        self.restaurant = restaurant if restaurant is not None else Restaurant()
+        self.view = HeadlessView(self.restaurant)
+        self.random = random.Random(seed)
+        self.recorder = recorder if recorder is not None else LatencyRecorder()
+
+    def call(self, method, *args):
+        return self.recorder.call(self.view.controller, method, *args)
+
+    def run(self, sessions):
+        for _ in range(sessions):
+            self.session()
+
+    def session(self):
+        rnd = self.random
+        table_number = rnd.randrange(len(self.restaurant.tables))
+        table = self.restaurant.tables[table_number]
+        self.call('table_touched', table_number)
+        for seat in rnd.sample(range(table.n_seats), rnd.randint(1, table.n_seats)):
+            self.order_for_seat(seat)
+        if table.has_any_active_orders() and rnd.random() < 0.5:
+            self.settle(table)
+        else:
+            self.call('done')
+
+    def order_for_seat(self, seat):
+        rnd = self.random
+        self.call('seat_touched', seat)
+        order = self.view.controller.order
+        for _ in range(rnd.randint(1, 4)):
+            self.call('add_item', rnd.choice(self.restaurant.menu_items))
+        unordered = order.unordered_items()
+        if rnd.random() < 0.2:
+            self.call('remove', rnd.choice(unordered))
+        if rnd.random() < 0.1:
+            self.call('cancel_changes')
+        else:
+            self.call('update_order')
+
+    def settle(self, table):
+        rnd = self.random
+        self.call('make_bills', self.view.printer_window)
+        if len(self.view.controller.bills) > 1 and rnd.random() < 0.5:
+            self.call('fuse_bills')
+            seat_ids = [seat_id for seat_id in self.view.controller.seat_ids.values() if seat_id is not None]
+            for seat_id in rnd.sample(seat_ids, rnd.randint(1, len(seat_ids))):
+                self.call('seat_touched', seat_id)
+            self.call('done')
+        self.call('change_current', rnd.choice(self.view.controller.bills))
+        self.call('print_bill', self.view.controller.current_bill)
+        self.call('done')
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay random OORMS sessions and report latencies')
+    parser.add_argument('--sessions', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    generator = LoadGenerator(seed=args.seed)
+    start = time.perf_counter()
+    generator.run(args.sessions)
+    elapsed = time.perf_counter() - start
+    operations = generator.recorder.operations()
+    print(f'{args.sessions} sessions, {operations} operations in {elapsed:.2f} s '
+          f'({operations / elapsed:,.0f} ops/s)')
+    print(f'{"method":<40}{"count":>8}{"p50 us":>10}{"p90 us":>10}{"p99 us":>10}{"max us":>10}')
+    for name, (count, *latencies) in generator.recorder.report().items():
+        print(f'{name:<40}{count:>8}' + ''.join(f'{latency * 1e6:>10.1f}' for latency in latencies))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Opt-in timing of the OORMS controllers and views. Metrics.instrument
+replaces the methods named with wrappers that add each call's duration to
+a histogram, and Metrics.restore puts the original methods back, so when
+metrics are off no code path differs from an uninstrumented run.
+
+Profiles are written in the pstats format of cProfile, which snakeviz,
+flameprof and gprof2dot turn into call graphs and flame graphs. They can be
+taken on demand, covering everything run between start_profile and
+stop_profile, or automatically for each instrumented call slower than a
+threshold.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import cProfile
+import functools
+import inspect
+import itertools
+import os
+import sys
+import threading
+import time
+
+# Bucket i counts the durations of less than 2**i microseconds and at
+# least half that; the last bucket also takes anything longer.
+N_BUCKETS = 32
+
+
+class Histogram:
+    """
+    Durations in buckets of powers of two microseconds: adding one is a few
+    integer operations, and percentiles are within a factor of two.
+    """
+    __slots__ = ('count', 'total_s', 'max_s', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.buckets = [0] * N_BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total_s += seconds
+        if seconds > self.max_s:
+            self.max_s = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), N_BUCKETS - 1)] += 1
+
+    def mean_s(self):
+        return self.total_s / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """The upper bound of the bucket holding the given fraction of the durations, at most max_s."""
+        wanted = fraction * self.count
+        seen = 0
+        for ix, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= wanted:
+                return min(2 ** ix / 1e6, self.max_s)
+        return self.max_s
+
+
+class Metrics:
+    """
+    Histograms of the durations of the instrumented methods, by
+    'Class.method' name. If slow_s is given, each instrumented call that is
+    not inside another one runs under cProfile, and the profiles of those
+    taking slow_s or more are written to profile_dir as
+    slow-<n>-<Class.method>.prof; the profiler adds to the durations
+    measured, so use a threshold only while looking for a slow tap. The
+    wrapper is chosen when a method is instrumented, so slow_s is not meant
+    to change afterwards.
+
+    The instrumented methods are meant to run on the GUI thread. Calls on
+    other threads are timed too, but may be left out of a slow-call profile.
+    """
+
+    def __init__(self, slow_s=None, profile_dir='.', clock=time.perf_counter):
+        self.slow_s = slow_s
+        self.profile_dir = profile_dir
+        self.clock = clock
+        self.histograms = {}
+        self.replaced = []  # (class, method name, its own attribute or None if inherited)
+        self.profiler = None
+        self.slow_profiles = []
+        self.numbers = itertools.count(1)
+        self.local = threading.local()
+
+    def instrument(self, cls, names):
+        """Times the methods of cls with the given names, until restore() is called."""
+        for name in names:
+            method = getattr(cls, name)
+            if getattr(method, '__metrics__', None) is self:
+                continue
+            self.replaced.append((cls, name, vars(cls).get(name)))
+            setattr(cls, name, self.timed(f'{cls.__name__}.{name}', method))
+
+    def restore(self):
+        """Puts back every method instrument() replaced."""
+        for cls, name, own in reversed(self.replaced):
+            if own is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, own)
+        self.replaced.clear()
+
+    def timed(self, name, method):
+        histogram = self.histograms.setdefault(name, Histogram())
+        clock = self.clock
+
+        if self.slow_s is not None:
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                return self.profiled(name, histogram, method, args, kwargs)
+        else:
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                start = clock()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    histogram.add(clock() - start)
+
+        wrapper.__metrics__ = self
+        return wrapper
+
+    def profiled(self, name, histogram, method, args, kwargs):
+        local = self.local
+        if self.profiler is not None or getattr(local, 'profiler', None) is not None:
+            profiler = None  # only one cProfile can run at a time
+        else:
+            profiler = local.profiler = cProfile.Profile()
+            profiler.enable()
+        start = self.clock()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = self.clock() - start
+            histogram.add(elapsed)
+            if profiler is not None:
+                profiler.disable()
+                local.profiler = None
+                if elapsed >= self.slow_s:
+                    path = os.path.join(self.profile_dir, f'slow-{next(self.numbers)}-{name}.prof')
+                    profiler.dump_stats(path)
+                    self.slow_profiles.append(path)
+
+    def start_profile(self):
+        """Starts profiling everything run from now on, instrumented or not."""
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop_profile(self, path=None):
+        """Stops the profile started by start_profile and writes it; returns the path written."""
+        if self.profiler is None:
+            return None
+        self.profiler.disable()
+        path = path or os.path.join(self.profile_dir, f'profile-{next(self.numbers)}.prof')
+        self.profiler.dump_stats(path)
+        self.profiler = None
+        return path
+
+    def toggle_profile(self):
+        """Starts a profile, or stops the one running and returns where it was written."""
+        if self.profiler is None:
+            self.start_profile()
+            return None
+        return self.stop_profile()
+
+    def report(self, out=sys.stdout):
+        """Prints the count and durations of each instrumented method, most total time first."""
+        print(f'{"method":<40}{"calls":>8}{"mean ms":>10}{"p50 ms":>10}{"p99 ms":>10}{"max ms":>10}', file=out)
+        for name, h in sorted(self.histograms.items(), key=lambda entry: -entry[1].total_s):
+            if h.count:
+                print(f'{name:<40}{h.count:>8}{h.mean_s() * 1e3:>10.3f}{h.percentile(0.5) * 1e3:>10.3f}'
+                      f'{h.percentile(0.99) * 1e3:>10.3f}{h.max_s * 1e3:>10.3f}', file=out)
+
+
+def public_methods(cls):
+    """The names of the public functions defined in cls itself."""
+    return [name for name, value in vars(cls).items()
+            if inspect.isfunction(value) and not name.startswith('_')]
+
+
+def controller_targets():
+    """(class, method names) for every controller class."""
+    from controller import Controller
+
+    classes, targets = [Controller], []
+    while classes:
+        cls = classes.pop()
+        targets.append((cls, public_methods(cls)))
+        classes.extend(cls.__subclasses__())
+    return targets
+
+
+def view_targets(view_class):
+    """(view_class, names of its create_*_ui methods)."""
+    return [(view_class, [name for name in dir(view_class)
+                          if name.startswith('create_') and name.endswith('_ui')])]
+
+
+def instrument_all(metrics, view_class, printer_class=None):
+    """
+    Times the controllers, the screens of view_class, Bill.update_items and
+    the printer's tape updates. Printer.print only queues a job for the
+    spooler, so it is the tape work on the GUI thread, poll and write_tape,
+    that is timed.
+    """
+    from model import Bill
+
+    targets = controller_targets() + view_targets(view_class) + [(Bill, ['update_items'])]
+    if printer_class is not None:
+        targets.append((printer_class, ['poll', 'write_tape']))
+    for cls, names in targets:
+        metrics.instrument(cls, names)
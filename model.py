@@ -8,19 +8,161 @@ Submission date: [date here]
 Original code by EEE320 instructors.
 """
 
+import threading
+from enum import IntEnum
+from fractions import Fraction
+
 from constants import TABLES, MENU_ITEMS
 
 
-class Restaurant:
+class ModelEvent:
+    """
+    Base class of the change events published by the model. Every event
+    carries the affected table and, where relevant, the seat number and the
+    OrderItem involved.
+    """
+
+    def __init__(self, table, seat=None, item=None):
+        self.table = table
+        self.seat = seat
+        self.item = item
+
+
+class ItemAdded(ModelEvent):
+    """index is None when the item was appended to the order."""
+
+    def __init__(self, table, seat, item, index=None):
+        super().__init__(table, seat, item)
+        self.index = index
+
+
+class ItemRemoved(ModelEvent):
+
+    def __init__(self, table, seat, item, index):
+        super().__init__(table, seat, item)
+        self.index = index
+
+
+class ItemStateChanged(ModelEvent):
+
+    def __init__(self, table, seat, item, old_state, new_state):
+        super().__init__(table, seat, item)
+        self.old_state = old_state
+        self.new_state = new_state
+
+
+class TableCleared(ModelEvent):
+    pass
+
+
+class BillsMerged(ModelEvent):
+
+    def __init__(self, table, bill, seats):
+        super().__init__(table)
+        self.bill = bill
+        self.seats = seats
+
+
+class RestaurantReconfigured(ModelEvent):
+    """The layout or the menu changed; table is None."""
+
+    def __init__(self, changed_tables):
+        super().__init__(None)
+        self.changed_tables = changed_tables
+
+
+class EventBus:
+    """
+    Delivers model events to the handlers subscribed to their type. A handler
+    subscribed to a base class, e.g. ModelEvent, receives every subclass.
+
+    Events are published from whichever thread changed the model, while it
+    holds the lock of the table concerned. Subscription replaces the handler
+    lists rather than changing them, so publishing needs no lock.
+    """
 
     def __init__(self):
+        self.handlers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, event_type, handler):
+        with self.lock:
+            self.handlers[event_type] = self.handlers.get(event_type, []) + [handler]
+
+    def unsubscribe(self, event_type, handler):
+        with self.lock:
+            handlers = list(self.handlers[event_type])
+            handlers.remove(handler)
+            self.handlers[event_type] = handlers
+
+    def publish(self, event):
+        for event_type in type(event).__mro__:
+            for handler in self.handlers.get(event_type, ()):
+                handler(event)
+
+
+class Restaurant:
+
+    def __init__(self, tables=TABLES, menu_items=MENU_ITEMS):
         super().__init__()
-        self.tables = [Table(seats, loc) for seats, loc in TABLES]
-        self.menu_items = [MenuItem(name, price) for name, price in MENU_ITEMS]
+        self.events = EventBus()
+        self.tables = [Table(seats, loc, ix, self.events) for ix, (seats, loc) in enumerate(tables)]
+        self.menu = MenuCatalog(menu_items)
         self.views = []
+        self.history = None
+        self.commands = None
+        self.layout_version = 0
+
+    @property
+    def menu_items(self):
+        """The menu items in menu order; looked up by position in journals and requests."""
+        return self.menu.items
+
+    def reconfigure(self, tables, menu_items):
+        """
+        Applies a new layout and menu without losing open orders. Tables are
+        matched by position and only those whose seats or location changed
+        are touched; menu items are matched by name and updated in place, so
+        orders and bills keep referring to them. Open orders are totalled
+        again at the new prices; bills keep the shares they were charged.
+        Raises ValueError, changing
+        nothing, if a table, seat or menu item that would disappear is in
+        use by an order.
+        Returns the tables that changed.
+        """
+        for table in self.tables[len(tables):]:
+            if table.occupied_seats:
+                raise ValueError(f'Table {table.number} has orders and cannot be removed')
+        for table, (n_seats, _) in zip(self.tables, tables):
+            if any(seat >= n_seats for seat in table.occupied_seats):
+                raise ValueError(f'Table {table.number} has orders for seats that would be removed')
+        names = {entry[0] for entry in menu_items}
+        for table in self.tables:
+            for order in table.orders:
+                for item in order.items:
+                    if item.details.name not in names:
+                        raise ValueError(f'{item.details.name} is on an open order and cannot be removed')
+        changed = []
+        for table, (n_seats, location) in zip(self.tables, tables):
+            if (table.n_seats, table.location) != (n_seats, location):
+                table.resize(n_seats)
+                table.location = location
+                changed.append(table)
+        del self.tables[len(tables):]
+        for ix in range(len(self.tables), len(tables)):
+            n_seats, location = tables[ix]
+            self.tables.append(Table(n_seats, location, ix, self.events))
+            changed.append(self.tables[-1])
+        if self.menu.update(menu_items):
+            for table in self.tables:
+                for order in table.orders:
+                    order.update_total()
+        self.layout_version += 1
+        self.events.publish(RestaurantReconfigured(changed))
+        return changed
 
     def add_view(self, view):
-        self.views.append(view)
+        self.views = self.views + [view]
 
     def notify_views(self):
         for view in self.views:
@@ -28,56 +170,138 @@ class Restaurant:
 
 
 class Table:
+    """
+    A table and the orders of its seats. The table keeps the number of
+    ordered-but-unserved items and the set of seats with an order up to date
+    as its orders change, so the queries used when drawing are constant-time.
+
+    Changes to the table, its orders and their items are made while holding
+    the table's lock, so different tables can be changed concurrently.
+    """
 
-    def __init__(self, n_seats, location):
+    def __init__(self, n_seats, location, number=None, events=None):
         self.n_seats = n_seats
         self.location = location
-        self.orders = [Order(i) for i in range(n_seats)]
+        self.number = number
+        self.events = events
+        self.lock = threading.RLock()
+        self.active_items = 0
+        self.occupied_seats = set()
+        self.orders = [Order(i, self) for i in range(n_seats)]
+
+    def publish(self, event):
+        if self.events is not None:
+            self.events.publish(event)
 
     def has_any_active_orders(self):
-        for order in self.orders:
-            for item in order.items:
-                if item.has_been_ordered() and not item.has_been_served():
-                    return True
-        return False
+        return self.active_items > 0
 
     def has_order_for(self, seat):
-        return bool(self.orders[seat].items)
+        return seat in self.occupied_seats
 
     def order_for(self, seat):
         return self.orders[seat]
 
+    def resize(self, n_seats):
+        """Adds or removes seats at the end; removed seats must not have orders."""
+        with self.lock:
+            del self.orders[n_seats:]
+            self.orders.extend(Order(i, self) for i in range(len(self.orders), n_seats))
+            self.n_seats = n_seats
+
     def clear_table(self):
-        self.orders.clear()
-        self.orders = [Order(i) for i in range(self.n_seats)]
+        with self.lock:
+            for order in self.orders:
+                order.table = None  # e.g. still on a bill, but no longer counted at this table
+            self.orders.clear()
+            self.orders = [Order(i, self) for i in range(self.n_seats)]
+            self.active_items = 0
+            self.occupied_seats.clear()
+            self.publish(TableCleared(self))
+
+
+# Orders not at a table, e.g. in tests and benchmarks, share one lock
+# rather than each allocating its own.
+DETACHED_ORDER_LOCK = threading.RLock()
 
 
 class Order:
+    __slots__ = ('items', 'seat_number', 'table', 'active_items', 'total_cents', 'lock')
 
-    def __init__(self, seat_number):
+    def __init__(self, seat_number, table=None):
         self.items = []
         self.seat_number = seat_number
+        self.table = table
+        self.active_items = 0
+        self.total_cents = 0
+        self.lock = table.lock if table is not None else DETACHED_ORDER_LOCK
+
+    def publish(self, event):
+        if self.table is not None:
+            self.table.publish(event)
 
     def add_item(self, menu_item):
-        item = OrderItem(menu_item)
-        self.items.append(item)
+        with self.lock:
+            item = OrderItem(menu_item, self)
+            self.items.append(item)
+            self.total_cents += menu_item.price_cents
+            if self.table is not None:
+                self.table.occupied_seats.add(self.seat_number)
+            self.publish(ItemAdded(self.table, self.seat_number, item))
+
+    def insert_item(self, item, index, state=None):
+        """
+        Puts an OrderItem, e.g. one removed earlier, back at index as
+        unordered, then takes it through the usual transitions up to state,
+        if given, publishing each step.
+        """
+        with self.lock:
+            item.order = self
+            item.state = UNORDERED
+            self.items.insert(index, item)
+            self.total_cents += item.details.price_cents
+            if self.table is not None:
+                self.table.occupied_seats.add(self.seat_number)
+            self.publish(ItemAdded(self.table, self.seat_number, item, index))
+            while state is not None and item.state < state:
+                item.change_state(ItemState(item.state + 1))
 
     def remove_item(self, menu_item):
-        self.items.remove(menu_item)
+        with self.lock:
+            index = self.items.index(menu_item)
+            del self.items[index]
+            self.total_cents -= menu_item.details.price_cents
+            if menu_item.is_active():
+                self.adjust_active_items(-1)
+            if self.table is not None and not self.items:
+                self.table.occupied_seats.discard(self.seat_number)
+            self.publish(ItemRemoved(self.table, self.seat_number, menu_item, index))
+
+    def adjust_active_items(self, delta):
+        self.active_items += delta
+        if self.table is not None:
+            self.table.active_items += delta
 
     def place_new_orders(self):
-        for item in self.unordered_items():
-            item.mark_as_ordered()
+        with self.lock:
+            for item in self.unordered_items():
+                item.mark_as_ordered()
 
     def remove_unordered_items(self):
-        for item in self.unordered_items():
-            self.items.remove(item)
+        with self.lock:
+            for item in self.unordered_items():
+                self.remove_item(item)
 
     def unordered_items(self):
         return [item for item in self.items if not item.has_been_ordered()]
 
+    def update_total(self):
+        """Recomputes total_cents from the current menu prices, e.g. after a price change."""
+        with self.lock:
+            self.total_cents = sum(item.details.price_cents for item in self.items)
+
     def total_cost(self):
-        return sum((item.details.price for item in self.items))
+        return self.total_cents / 100
 
     def is_empty(self):
         for item in self.items:
@@ -86,61 +310,382 @@ class Order:
         return True
 
 
+class ItemState(IntEnum):
+    UNORDERED = 0
+    ORDERED = 1
+    SERVED = 2
+
+
+# Module-level aliases: looking a member up on an Enum class is several times
+# slower than a global lookup, and these comparisons run on every redraw.
+UNORDERED, ORDERED, SERVED = ItemState
+
+
+# The states each state may move to; anything else is a programming error.
+ITEM_TRANSITIONS = {
+    UNORDERED: {ORDERED},
+    ORDERED: {SERVED},
+    SERVED: set(),
+}
+
+
 class OrderItem:
+    __slots__ = ('details', 'state', 'order')
 
-    def __init__(self, menu_item):
+    def __init__(self, menu_item, order=None):
         self.details = menu_item
-        self.state = "unordered"
+        self.state = UNORDERED
+        self.order = order
 
     def mark_as_ordered(self):
-        self.state = "ordered"
+        self.change_state(ORDERED)
+
+    def mark_as_served(self):
+        self.change_state(SERVED)
+
+    def change_state(self, new_state):
+        if self.order is None:
+            self.set_state(new_state)
+            return
+        with self.order.lock:
+            was_active = self.is_active()
+            old_state = self.set_state(new_state)
+            if was_active != self.is_active():
+                self.order.adjust_active_items(1 if self.is_active() else -1)
+            self.order.publish(ItemStateChanged(self.order.table, self.order.seat_number,
+                                                self, old_state, new_state))
+
+    def set_state(self, new_state):
+        """Validates and makes the transition; returns the previous state."""
+        if new_state not in ITEM_TRANSITIONS[self.state]:
+            raise ValueError(f'An item cannot go from {self.state.name} to {new_state.name}')
+        old_state, self.state = self.state, new_state
+        return old_state
 
     def has_been_ordered(self):
-        return self.state == "ordered"
+        return self.state >= ORDERED
 
     def has_been_served(self):
-        return self.state == "served"
+        return self.state == SERVED
+
+    def is_active(self):
+        """True if the item has been sent to the kitchen but not yet served."""
+        return self.state == ORDERED
 
     def can_be_cancelled(self):
-        return self.state != "served"
+        return self.state != SERVED
 
 
 class MenuItem:
-
-    def __init__(self, name, price):
+    """
+    A dish on the menu. item_id never changes and is never reused, and a
+    MenuCatalog keeps a single MenuItem per id, so orders and bills can
+    refer to menu items by identity.
+    """
+    __slots__ = ('item_id', 'name', 'price_cents', 'category')
+
+    def __init__(self, name, price, category=None, item_id=None):
+        self.item_id = item_id
         self.name = name
-        self.price = price
+        self.price_cents = round(price * 100)
+        self.category = category
+
+    @property
+    def price(self):
+        return self.price_cents / 100
+
+
+class MenuCatalog:
+    """
+    The menu: its items in menu order, indexed by id, name and category.
+    Entries are (name, price) or (name, price, category) tuples. version
+    goes up whenever the menu changes, so that whatever is derived from it,
+    such as the layout of the menu buttons, can be cached per version.
+    """
+
+    def __init__(self, entries=()):
+        self.items = []
+        self.by_id = {}
+        self.by_name = {}
+        self.by_category = {}
+        self.known = {}  # name -> MenuItem, including items since taken off the menu
+        self.version = 0
+        self.next_id = 0
+        self.update(entries)
+
+    def __len__(self):
+        return len(self.items)
+
+    def find(self, name):
+        return self.by_name.get(name)
+
+    def in_category(self, category):
+        return self.by_category.get(category, [])
+
+    def update(self, entries):
+        """
+        Makes the menu match entries. Items are matched by name and updated
+        in place, keeping their ids, also if they were taken off the menu and
+        come back; new names get new ids. Returns True if anything changed.
+        """
+        items = []
+        changed = len(entries) != len(self.items)
+        for ix, (name, price, *category) in enumerate(entries):
+            category = category[0] if category else None
+            item = self.known.get(name)
+            if item is None:
+                item = MenuItem(name, price, category, self.next_id)
+                self.known[name] = item
+                self.next_id += 1
+                changed = True
+            elif (item.price_cents, item.category) != (round(price * 100), category):
+                item.price_cents = round(price * 100)
+                item.category = category
+                changed = True
+            changed = changed or self.items[ix] is not item
+            items.append(item)
+        if not changed:
+            return False
+        self.items = items
+        self.by_id = {item.item_id: item for item in items}
+        self.by_name = {item.name: item for item in items}
+        self.by_category = {}
+        for item in items:
+            self.by_category.setdefault(item.category, []).append(item)
+        self.version += 1
+        return True
+
+
+WHOLE = Fraction(1)
+
+
+class Share:
+    """The part of an OrderItem charged on one bill, and its price in cents."""
+    __slots__ = ('fraction', 'cents')
+
+    def __init__(self, fraction, cents):
+        self.fraction = fraction
+        self.cents = cents
+
+    def is_whole(self):
+        return self.fraction is WHOLE or self.fraction == 1
+
 
 class Bill:
+    """
+    The orders paid together. Bill.shares maps each OrderItem charged on
+    the bill to its Share: usually the whole item, but items can be moved
+    to another bill or split between several. Bill.items maps each MenuItem
+    to the number of whole items of it on the bill; it and the total are
+    kept up to date as shares come and go rather than recomputed. Each bill
+    has its own lock.
+
+    Bill.orders are the seats the bill was made for; the split engine may
+    have moved some of their items elsewhere.
+    """
+
     def __init__(self, order):
-        if order!=None:
-            self.orders = [order]
-        else:
-            self.orders = []
+        self.orders = []
+        self.shares = {}
         self.items = {}
-        self.update_items()
-
-    def add_order(self, order):
-        self.orders.append(order)
-        self.update_items()
+        self.total_cents = 0
+        self.lock = threading.RLock()
+        if order is not None:
+            self.add_order(order)
+
+    def add_order(self, order, shares=None):
+        """Adds order with the given shares of its items, or all of them whole."""
+        with self.lock:
+            self.orders.append(order)
+            pairs = ((item, Share(WHOLE, item.details.price_cents)) for item in order.items) \
+                if shares is None else shares.items()
+            held, counts = self.shares, self.items
+            for item, share in pairs:
+                if item in held or share.fraction is not WHOLE:
+                    self.charge(item, share)
+                    continue
+                # the usual case, inlined as it runs for every item of a table
+                held[item] = share
+                counts[item.details] = counts.get(item.details, 0) + 1
+                self.total_cents += share.cents
 
     def remove_order(self, order):
-        self.orders.remove(order)
-        self.update_items()
+        """Removes order and the shares of its items on this bill; returns those shares."""
+        with self.lock:
+            self.orders.remove(order)
+            return self.discharge_order(order)
+
+    def discharge_order(self, order):
+        held = self.shares
+        taken = {}
+        for item in order.items:
+            share = held.pop(item, None)
+            if share is not None:
+                taken[item] = share
+                self.count(item, share, -1)
+        return taken
+
+    def charge(self, item, share):
+        """Adds share of item to the bill, on top of any share of it already there."""
+        with self.lock:
+            held = self.shares.get(item)
+            if held is not None:
+                self.count(item, held, -1)
+                share = Share(held.fraction + share.fraction, held.cents + share.cents)
+            self.shares[item] = share
+            self.count(item, share, 1)
+
+    def discharge(self, item):
+        """Takes the share of item off the bill and returns it."""
+        with self.lock:
+            share = self.shares.pop(item)
+            self.count(item, share, -1)
+            return share
+
+    def count(self, item, share, sign):
+        if share.fraction is WHOLE or share.fraction == 1:
+            key = item.details
+            quantity = self.items.get(key, 0) + sign
+            if quantity:
+                self.items[key] = quantity
+            else:
+                del self.items[key]
+        self.total_cents += sign * share.cents
 
     def total_cost(self):
-        total = 0.0
-        for item in self.items:
-            total += self.items[item]*item.price
-        return total
+        return self.total_cents / 100
+
+    def partial_shares(self):
+        """The (OrderItem, Share) pairs of the items only partly on this bill."""
+        with self.lock:
+            return [(item, share) for item, share in self.shares.items() if not share.is_whole()]
+
+    def take_orders(self, seat_numbers):
+        """
+        Removes the orders of the given seats from the bill in a single pass
+        over its orders, and returns them as (order, shares) pairs.
+        """
+        with self.lock:
+            kept, taken = [], []
+            for order in self.orders:
+                (taken if order.seat_number in seat_numbers else kept).append(order)
+            self.orders = kept
+            return [(order, self.discharge_order(order)) for order in taken]
 
     def update_items(self):
-        self.items.clear()
-        for order in self.orders:
-            for item in order.items:
-                key = item.details
-                if key in self.items:
-                    self.items[key] += 1
-                else:
-                    self.items[key] = 1
-
+        """Rebuilds the aggregates from scratch, e.g. after editing self.shares directly."""
+        with self.lock:
+            self.items.clear()
+            self.total_cents = 0
+            for item, share in self.shares.items():
+                self.count(item, share, 1)
+
+
+def allocate(cents, weights, offset=0):
+    """
+    Divides cents in proportion to weights, rounding so that the parts add
+    up to cents exactly: each part is rounded down, and the cents left over
+    go to the largest remainders. Ties go to the earliest part, counting
+    from offset, so that successive calls can spread the odd cents around.
+    """
+    total = sum(weights)
+    if total <= 0:
+        raise ValueError('The weights of a split must add up to more than zero')
+    parts, remainders = [], []
+    for weight in weights:
+        part, remainder = divmod(cents * weight, total)
+        parts.append(part)
+        remainders.append(remainder)
+    n = len(weights)
+    order = sorted(range(n), key=lambda ix: (-remainders[ix], (ix - offset) % n))
+    for ix in order[:cents - sum(parts)]:
+        parts[ix] += 1
+    return parts
+
+
+def split_item(item, source, bills, weights=None, offset=0):
+    """
+    Takes the share of item off source and divides it between bills (which
+    may include source), evenly or in proportion to weights. The cents add
+    up exactly to the share that was split.
+    """
+    weights = weights or [1] * len(bills)
+    if len(weights) != len(bills):
+        raise ValueError('A split needs one weight per bill')
+    share = source.discharge(item)
+    total = sum(weights)
+    for bill, weight, cents in zip(bills, weights, allocate(share.cents, weights, offset)):
+        if weight:
+            bill.charge(item, Share(share.fraction * Fraction(weight, total), cents))
+
+
+def move_item(item, source, target):
+    """Moves the share of item on source to target."""
+    target.charge(item, source.discharge(item))
+
+
+def split_bill(bill, parts):
+    """
+    Splits every item of bill into new bills, evenly if parts is a number of
+    bills or in proportion to parts if it is a list of weights. Returns the
+    new bills, which keep the orders of bill so that their seats can still
+    be fused; bill is left empty. Every item is split to the cent, and the
+    odd cents are handed out so that the bill totals are also split exactly
+    as allocate() would split the whole bill.
+    """
+    weights = [1] * parts if isinstance(parts, int) else list(parts)
+    if len(weights) < 2:
+        raise ValueError('A bill must be split in at least two')
+    total = sum(weights)
+    bills = [Bill(None) for _ in weights]
+    with bill.lock:
+        need = allocate(bill.total_cents, weights)
+        plan = []
+        for item, share in bill.shares.items():
+            cents = [share.cents * weight // total for weight in weights]
+            need = [n - c for n, c in zip(need, cents)]
+            plan.append((item, share, cents))
+        for item, share, cents in plan:
+            # each item's odd cents go to the bills furthest below their part of the total
+            for ix in sorted(range(len(weights)), key=lambda ix: -need[ix])[:share.cents - sum(cents)]:
+                cents[ix] += 1
+                need[ix] -= 1
+            bill.discharge(item)
+            for new_bill, weight, amount in zip(bills, weights, cents):
+                if weight:
+                    new_bill.charge(item, Share(share.fraction * Fraction(weight, total), amount))
+        for new_bill in bills:
+            new_bill.orders = list(bill.orders)
+        bill.orders = []
+    return bills
+
+
+def merge_orders(bills, seat_numbers, table=None):
+    """
+    Moves the orders of the given seats out of bills into a new bill, in time
+    linear in the number of orders. Returns the new bill and the bills left
+    without orders. seat_numbers should be a set. Only one bill's lock is
+    held at a time, so concurrent merges cannot deadlock.
+    """
+    new_bill = Bill(None)
+    emptied = []
+    merged = set()
+    for bill in bills:
+        for order, shares in bill.take_orders(seat_numbers):
+            if order in merged:  # also on another bill, e.g. after a split
+                for item, share in shares.items():
+                    new_bill.charge(item, share)
+            else:
+                merged.add(order)
+                new_bill.add_order(order, shares)
+        if not bill.orders and not bill.shares:
+            emptied.append(bill)
+    if table is not None:
+        table.publish(BillsMerged(table, new_bill, seat_numbers))
+    return new_bill, emptied
+
+
+def format_money(cents):
+    sign = '-' if cents < 0 else ''
+    dollars, cents = divmod(abs(cents), 100)
+    return f'{sign}{dollars}.{cents:02d}'
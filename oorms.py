@@ -9,14 +9,58 @@ Submission date: [date here]
 Original code by EEE320 instructors.
 """
 
-import math
+import threading
+import time
 import tkinter as tk
 from abc import ABC
 from tkinter.constants import RAISED
 
+from commands import CommandLog
 from constants import *
 from controller import RestaurantController
-from model import Restaurant
+from model import Restaurant, ModelEvent, format_money
+from printing import PrintSpooler
+from scheduler import UpdateScheduler
+from spatial import Viewport, floor_index, table_geometry
+
+
+class CountingCanvas(tk.Canvas):
+    """
+    A canvas that counts the item operations (creation, deletion,
+    reconfiguration, moves and bindings) issued against it, so that the
+    cost of each view update can be reported.
+    """
+
+    def __init__(self, master, **kw):
+        super().__init__(master, **kw)
+        self.ops = 0
+
+    def _create(self, item_type, args, kw):
+        self.ops += 1
+        return super()._create(item_type, args, kw)
+
+    def delete(self, *args):
+        self.ops += 1
+        super().delete(*args)
+
+    def itemconfigure(self, tag_or_id, cnf=None, **kw):
+        self.ops += 1
+        return super().itemconfigure(tag_or_id, cnf, **kw)
+
+    itemconfig = itemconfigure
+
+    def coords(self, *args):
+        if len(args) > 1:
+            self.ops += 1
+        return super().coords(*args)
+
+    def move(self, *args):
+        self.ops += 1
+        super().move(*args)
+
+    def tag_bind(self, tag_or_id, sequence=None, func=None, add=None):
+        self.ops += 1
+        return super().tag_bind(tag_or_id, sequence, func, add)
 
 
 class RestaurantView(tk.Frame, ABC):
@@ -24,12 +68,13 @@ class RestaurantView(tk.Frame, ABC):
     def __init__(self, master, restaurant, window_width, window_height, controller_class):
         super().__init__(master)
         self.grid()
-        self.canvas = tk.Canvas(self, width=window_width, height=window_height,
-                                borderwidth=0, highlightthickness=0)
+        self.canvas = CountingCanvas(self, width=window_width, height=window_height,
+                                     borderwidth=0, highlightthickness=0)
         self.canvas.grid()
         self.canvas.update()
         self.restaurant = restaurant
         self.restaurant.add_view(self)
+        self.scheduler = UpdateScheduler(self.schedule, self.redraw, MAX_REDRAWS_PER_SECOND)
         self.controller = controller_class(self, restaurant)
         self.controller.create_ui()
 
@@ -39,95 +84,330 @@ class RestaurantView(tk.Frame, ABC):
         x0, y0 = location
         box = self.canvas.create_rectangle(x0, y0, x0 + w, y0 + h, **rect_style)
         label = self.canvas.create_text(x0 + w / 2, y0 + h / 2, text=text, **text_style)
+        action = self.live(action)
         self.canvas.tag_bind(box, '<Button-1>', action)
         self.canvas.tag_bind(label, '<Button-1>', action)
+        return box, label
 
     def update(self):
+        """
+        Requests a redraw. Requests are coalesced and the redraw happens once
+        the Tk event loop is idle, at most MAX_REDRAWS_PER_SECOND times a
+        second.
+        """
+        self.scheduler.request()
+
+    def schedule(self, delay_ms, callback):
+        if delay_ms:
+            self.after(delay_ms, callback)
+        else:
+            self.after_idle(callback)
+
+    def redraw(self):
+        ops_before = self.canvas.ops
+        started = time.perf_counter()
         self.controller.create_ui()
+        self.last_frame_s = time.perf_counter() - started
+        self.last_update_ops = self.canvas.ops - ops_before
 
     def set_controller(self, controller):
         self.controller = controller
+        self.screen_stale = True  # until the screen is drawn for controller
+
+    def live(self, handler):
+        """
+        handler, ignoring the touches that arrive after the controller has
+        changed and before the screen is redrawn for the new one: until then
+        the items on the canvas are those of the old controller's screen.
+        """
+        def guarded(event):
+            if not self.screen_stale:
+                return handler(event)
+        return guarded
 
 
 class ServerView(RestaurantView):
+    """
+    The server's touch screen. Screens are retained between updates: when
+    the controller asks for the screen that is already displayed, only the
+    canvas items whose model objects changed are created, moved,
+    reconfigured or deleted, instead of clearing and rebuilding the canvas.
+    Model events tell the view which tables need to be looked at again.
+    """
 
     def __init__(self, master, restaurant, printer_window):
+        self.init_screens(restaurant)
         super().__init__(master, restaurant, SERVER_VIEW_WIDTH, SERVER_VIEW_HEIGHT, RestaurantController)
         self.printer_window = printer_window
+        self.canvas.bind('<ButtonPress-1>', self.floor_pressed)
+        self.canvas.bind('<B1-Motion>', self.floor_dragged)
+        self.canvas.bind('<ButtonRelease-1>', self.floor_touched)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.canvas.bind(sequence, self.floor_wheeled)
+        centre = SERVER_VIEW_WIDTH / 2, SERVER_VIEW_HEIGHT / 2
+        master.bind('<plus>', lambda event: self.zoom_floor(FLOOR_ZOOM_STEP, *centre))
+        master.bind('<minus>', lambda event: self.zoom_floor(1 / FLOOR_ZOOM_STEP, *centre))
+        master.bind('<Control-z>', lambda event: self.controller.undo())
+        master.bind('<Control-y>', lambda event: self.controller.redo())
+
+    def init_screens(self, restaurant):
+        self.screen = None
+        self.retained = {}
+        self.dirty_tables = set()
+        self.dirty_lock = threading.Lock()
+        self.last_update_ops = 0
+        self.last_frame_s = 0.0
+        self.menu_layout = (None, [])
+        self.menu_page = 0
+        self.floor = None
+        self.floor_version = None
+        self.viewport = Viewport(SERVER_VIEW_WIDTH, SERVER_VIEW_HEIGHT)
+        self.press = None
+        self.dragging = False
+        self.screen_stale = False
+        restaurant.events.subscribe(ModelEvent, self.model_changed)
+
+    def begin_screen(self, key):
+        """
+        Prepares the canvas for drawing the screen identified by key. Returns
+        True if the canvas was cleared and the screen must be built from
+        scratch, False if the retained items of the same screen can be updated
+        in place. A key of None always forces a full rebuild.
+        """
+        self.screen_stale = False
+        if key is not None and key == self.screen:
+            return False
+        self.canvas.delete(tk.ALL)
+        self.screen = key
+        self.retained = {}
+        self.press = None  # a press on the screen left behind is not a touch on this one
+        self.dragging = False
+        self.take_dirty_tables()
+        return True
+
+    def model_changed(self, event):
+        # Events may be published by worker threads; the canvas is only
+        # touched from the Tk thread, when the view is next redrawn.
+        if event.table is None:
+            return  # reconfiguration changes layout_version, forcing a rebuild
+        with self.dirty_lock:
+            self.dirty_tables.add(event.table)
+
+    def take_dirty_tables(self):
+        with self.dirty_lock:
+            dirty, self.dirty_tables = self.dirty_tables, set()
+        return dirty
 
     def create_restaurant_ui(self):
-        self.canvas.delete(tk.ALL)
-        view_ids = []
-        for ix, table in enumerate(self.restaurant.tables):
-            table_id, seat_ids = self.draw_table(table, scale=RESTAURANT_SCALE)
-            view_ids.append((table_id, seat_ids))
-        for ix, (table_id, seat_ids) in enumerate(view_ids):
-            # §54.7 "extra arguments trick" in Tkinter 8.5 reference by Shipman
-            # Used to capture current value of ix as table_index for use when
-            # handler is called (i.e., when screen is clicked).
-            def table_touch_handler(_, table_number=ix):
-                self.controller.table_touched(table_number)
-
-            self.canvas.tag_bind(table_id, '<Button-1>', table_touch_handler)
-            for seat_id in seat_ids:
-                self.canvas.tag_bind(seat_id, '<Button-1>', table_touch_handler)
+        """
+        Draws the tables that intersect the viewport. Panning moves the drawn
+        items and only draws the tables scrolled into view, deleting those
+        scrolled out; zooming rebuilds the screen. Below FLOOR_DETAIL_SCALE
+        seats are left out and a table with orders is shown filled instead.
+        """
+        viewport = self.viewport
+        if self.begin_screen(('restaurant', self.restaurant.layout_version, viewport.scale)):
+            self.retained['tables'] = {}
+        else:
+            for table in self.take_dirty_tables():
+                if table.number in self.retained['tables']:
+                    self.update_floor_table(table, self.retained['tables'][table.number])
+            x0, y0 = self.retained['origin']
+            if (x0, y0) == viewport.origin:
+                return
+            self.canvas.move(tk.ALL, (x0 - viewport.origin[0]) * viewport.scale,
+                             (y0 - viewport.origin[1]) * viewport.scale)
+        self.retained['origin'] = viewport.origin
+        # Clicks on the floor are resolved by floor_touched, through one
+        # canvas binding, instead of binding every table and seat item.
+        drawn = self.retained['tables']
+        visible = {number for number, _ in self.floor_index().overlapping(viewport.world_bounds())}
+        for number in drawn.keys() - visible:
+            table_id, seats, _ = drawn.pop(number)
+            self.canvas.delete(table_id, *(seat_id for seat_id, _ in seats))
+        for number in visible - drawn.keys():
+            drawn[number] = self.draw_floor_table(self.restaurant.tables[number])
+
+    def draw_floor_table(self, table):
+        """Returns [table id, seats as from draw_table, occupied or None if the seats are drawn]."""
+        viewport = self.viewport
+        location = (table.location[0] - viewport.origin[0], table.location[1] - viewport.origin[1])
+        if viewport.shows_seats():
+            table_id, seats = self.draw_table(table, location, viewport.scale)
+            return [table_id, seats, None]
+        table_bbox, _ = table_geometry(table.n_seats, location, viewport.scale)
+        occupied = len(table.occupied_seats) > 0
+        table_id = self.canvas.create_rectangle(*table_bbox, **(FULL_SEAT_STYLE if occupied else TABLE_STYLE))
+        return [table_id, [], occupied]
+
+    def update_floor_table(self, table, drawn):
+        if drawn[2] is None:
+            self.update_seats(table, drawn[1])
+            return
+        occupied = len(table.occupied_seats) > 0
+        if occupied != drawn[2]:
+            self.canvas.itemconfig(drawn[0], **(FULL_SEAT_STYLE if occupied else TABLE_STYLE))
+            drawn[2] = occupied
+
+    def floor_index(self):
+        """The spatial index of the floor in world coordinates, rebuilt only when the layout changes."""
+        if self.floor_version != self.restaurant.layout_version:
+            self.floor = floor_index(self.restaurant.tables)
+            self.floor_version = self.restaurant.layout_version
+        return self.floor
+
+    def floor_at(self, x, y):
+        """
+        Returns (table number, seat number or None) for the floor-plan item
+        at canvas position (x, y), or None.
+        """
+        return self.floor_index().find(*self.viewport.to_world(x, y))
+
+    def on_floor(self):
+        return self.screen is not None and self.screen[0] == 'restaurant'
+
+    def floor_pressed(self, event):
+        if self.on_floor():
+            self.press = (event.x, event.y)
+            self.dragging = False
+
+    def floor_dragged(self, event):
+        if not self.on_floor() or self.press is None:
+            return
+        dx, dy = event.x - self.press[0], event.y - self.press[1]
+        if not self.dragging and max(abs(dx), abs(dy)) < FLOOR_DRAG_THRESHOLD:
+            return
+        self.dragging = True
+        self.press = (event.x, event.y)
+        self.viewport.pan(dx, dy)
+        self.update()
+
+    def floor_touched(self, event):
+        """A press released without dragging touches the table under it."""
+        pressed, self.press = self.press, None
+        if not self.on_floor() or pressed is None or self.dragging or self.screen_stale:
+            return  # the other screens bind their own items
+        hit = self.floor_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if hit is not None:
+            self.controller.table_touched(hit[0])
+
+    def floor_wheeled(self, event):
+        # <MouseWheel> carries a delta; X11 sends buttons 4 and 5 instead
+        up = event.num == 4 if event.num in (4, 5) else event.delta > 0
+        self.zoom_floor(FLOOR_ZOOM_STEP if up else 1 / FLOOR_ZOOM_STEP, event.x, event.y)
+
+    def zoom_floor(self, factor, x, y):
+        if self.on_floor() and self.viewport.zoom(factor, x, y):
+            self.update()
 
     def create_table_ui(self, table):
-        self.canvas.delete(tk.ALL)
-        table_id, seat_ids = self.draw_table(table, location=SINGLE_TABLE_LOCATION)
-        for ix, seat_id in enumerate(seat_ids):
-            def handler(_, seat_number=ix):
-                self.controller.seat_touched(seat_number)
-
-            self.canvas.tag_bind(seat_id, '<Button-1>', handler)
-        self.make_button('Done', action=lambda event: self.controller.done())
+        if self.begin_screen(('table', table, self.restaurant.layout_version)):
+            table_id, seats = self.draw_table(table, location=SINGLE_TABLE_LOCATION)
+            for ix, (seat_id, _) in enumerate(seats):
+                def handler(_, seat_number=ix):
+                    self.controller.seat_touched(seat_number)
+
+                self.canvas.tag_bind(seat_id, '<Button-1>', self.live(handler))
+            self.make_button('Done', action=lambda event: self.controller.done())
+            self.retained['seats'] = seats
+            self.retained['bills_button'] = None
+        elif table in self.take_dirty_tables():
+            self.update_seats(table, self.retained['seats'])
+        else:
+            return
+        self.update_bills_button(table)
+
+    def update_seats(self, table, seats):
+        """
+        Restyles the retained seat ovals of table whose occupancy changed.
+        Each entry of seats is a [canvas id, occupied] pair.
+        """
+        for ix, seat in enumerate(seats):
+            occupied = table.has_order_for(ix)
+            if occupied != seat[1]:
+                style = FULL_SEAT_STYLE if occupied else EMPTY_SEAT_STYLE
+                self.canvas.itemconfig(seat[0], **style)
+                seat[1] = occupied
+
+    def update_bills_button(self, table):
+        button = self.retained['bills_button']
         if table.has_any_active_orders():
-            self.make_button('Create Bills', 
-                action=lambda event: self.controller.make_bills(self.printer_window),
-                location=BUTTON_BOTTOM_LEFT)
-
+            if button is None:
+                self.retained['bills_button'] = self.make_button(
+                    'Create Bills',
+                    action=lambda event: self.controller.make_bills(self.printer_window),
+                    location=BUTTON_BOTTOM_LEFT)
+        elif button is not None:
+            for item_id in button:
+                self.canvas.delete(item_id)
+            self.retained['bills_button'] = None
 
     def draw_table(self, table, location=None, scale=1):
-        offset_x0, offset_y0 = location if location else table.location
-        seats_per_side = math.ceil(table.n_seats / 2)
-        table_height = SEAT_DIAM * seats_per_side + SEAT_SPACING * (seats_per_side - 1)
-        table_x0 = SEAT_DIAM + SEAT_SPACING
-        table_bbox = scale_and_offset(table_x0, 0, TABLE_WIDTH, table_height,
-                                      offset_x0, offset_y0, scale)
+        table_bbox, seat_bboxes = table_geometry(table.n_seats, location or table.location, scale)
         table_id = self.canvas.create_rectangle(*table_bbox, **TABLE_STYLE)
-        far_seat_x0 = table_x0 + TABLE_WIDTH + SEAT_SPACING
-        seat_ids = []
-        for ix in range(table.n_seats):
-            seat_x0 = (ix % 2) * far_seat_x0
-            seat_y0 = (ix // 2 * (SEAT_DIAM + SEAT_SPACING) +
-                       (table.n_seats % 2) * (ix % 2) * (SEAT_DIAM + SEAT_SPACING) / 2)
-            seat_bbox = scale_and_offset(seat_x0, seat_y0, SEAT_DIAM, SEAT_DIAM,
-                                         offset_x0, offset_y0, scale)
-            style = FULL_SEAT_STYLE if table.has_order_for(ix) else EMPTY_SEAT_STYLE
+        seats = []
+        for ix, seat_bbox in enumerate(seat_bboxes):
+            occupied = table.has_order_for(ix)
+            style = FULL_SEAT_STYLE if occupied else EMPTY_SEAT_STYLE
             seat_id = self.canvas.create_oval(*seat_bbox, **style)
-            seat_ids.append(seat_id)
-        return table_id, seat_ids
+            seats.append([seat_id, occupied])
+        return table_id, seats
 
     def create_order_ui(self, order):
-        self.canvas.delete(tk.ALL)
-        for ix, item in enumerate(self.restaurant.menu_items):
-            w, h, margin = MENU_ITEM_SIZE
-            x0 = margin
-            y0 = margin + (h + margin) * ix
-
-            def handler(_, menuitem=item):
-                self.controller.add_item(menuitem)
-
-            self.make_button(item.name, handler, (w, h), (x0, y0))
+        pages = self.menu_pages()
+        self.menu_page = min(self.menu_page, len(pages) - 1)
+        if self.begin_screen(('order', order, self.restaurant.menu.version, self.menu_page)):
+            size = MENU_ITEM_SIZE[:2]
+            for name, handler, location in pages[self.menu_page]:
+                self.make_button(name, handler, size, location)
+            if len(pages) > 1:
+                self.draw_menu_paging(len(pages))
+            self.make_button('Cancel', lambda event: self.controller.cancel_changes(), location=BUTTON_BOTTOM_LEFT)
+            self.make_button('Update Order', lambda event: self.controller.update_order())
+            self.retained['lines'] = {}
+            self.retained['total'] = None
         self.draw_order(order)
-        self.make_button('Cancel', lambda event: self.controller.cancel_changes(), location=BUTTON_BOTTOM_LEFT)
-        self.make_button('Update Order', lambda event: self.controller.update_order())
+
+    def menu_pages(self):
+        """
+        The menu buttons, as pages of (label, handler, location), computed
+        once per version of the menu. The handlers look up the controller
+        when called, so they can be reused by every order screen.
+        """
+        menu = self.restaurant.menu
+        if self.menu_layout[0] != menu.version:
+            w, h, margin = MENU_ITEM_SIZE
+            pages = []
+            for start in range(0, max(len(menu.items), 1), MENU_PAGE_SIZE):
+                page = []
+                for ix, item in enumerate(menu.items[start:start + MENU_PAGE_SIZE]):
+                    def handler(_, menuitem=item):
+                        self.controller.add_item(menuitem)
+
+                    page.append((item.name, handler, (margin, margin + (h + margin) * ix)))
+                pages.append(page)
+            self.menu_layout = (menu.version, pages)
+        return self.menu_layout[1]
+
+    def draw_menu_paging(self, n_pages):
+        w, h, margin = MENU_ITEM_SIZE
+        y0 = margin + (h + margin) * MENU_PAGE_SIZE
+        half = (w - margin) / 2
+
+        def turn(step):
+            self.menu_page = (self.menu_page + step) % n_pages
+            self.update()
+
+        self.make_button('<', lambda event: turn(-1), (half, h), (margin, y0))
+        self.make_button(f'{self.menu_page + 1}/{n_pages} >', lambda event: turn(1), (half, h),
+                         (margin + half + margin, y0))
 
     def create_bills_ui(self, bills, current_bill):
-        self.canvas.delete(tk.ALL)
+        self.begin_screen(None)
         self.make_button('Print Bill', lambda event: self.controller.print_bill(self.controller.current_bill), location=BUTTON_BOTTOM_RIGHT3)
         self.make_button('Fuse Bills', lambda event: self.controller.fuse_bills(), location=BUTTON_BOTTOM_RIGHT2)
         self.make_button('Done', lambda event: self.controller.done(), location=BUTTON_BOTTOM_RIGHT)
+        self.make_button('Split Bill', lambda event: self.controller.split_current(), location=BUTTON_BOTTOM_LEFT)
         self.canvas.grid(row=0, column=0)
         self.current = self.controller.current_bill
         self.draw_order_bill(current_bill)
@@ -153,64 +433,102 @@ class ServerView(RestaurantView):
                 )
 
     def draw_order(self, order):
+        """
+        Brings the retained order lines in line with order: lines of removed
+        items are deleted, lines of new items are created, and existing lines
+        are only moved or restyled when their row or state changed.
+        """
         x0, h, m = ORDER_ITEM_LOCATION
+        lines = self.retained['lines']
+        current = set(order.items)
+        for key in [key for key in lines if key not in current]:
+            for item_id in lines.pop(key)['ids']:
+                self.canvas.delete(item_id)
         for ix, item in enumerate(order.items):
             y0 = m + ix * h
-            self.canvas.create_text(x0, y0, text=item.details.name,
-                                    anchor=tk.NW)
-            dot_style = ORDERED_STYLE if item.has_been_ordered() else NOT_YET_ORDERED_STYLE
-            self.canvas.create_oval(x0 - DOT_SIZE - DOT_MARGIN, y0, x0 - DOT_MARGIN, y0 + DOT_SIZE, **dot_style)
-            if item.can_be_cancelled():
-
-                def handler(_, cancelled_item=item):
-                    self.controller.remove(cancelled_item)
-
-                self.make_button('X', handler, size=CANCEL_SIZE, rect_style=CANCEL_STYLE,
-                                 location=(x0 - 2*(DOT_SIZE + DOT_MARGIN), y0))
-        self.canvas.create_text(x0, m + len(order.items) * h,
-                                text=f'Total: {order.total_cost():.2f}',
-                                anchor="nw")
+            line = lines.get(item)
+            if line is None:
+                lines[item] = self.draw_order_line(item, x0, y0)
+                continue
+            if line['y0'] != y0:
+                for item_id in line['ids']:
+                    self.canvas.move(item_id, 0, y0 - line['y0'])
+                line['y0'] = y0
+            if line['ordered'] != item.has_been_ordered():
+                line['ordered'] = item.has_been_ordered()
+                dot_style = ORDERED_STYLE if line['ordered'] else NOT_YET_ORDERED_STYLE
+                self.canvas.itemconfig(line['dot'], **dot_style)
+            if line['cancel'] and not item.can_be_cancelled():
+                for item_id in line['cancel']:
+                    self.canvas.delete(item_id)
+                    line['ids'].remove(item_id)
+                line['cancel'] = ()
+        text = f'Total: {format_money(order.total_cents)}'
+        y0 = m + len(order.items) * h
+        total = self.retained['total']
+        if total is None:
+            total_id = self.canvas.create_text(x0, y0, text=text, anchor="nw")
+            self.retained['total'] = [total_id, text, y0]
+        else:
+            total_id, old_text, old_y0 = total
+            if old_y0 != y0:
+                self.canvas.move(total_id, 0, y0 - old_y0)
+                total[2] = y0
+            if old_text != text:
+                self.canvas.itemconfig(total_id, text=text)
+                total[1] = text
+
+    def draw_order_line(self, item, x0, y0):
+        text_id = self.canvas.create_text(x0, y0, text=item.details.name,
+                                          anchor=tk.NW)
+        dot_style = ORDERED_STYLE if item.has_been_ordered() else NOT_YET_ORDERED_STYLE
+        dot_id = self.canvas.create_oval(x0 - DOT_SIZE - DOT_MARGIN, y0, x0 - DOT_MARGIN, y0 + DOT_SIZE, **dot_style)
+        cancel = ()
+        if item.can_be_cancelled():
+
+            def handler(_, cancelled_item=item):
+                self.controller.remove(cancelled_item)
+
+            cancel = self.make_button('X', handler, size=CANCEL_SIZE, rect_style=CANCEL_STYLE,
+                                      location=(x0 - 2*(DOT_SIZE + DOT_MARGIN), y0))
+        return {'ids': [text_id, dot_id, *cancel], 'dot': dot_id, 'cancel': cancel,
+                'y0': y0, 'ordered': item.has_been_ordered()}
 
     def draw_order_bill(self, bill):
+        """Lists the items of bill; touching a whole item moves one of it to the next bill."""
         x0, h, m = ORDER_ITEM_LOCATION
-        for ix, item in enumerate(bill.items):
+        lines = [(f"{quantity} X {item.name}", item) for item, quantity in bill.items.items()]
+        lines += [(f"{share.fraction} X {item.details.name} {format_money(share.cents)}", None)
+                  for item, share in bill.partial_shares()]
+        for ix, (text, menu_item) in enumerate(lines):
             y0 = m + ix * h
-            self.canvas.create_text(x0, y0, text=f"{bill.items[item]} X {item.name}",
-                                    anchor="nw")
+            text_id = self.canvas.create_text(x0, y0, text=text, anchor="nw")
             dot_style = ORDERED_STYLE
             self.canvas.create_oval(x0 - DOT_SIZE - DOT_MARGIN, y0, x0 - DOT_MARGIN, y0 + DOT_SIZE, **dot_style)
+            if menu_item is not None:
+                self.canvas.tag_bind(text_id, '<Button-1>', self.live(
+                    lambda event, menu_item=menu_item: self.controller.move_to_next_bill(menu_item)))
 
-        self.canvas.create_text(x0, m + len(bill.items) * h,
-                                text=f'Total: {bill.total_cost():.2f}',
+        self.canvas.create_text(x0, m + len(lines) * h,
+                                text=f'Total: {format_money(bill.total_cents)}',
                                 anchor="nw")
 
     def create_fusion_ui(self, table):
-        self.canvas.delete(tk.ALL)
-        self.controller.table_id, self.controller.seat_ids = self.draw_table_fusion(table, location=SINGLE_TABLE_LOCATION)
+        self.begin_screen(None)
+        self.controller.set_seat_ids(*self.draw_table_fusion(table, location=SINGLE_TABLE_LOCATION))
         for seat_no, seat_id in self.controller.seat_ids.items():
             if seat_id is None:
                 continue
             def handler(event, seat_id=seat_id):
                 self.controller.seat_touched(seat_id)
-            self.canvas.tag_bind(seat_id, '<Button-1>', handler)
+            self.canvas.tag_bind(seat_id, '<Button-1>', self.live(handler))
         self.make_button('Done', lambda event: self.controller.done(), location=BUTTON_BOTTOM_RIGHT)
 
     def draw_table_fusion(self, table, location=None, scale=1):
-        offset_x0, offset_y0 = location if location else table.location
-        seats_per_side = math.ceil(table.n_seats / 2)
-        table_height = SEAT_DIAM * seats_per_side + SEAT_SPACING * (seats_per_side - 1)
-        table_x0 = SEAT_DIAM + SEAT_SPACING
-        table_bbox = scale_and_offset(table_x0, 0, TABLE_WIDTH, table_height,
-                                      offset_x0, offset_y0, scale)
+        table_bbox, seat_bboxes = table_geometry(table.n_seats, location or table.location, scale)
         table_id = self.canvas.create_rectangle(*table_bbox, **TABLE_STYLE)
-        far_seat_x0 = table_x0 + TABLE_WIDTH + SEAT_SPACING
         seat_ids = {} #dictionnary of key=seat_no and value=seat_id
-        for ix in range(table.n_seats):
-            seat_x0 = (ix % 2) * far_seat_x0
-            seat_y0 = (ix // 2 * (SEAT_DIAM + SEAT_SPACING) +
-                       (table.n_seats % 2) * (ix % 2) * (SEAT_DIAM + SEAT_SPACING) / 2)
-            seat_bbox = scale_and_offset(seat_x0, seat_y0, SEAT_DIAM, SEAT_DIAM,
-                                         offset_x0, offset_y0, scale)
+        for ix, seat_bbox in enumerate(seat_bboxes):
             style = EMPTY_SEAT_STYLE
             if table.has_order_for(ix):
                 seat_id = self.canvas.create_oval(*seat_bbox, **style)
@@ -233,6 +551,10 @@ class Printer(tk.Frame):
     Simulates a physical printer with a monospaced font, a maximum of 40 characters
     wide. To print, call the print() method passing the desired text as a parameter.
     The text may include \n (newline) characters to indicate line breaks.
+
+    Printing is spooled: print() and print_job() return at once, jobs are
+    formatted on a worker thread, and completed jobs are written to the tape
+    in one batch. Only the last TAPE_HISTORY_LINES lines are kept.
     """
 
     def __init__(self, master):
@@ -245,34 +567,196 @@ class Printer(tk.Frame):
                             width=TAPE_WIDTH, height=VISIBLE_LINES)
         self.tape.grid(row=0, column=0, sticky=tk.N + tk.S + tk.E + tk.W)
         scrollbar.config(command=self.tape.yview)
+        self.spooler = PrintSpooler()
+        self.polling = False
 
     def print(self, text):
+        self.print_job(text)
+
+    def print_job(self, job):
+        """Queues job, the text to print or a callable returning it, to be run off the UI thread."""
+        self.spooler.submit(job)
+        if not self.polling:
+            self.polling = True
+            self.after(PRINTER_POLL_MS, self.poll)
+
+    def poll(self):
+        texts = self.spooler.take_completed()
+        if texts:
+            self.write_tape(''.join(text + '\n' for text in texts))
+        if self.spooler.outstanding:
+            self.after(PRINTER_POLL_MS, self.poll)
+        else:
+            self.polling = False
+
+    def write_tape(self, text):
         self.tape['state'] = tk.NORMAL
         self.tape.insert(tk.END, text)
-        self.tape.insert(tk.END, '\n')
+        excess = int(self.tape.index('end-1c').split('.')[0]) - TAPE_HISTORY_LINES
+        if excess > 0:
+            self.tape.delete('1.0', f'{excess + 1}.0')
         self.tape['state'] = tk.DISABLED
         self.tape.see(tk.END)
 
 
-def scale_and_offset(x0, y0, width, height, offset_x0, offset_y0, scale):
-    return ((offset_x0 + x0) * scale,
-            (offset_y0 + y0) * scale,
-            (offset_x0 + x0 + width) * scale,
-            (offset_y0 + y0 + height) * scale)
+class KitchenView(tk.Frame):
+    """
+    The kitchen's screen: the open tickets, oldest first. Touching a ticket
+    moves it on from queued to fired to ready to served; "Fire next" fires
+    the ticket at the front of the queue. The queue is fed from other
+    threads, so the screen polls it and redraws only when it has changed.
+    """
+
+    def __init__(self, master, queue):
+        super().__init__(master)
+        self.grid()
+        self.canvas = CountingCanvas(self, width=KITCHEN_VIEW_WIDTH, height=KITCHEN_VIEW_HEIGHT,
+                                     borderwidth=0, highlightthickness=0)
+        self.canvas.grid()
+        self.queue = queue
+        self.drawn_version = None
+        self.poll()
+
+    def poll(self):
+        if self.queue.version != self.drawn_version:
+            self.drawn_version = self.queue.version
+            self.draw()
+        self.after(KITCHEN_POLL_MS, self.poll)
+
+    def draw(self):
+        self.canvas.delete(tk.ALL)
+        now = self.queue.clock()
+        with self.queue.lock:
+            cards = [(ticket, [f'#{ticket.number}  Table {ticket.table.number}  '
+                               f'{ticket.state.name.lower()}  {int(now - ticket.placed_at) // 60} min'] +
+                      [f'   seat {item.order.seat_number}: {item.details.name}' for item in ticket.items])
+                     for ticket in self.queue.tickets()]
+        y = TICKET_MARGIN
+        for ticket, lines in cards:
+            height = TICKET_LINE_HEIGHT * len(lines) + TICKET_MARGIN
+            if y + height > KITCHEN_VIEW_HEIGHT - BUTTON_SIZE[1] - 2 * TICKET_MARGIN:
+                break
+            card = self.canvas.create_rectangle(TICKET_MARGIN, y, TICKET_MARGIN + TICKET_WIDTH - 2 * TICKET_MARGIN,
+                                                y + height, **TICKET_STYLES[ticket.state])
+            text = self.canvas.create_text(2 * TICKET_MARGIN, y + TICKET_MARGIN / 2, text='\n'.join(lines),
+                                           anchor='nw')
+            for item_id in (card, text):
+                self.canvas.tag_bind(item_id, '<Button-1>', lambda event, ticket=ticket: self.advance(ticket))
+            y += height + TICKET_MARGIN
+        x0, y0 = TICKET_MARGIN, KITCHEN_VIEW_HEIGHT - BUTTON_SIZE[1] - TICKET_MARGIN
+        box = self.canvas.create_rectangle(x0, y0, x0 + BUTTON_SIZE[0], y0 + BUTTON_SIZE[1], **BUTTON_STYLE)
+        label = self.canvas.create_text(x0 + BUTTON_SIZE[0] / 2, y0 + BUTTON_SIZE[1] / 2, text='Fire next',
+                                        **BUTTON_TEXT_STYLE)
+        for item_id in (box, label):
+            self.canvas.tag_bind(item_id, '<Button-1>', lambda event: self.queue.fire_next())
+
+    def advance(self, ticket):
+        step = {'QUEUED': self.queue.fire, 'FIRED': self.queue.ready, 'READY': self.queue.serve}.get(ticket.state.name)
+        if step is None:
+            return  # served or cancelled since the last poll
+        step(ticket)
+        self.queue.restaurant.notify_views()  # served items change the server's screens
 
 
 if __name__ == "__main__":
+    import argparse
+    import sys
+
+    started = time.perf_counter()
+
+    if sys.argv[1:2] == ['reprint']:
+        from reprint import main
+
+        main(sys.argv[2:])
+        sys.exit()
+
+    parser = argparse.ArgumentParser(description='Object-oriented Restaurant Management System. '
+                                                 'Run "oorms.py reprint -h" for the batch reprint.')
+    parser.add_argument('--state-dir', help='directory in which to keep a journal of the restaurant state, '
+                                            'restored on startup')
+    parser.add_argument('--history', help='SQLite database in which to keep the closed bills')
+    parser.add_argument('--config', help='JSON or TOML file with the tables and menu, reloaded when it changes')
+    parser.add_argument('--kitchen', action='store_true', help='also open the kitchen display')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='report import times and time to first frame, then exit')
+    parser.add_argument('--metrics', action='store_true',
+                        help='time the controllers and screens, reporting on F10 and on exit; '
+                             'F9 starts and stops a cProfile profile')
+    parser.add_argument('--slow-ms', type=float,
+                        help='with --metrics, write a profile of each tap taking this long or longer')
+    parser.add_argument('--exit-after-first-frame', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.profile_startup:
+        from startup import profile_startup
+
+        profile_startup(__file__, [arg for arg in sys.argv[1:] if arg != '--profile-startup'])
+        sys.exit()
+
+    def stage(name):
+        if args.exit_after_first_frame:
+            print('stage', name, time.perf_counter() - started)
+
     root = tk.Tk()
 
     printer_window = tk.Toplevel()
     printer_proxy = Printer(printer_window)
     printer_window.title('Printer Tape')
     printer_window.wm_resizable(0, 0)
-
-    restaurant_info = Restaurant()
+    stage('tk_ready')
+
+    watcher = None
+    if args.config:
+        from config import ConfigWatcher, load_config
+
+        config = load_config(args.config)
+        restaurant_info = Restaurant(config.tables, config.menu_items)
+        watcher = ConfigWatcher(args.config, restaurant_info, on_error=lambda error: print(error, file=sys.stderr))
+
+        def poll_config():
+            if watcher.poll():
+                restaurant_info.notify_views()
+            root.after(CONFIG_POLL_MS, poll_config)
+
+        root.after(CONFIG_POLL_MS, poll_config)
+    else:
+        restaurant_info = Restaurant()
+    restaurant_info.commands = CommandLog()
+    journal = None
+    if args.state_dir:
+        from persistence import Journal
+
+        journal = Journal(args.state_dir)
+        journal.open(restaurant_info)
+
+        def sync_journal():
+            journal.sync()
+            root.after(JOURNAL_SYNC_MS, sync_journal)
+
+        sync_journal()
+    if args.history:
+        from history import BillHistory
+
+        restaurant_info.history = BillHistory(args.history)
+    if args.kitchen:
+        from kitchen import KitchenQueue
+
+        kitchen_window = tk.Toplevel()
+        KitchenView(kitchen_window, KitchenQueue(restaurant_info))
+        kitchen_window.title('Kitchen')
+        kitchen_window.wm_resizable(0, 0)
+    stage('state_loaded')
+    metrics = None
+    if args.metrics:
+        from metrics import Metrics, instrument_all
+
+        metrics = Metrics(None if args.slow_ms is None else args.slow_ms / 1000)
+        instrument_all(metrics, ServerView, Printer)
+        root.bind('<F9>', lambda event: metrics.toggle_profile())
+        root.bind('<F10>', lambda event: metrics.report())
     ServerView(root, restaurant_info, printer_proxy)
     root.title('Server View v2')
     root.wm_resizable(0, 0)
+    stage('view_built')
 
     # nicely align the two windows
     root.update_idletasks()
@@ -283,4 +767,14 @@ if __name__ == "__main__":
     sy = root.winfo_y()
     printer_window.geometry(f'{pw}x{ph}+{sx+sw+10}+{sy}')
 
-    root.mainloop()
+    if args.exit_after_first_frame:
+        root.update()  # runs the idle redraw scheduled by the view
+        stage('first_frame')
+        root.destroy()
+    else:
+        root.mainloop()
+    if journal:
+        journal.close()
+    if metrics:
+        metrics.stop_profile()
+        metrics.report()
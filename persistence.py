@@ -0,0 +1,251 @@
+"""
+Crash-safe storage of the Restaurant state: every model change is appended
+to a journal, and the whole state is periodically written as a snapshot.
+On startup the latest snapshot is loaded and the journal tail replayed.
+
+Bills are only an arrangement of a table's orders made while settling up;
+they are not journaled.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+from model import ModelEvent, ItemAdded, ItemRemoved, ItemStateChanged, TableCleared, ItemState, OrderItem
+
+SNAPSHOT_FILE = 'snapshot.json'
+JOURNAL_FILE = 'journal.jsonl'
+
+
+class Journal:
+    """
+    Records the changes made to a Restaurant in directory. Each record is
+    written to the operating system as soon as it is made, so it survives a
+    crash of the application; fsync, which also protects against a crash of
+    the machine, is batched: it happens once batch_size records are pending
+    or sync_interval seconds after the last one, whichever comes first. Call
+    sync() periodically (e.g. from the event loop) to honour the interval
+    when no new records arrive, and to take the snapshot that becomes due
+    every snapshot_every records.
+
+    Records may come from several threads. A snapshot locks every table, so
+    it is only taken by sync() and close(), never while recording a change.
+    """
+
+    def __init__(self, directory, batch_size=32, sync_interval=0.5, snapshot_every=1000,
+                 clock=time.monotonic):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.clock = clock
+        self.restaurant = None
+        self.file = None
+        self.seq = 0
+        self.unsynced = 0
+        self.last_sync = clock()
+        self.since_snapshot = 0
+        self.lock = threading.RLock()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def open(self, restaurant):
+        """
+        Rebuilds the state of restaurant from the directory, then starts
+        recording its changes. Returns the number of journal records replayed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.restaurant = restaurant
+        self.seq = self.load_snapshot()
+        replayed = self.replay()
+        self.file = open(self.path(JOURNAL_FILE), 'a', encoding='utf-8')
+        restaurant.events.subscribe(ModelEvent, self.record)
+        return replayed
+
+    def close(self):
+        """Stops recording, leaving a snapshot of the final state behind."""
+        if self.file is None:
+            return
+        self.restaurant.events.unsubscribe(ModelEvent, self.record)
+        if self.since_snapshot:
+            self.snapshot()
+        self.fsync_if_due(force=True)
+        self.file.close()
+        self.file = None
+
+    def load_snapshot(self):
+        try:
+            with open(self.path(SNAPSHOT_FILE), encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return 0
+        load_state(self.restaurant, snapshot['tables'])
+        return snapshot['seq']
+
+    def replay(self):
+        """
+        Applies the journal records newer than the snapshot. A record torn by
+        a crash can only be the last one; it is cut off, so that the records
+        appended from now on start on a line of their own.
+        """
+        replayed = 0
+        complete = 0
+        try:
+            f = open(self.path(JOURNAL_FILE), 'r+b')
+        except FileNotFoundError:
+            return 0
+        with f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                complete += len(line)
+                if record['seq'] <= self.seq:
+                    continue
+                apply_record(self.restaurant, record)
+                self.seq = record['seq']
+                replayed += 1
+            f.truncate(complete)
+        return replayed
+
+    def record(self, event):
+        record = encode_event(event)
+        if record is None:
+            return
+        with self.lock:
+            self.seq += 1
+            record['seq'] = self.seq
+            self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+            self.file.flush()
+            self.unsynced += 1
+            self.since_snapshot += 1
+            self.fsync_if_due()
+
+    def sync(self):
+        """Takes a snapshot if one is due, otherwise fsyncs the journal if a batch is due."""
+        if self.since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        else:
+            self.fsync_if_due()
+
+    def fsync_if_due(self, force=False):
+        with self.lock:
+            if not self.unsynced:
+                return
+            if (force or self.unsynced >= self.batch_size or
+                    self.clock() - self.last_sync >= self.sync_interval):
+                os.fsync(self.file.fileno())
+                self.unsynced = 0
+                self.last_sync = self.clock()
+
+    def snapshot(self):
+        """
+        Writes the whole state atomically, then starts a new, empty journal.
+        Records already covered by a snapshot are skipped on replay, so a
+        crash between the two steps is harmless.
+
+        Table locks are taken in table order before the journal's own lock,
+        the same order as a change being recorded, so this cannot deadlock.
+        """
+        with contextlib.ExitStack() as locks:
+            for table in self.restaurant.tables:
+                locks.enter_context(table.lock)
+            locks.enter_context(self.lock)
+            state = {'seq': self.seq, 'tables': encode_state(self.restaurant)}
+            temporary = self.path(SNAPSHOT_FILE + '.tmp')
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(state, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path(SNAPSHOT_FILE))
+            self.file.close()
+            self.file = open(self.path(JOURNAL_FILE), 'w', encoding='utf-8')
+            self.unsynced = 0
+            self.since_snapshot = 0
+            self.last_sync = self.clock()
+
+
+def menu_item(restaurant, name):
+    """
+    The menu item called name. Records refer to menu items by name, so they
+    still mean the same dishes if the menu is reordered; a name no longer on
+    the menu is an error rather than a different dish.
+    """
+    item = restaurant.menu.find(name)
+    if item is None:
+        raise ValueError(f'{name!r} is not on the menu')
+    return item
+
+
+def encode_state(restaurant):
+    """The items of every seat of every table, as [menu item name, state] pairs."""
+    return [[[[item.details.name, int(item.state)] for item in order.items]
+             for order in table.orders]
+            for table in restaurant.tables]
+
+
+def load_state(restaurant, tables):
+    """Adds the items encoded by encode_state to the (empty) tables of restaurant."""
+    for table, seats in zip(restaurant.tables, tables):
+        for order, items in zip(table.orders, seats):
+            for name, state in items:
+                order.add_item(menu_item(restaurant, name))
+                advance_state(order.items[-1], state)
+
+
+def encode_event(event):
+    """Returns the journal record for a model event, or None if it is not journaled."""
+    if event.table is None:
+        return None
+    table = event.table.number
+    if isinstance(event, ItemAdded):
+        record = {'op': 'add', 'table': table, 'seat': event.seat, 'menu': event.item.details.name}
+        if event.index is not None:
+            record['index'] = event.index
+        return record
+    if isinstance(event, ItemRemoved):
+        return {'op': 'remove', 'table': table, 'seat': event.seat, 'index': event.index}
+    if isinstance(event, ItemStateChanged):
+        return {'op': 'state', 'table': table, 'seat': event.seat,
+                'index': event.item.order.items.index(event.item), 'state': int(event.new_state)}
+    if isinstance(event, TableCleared):
+        return {'op': 'clear', 'table': table}
+    return None
+
+
+def apply_record(restaurant, record):
+    """Makes the change described by a record from encode_event."""
+    table = restaurant.tables[record['table']]
+    op = record['op']
+    if op == 'clear':
+        table.clear_table()
+        return
+    order = table.order_for(record['seat'])
+    if op == 'add':
+        if 'index' in record:
+            order.insert_item(OrderItem(menu_item(restaurant, record['menu'])), record['index'])
+        else:
+            order.add_item(menu_item(restaurant, record['menu']))
+    elif op == 'remove':
+        order.remove_item(order.items[record['index']])
+    elif op == 'state':
+        advance_state(order.items[record['index']], record['state'])
+    else:
+        raise ValueError(f'Unknown operation {op!r}')
+
+
+def advance_state(item, state):
+    """Moves item through the valid transitions until it reaches state."""
+    while item.state < state:
+        item.change_state(ItemState(item.state + 1))
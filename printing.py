@@ -0,0 +1,60 @@
+"""
+Print spooling for the bill printer: receipts are formatted on a worker
+thread and handed back to the UI thread as complete jobs, so that the tape
+can be updated once per batch of jobs.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import queue
+import threading
+
+
+class PrintSpooler:
+    """
+    Runs print jobs, in submission order, on a daemon worker thread. A job
+    is either the text to print or a callable returning it. Completed jobs
+    are collected with take_completed(), which is meant to be polled from
+    the UI thread; submit() and take_completed() must be called from the
+    same thread.
+    """
+
+    def __init__(self):
+        self.jobs = queue.SimpleQueue()
+        self.completed = queue.SimpleQueue()
+        self.outstanding = 0
+        self.worker = threading.Thread(target=self.work, name='print spooler', daemon=True)
+        self.worker.start()
+
+    def submit(self, job):
+        self.outstanding += 1
+        self.jobs.put(job)
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            try:
+                text = job() if callable(job) else job
+            except Exception as error:
+                text = f'*** print job failed: {error} ***'
+            self.completed.put(text)
+
+    def take_completed(self):
+        """Returns the texts of the jobs completed since the last call, in order."""
+        texts = []
+        while True:
+            try:
+                texts.append(self.completed.get_nowait())
+            except queue.Empty:
+                break
+        self.outstanding -= len(texts)
+        return texts
+
+    def close(self):
+        self.jobs.put(None)
+        self.worker.join()
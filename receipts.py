@@ -0,0 +1,162 @@
+"""
+Receipt rendering for the OORMS system. A receipt template is compiled
+once into format strings and reused for every receipt; rendered receipts
+go to an interchangeable output backend: the printer tape, a plain-text
+file or an ESC/POS byte stream.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import functools
+from datetime import datetime
+
+from constants import TAPE_WIDTH, RECEIPT_HEADER, TAX_NAME, TAX_RATE_PERCENT
+from model import format_money
+
+BOLD = 'bold'
+PLAIN = ''
+
+
+class Receipt:
+    """
+    What a receipt shows, independent of the model objects it came from:
+    lines of (quantity, item name, amount in cents), the table number and
+    when it was printed.
+    """
+
+    def __init__(self, table_number, lines, printed_at):
+        self.table_number = table_number
+        self.lines = lines
+        self.printed_at = printed_at
+
+    def subtotal_cents(self):
+        return sum(amount for _, _, amount in self.lines)
+
+
+def receipt_from_bill(bill, table_number, printed_at=None):
+    """Takes a snapshot of bill, under its lock, for rendering on another thread."""
+    with bill.lock:
+        lines = [(qty, menu_item.name, qty * menu_item.price_cents) for menu_item, qty in bill.items.items()]
+        lines += [(str(share.fraction), item.details.name, share.cents) for item, share in bill.partial_shares()]
+    return Receipt(table_number, lines, printed_at or datetime.now())
+
+
+def tax_cents(subtotal_cents, rate_percent):
+    """Tax rounded half up to the cent, in integer arithmetic."""
+    return (subtotal_cents * rate_percent + 50) // 100
+
+
+class ReceiptTemplate:
+    """
+    The layout of a receipt for a given width, header and tax rate. All the
+    format strings are built here, once; render() only fills them in.
+    Use compile_template() to get a cached instance.
+    """
+
+    def __init__(self, width, header, tax_name, tax_rate_percent):
+        self.tax_name = tax_name
+        self.tax_rate_percent = tax_rate_percent
+        amount_width = 11
+        name_width = width - 5 - amount_width - 2
+        self.rule = '-' * width
+        self.header = [(BOLD, line.center(width, '-') if ix == 0 else line.center(width))
+                       for ix, line in enumerate(header)]
+        self.stamp_format = f'{{:<{width - 16}}}{{:>16}}'
+        self.item_format = f'{{:<5}} {{:<{name_width}.{name_width}}} {{:>{amount_width - 1}}}$'
+        self.total_format = f'{{:<{width - amount_width}}}{{:>{amount_width - 1}}}$'
+
+    def render(self, receipt):
+        """Returns the receipt as a list of (style, text) lines."""
+        subtotal = receipt.subtotal_cents()
+        tax = tax_cents(subtotal, self.tax_rate_percent)
+        lines = list(self.header)
+        lines.append((PLAIN, self.stamp_format.format(f'Table {receipt.table_number}',
+                                                      receipt.printed_at.strftime('%Y-%m-%d %H:%M'))))
+        lines.append((PLAIN, self.rule))
+        item_format = self.item_format
+        lines.extend((PLAIN, item_format.format(qty, name, format_money(amount)))
+                     for qty, name, amount in receipt.lines)
+        lines.append((PLAIN, self.rule))
+        lines.append((PLAIN, self.total_format.format('Subtotal', format_money(subtotal))))
+        lines.append((PLAIN, self.total_format.format(f'{self.tax_name} {self.tax_rate_percent}%',
+                                                      format_money(tax))))
+        lines.append((BOLD, self.total_format.format('Total', format_money(subtotal + tax))))
+        lines.append((PLAIN, ''))
+        lines.append((PLAIN, 'Méthode de paiement'))
+        lines.append((PLAIN, self.rule))
+        return lines
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template(width=TAPE_WIDTH, header=RECEIPT_HEADER, tax_name=TAX_NAME,
+                     tax_rate_percent=TAX_RATE_PERCENT):
+    return ReceiptTemplate(width, header, tax_name, tax_rate_percent)
+
+
+def as_text(lines):
+    return ''.join(text + '\n' for _, text in lines)
+
+
+class TapeBackend:
+    """Prints on the printer tape; rendering runs on the printer's spooler thread."""
+
+    def __init__(self, printer):
+        self.printer = printer
+
+    def output(self, render):
+        self.printer.print_job(lambda: as_text(render()).rstrip('\n'))
+
+
+class TextFileBackend:
+    """Appends plain-text receipts to a text stream, separated by a blank line."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def output(self, render):
+        self.stream.write(as_text(render()) + '\n')
+
+
+class EscPosBackend:
+    """
+    Writes receipts as ESC/POS commands to a binary stream (a device or a
+    file standing in for one): bold lines use emphasis, text is in code
+    page 858 and each receipt ends with a feed and a partial cut.
+    """
+
+    INITIALIZE = b'\x1b@\x1bt\x13'  # ESC @, then ESC t 19 selects code page 858
+    BOLD_ON = b'\x1bE\x01'
+    BOLD_OFF = b'\x1bE\x00'
+    FEED_AND_CUT = b'\x1dVB\x03'  # GS V 66 3: feed 3 lines, partial cut
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def encode(self, lines):
+        parts = [self.INITIALIZE]
+        for style, text in lines:
+            encoded = text.encode('cp858', errors='replace') + b'\n'
+            parts.append(self.BOLD_ON + encoded + self.BOLD_OFF if style == BOLD else encoded)
+        parts.append(self.FEED_AND_CUT)
+        return b''.join(parts)
+
+    def output(self, render):
+        self.stream.write(self.encode(render()))
+
+
+class ReceiptEngine:
+    """Renders receipts with a compiled template and sends them to a backend."""
+
+    def __init__(self, backend, template=None):
+        self.backend = backend
+        self.template = template if template is not None else compile_template()
+
+    def print(self, receipt):
+        self.backend.output(lambda: self.template.render(receipt))
+
+    def print_many(self, receipts):
+        for receipt in receipts:
+            self.print(receipt)
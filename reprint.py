@@ -0,0 +1,161 @@
+"""
+Batch reprint of closed bills for archiving. Loads the bills closed in a
+range of days from the bill history, renders their receipts in parallel
+in a process pool, and streams them to one gzip-compressed text file per
+day. Run from the command line:
+
+    python reprint.py history.sqlite 2026-10-01 2026-10-31 --out archive
+    python oorms.py reprint history.sqlite 2026-10-18 2026-10-18 --out archive
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import gzip
+import io
+import itertools
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from fractions import Fraction
+
+from history import BillHistory
+from receipts import Receipt, ReceiptEngine, TextFileBackend
+
+CHUNK_SIZE = 250
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+def render_chunk(bills):
+    """
+    Renders a chunk of bills, as loaded by BillHistory.closed_bills, and
+    returns them as one gzip member. Runs in the worker processes.
+    """
+    text = io.StringIO()
+    engine = ReceiptEngine(TextFileBackend(text))
+    for _, table_number, closed_at, lines in bills:
+        engine.print(Receipt(table_number, list(receipt_lines(lines)), datetime.fromisoformat(closed_at)))
+    return gzip.compress(text.getvalue().encode('utf-8'), compresslevel=6)
+
+
+def receipt_lines(lines):
+    """
+    The receipt lines of the lines of a bill in the history: whole items
+    with their quantity, and a line per share of a split item, as on the
+    receipt printed at the table.
+    """
+    for item, share, quantity, unit_cents in lines:
+        if share == 1:
+            yield quantity, item, quantity * unit_cents
+        else:
+            fraction = str(Fraction(share).limit_denominator())
+            for _ in range(quantity):
+                yield fraction, item, unit_cents
+
+
+def chunks_by_day(bills):
+    """Yields (day, chunk of at most CHUNK_SIZE bills), never mixing days in a chunk."""
+    for day, bills_of_day in itertools.groupby(bills, key=lambda bill: bill[2][:10]):
+        while True:
+            chunk = list(itertools.islice(bills_of_day, CHUNK_SIZE))
+            if not chunk:
+                break
+            yield day, chunk
+
+
+def render_in_order(executor, chunks, limit):
+    """
+    Yields (day, number of bills, rendered chunk) in the order of chunks,
+    submitting chunks to executor as earlier ones are collected, so that at
+    most limit chunks are held in memory at a time.
+    """
+    pending = deque()
+    for day, chunk in chunks:
+        pending.append((day, len(chunk), executor.submit(render_chunk, chunk)))
+        if len(pending) >= limit:
+            day, n_bills, future = pending.popleft()
+            yield day, n_bills, future.result()
+    while pending:
+        day, n_bills, future = pending.popleft()
+        yield day, n_bills, future.result()
+
+
+def reprint(history, first_day, last_day, directory, workers=None, progress=None):
+    """
+    Writes receipts-<day>.txt.gz in directory for each day with bills, and
+    returns the number of bills rendered. Chunks are rendered by workers
+    processes (all cores by default; 0 renders in this process) and written
+    in order as they complete; gzip members can simply be concatenated.
+    Bills are read from the history as the workers need them, a few chunks
+    per worker ahead, so memory use does not grow with the range.
+    """
+    os.makedirs(directory, exist_ok=True)
+    total = history.count_bills(first_day, last_day)
+    chunks = chunks_by_day(history.closed_bills(first_day, last_day))
+    if workers == 0:
+        rendered = ((day, len(chunk), render_chunk(chunk)) for day, chunk in chunks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        rendered = render_in_order(executor, chunks, CHUNKS_IN_FLIGHT_PER_WORKER * (workers or os.cpu_count()))
+    done = 0
+    files = {}
+    try:
+        for day, n_bills, data in rendered:
+            if day not in files:
+                files[day] = open(os.path.join(directory, f'receipts-{day}.txt.gz'), 'wb')
+            files[day].write(data)
+            done += n_bills
+            if progress:
+                progress(done, total)
+    finally:
+        for f in files.values():
+            f.close()
+        if executor is not None:
+            executor.shutdown()
+    return total
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Render the receipts of closed bills for archiving')
+    parser.add_argument('history', help='SQLite bill history (see oorms.py --history)')
+    parser.add_argument('first_day', help='YYYY-MM-DD')
+    parser.add_argument('last_day', help='YYYY-MM-DD')
+    parser.add_argument('--out', default='archive', help='directory for the compressed receipts')
+    parser.add_argument('--workers', type=int, help='number of processes (default: one per core)')
+    parser.add_argument('--compare-serial', action='store_true',
+                        help='also render in a single process, to a scratch directory, and report the speedup')
+    args = parser.parse_args(argv)
+
+    def progress(done, total):
+        print(f'\r{done}/{total} bills', end='', file=sys.stderr, flush=True)
+
+    history = BillHistory(args.history)
+    try:
+        start = time.perf_counter()
+        total = reprint(history, args.first_day, args.last_day, args.out, args.workers, progress)
+        parallel = time.perf_counter() - start
+        print(file=sys.stderr)
+        workers = args.workers or os.cpu_count()
+        print(f'{total} bills in {parallel:.2f} s with {workers} processes ({total / parallel:,.0f} bills/s)')
+        if args.compare_serial:
+            with tempfile.TemporaryDirectory() as scratch:  # keep the archive just written
+                start = time.perf_counter()
+                reprint(history, args.first_day, args.last_day, scratch, 0)
+                serial = time.perf_counter() - start
+            print(f'single process: {serial:.2f} s; speedup {serial / parallel:.2f}x '
+                  f'on {os.cpu_count()} cores')
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
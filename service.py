@@ -0,0 +1,320 @@
+"""
+Local service sharing one Restaurant between several server terminals.
+The service owns the model; clients connect over TCP or a Unix socket, get
+the full state once, and from then on receive one delta per model change.
+
+The protocol is one JSON object per line. Requests that designate an item
+by its position, and table clearing, carry the version of the table they
+were made against; such a request against a table that changed in the
+meantime is refused as a conflict (optimistic concurrency), and the client
+retries once its replica has caught up. Adding, placing and cancelling
+items commute with other changes and are applied unconditionally. Menu
+items are designated by name. Run from the command line:
+
+    python service.py --port 8765
+    python service.py --bench --clients 50 --operations 200
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import time
+
+from model import Restaurant, ModelEvent, RestaurantReconfigured
+from persistence import encode_state, load_state, encode_event, apply_record, menu_item
+
+
+class VersionConflict(Exception):
+    """A request was made against an out-of-date version of a table."""
+
+
+def encode(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode()
+
+
+def position(request, key, length):
+    """request[key], checked to be a valid index into a sequence of the given length."""
+    value = request.get(key)
+    if type(value) is not int or not 0 <= value < length:
+        if length == 0:
+            raise ValueError(f'{key!r} cannot be {value!r}, as there is nothing to choose from')
+        raise ValueError(f'{key!r} must be an integer from 0 to {length - 1}, not {value!r}')
+    return value
+
+
+class RestaurantServer:
+
+    OPERATIONS = {'add', 'remove', 'place', 'cancel', 'serve', 'clear'}
+
+    def __init__(self, restaurant=None):
+        self.restaurant = restaurant if restaurant is not None else Restaurant()
+        self.versions = [0] * len(self.restaurant.tables)
+        self.clients = set()
+        self.outbox = []
+        self.requests = 0
+        self.busy = 0.0
+        self.restaurant.events.subscribe(ModelEvent, self.broadcast)
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """Starts listening on a Unix socket if path is given, else on TCP."""
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def hello(self):
+        return {'tables': [(table.n_seats, table.location) for table in self.restaurant.tables],
+                'menu': [(item.name, item.price) for item in self.restaurant.menu_items],
+                'state': encode_state(self.restaurant),
+                'versions': self.versions}
+
+    async def handle(self, reader, writer):
+        writer.write(encode(self.hello()))
+        self.clients.add(writer)
+        try:
+            async for line in reader:
+                start = time.perf_counter()
+                response = self.respond(line)
+                self.send_deltas()
+                writer.write(encode(response))
+                self.busy += time.perf_counter() - start
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    def respond(self, line):
+        """The response to one request line; malformed requests get an error, never an exception."""
+        try:
+            request = json.loads(line)
+        except ValueError:  # also UnicodeDecodeError
+            return {'id': None, 'ok': False, 'error': 'request is not valid JSON'}
+        if not isinstance(request, dict):
+            return {'id': None, 'ok': False, 'error': 'request is not a JSON object'}
+        return self.execute(request)
+
+    def execute(self, request):
+        self.requests += 1
+        try:
+            response = self.apply(request)
+        except ValueError as error:
+            response = {'ok': False, 'error': str(error)}
+        response['id'] = request.get('id')
+        return response
+
+    def apply(self, request):
+        op = request.get('op')
+        if op == 'ping':
+            return {'ok': True}
+        if not isinstance(op, str) or op not in self.OPERATIONS:
+            raise ValueError(f'Unknown operation {op!r}')
+        number = position(request, 'table', len(self.restaurant.tables))
+        if 'version' in request and type(request['version']) is not int:
+            raise ValueError(f"'version' must be an integer, not {request['version']!r}")
+        if 'version' in request and request['version'] != self.versions[number]:
+            return {'ok': False, 'error': 'conflict', 'version': self.versions[number]}
+        table = self.restaurant.tables[number]
+        if op == 'clear':
+            table.clear_table()
+        else:
+            order = table.order_for(position(request, 'seat', table.n_seats))
+            if op == 'add':
+                if not isinstance(request.get('menu'), str):
+                    raise ValueError("'menu' must be the name of a menu item")
+                order.add_item(menu_item(self.restaurant, request['menu']))
+            elif op == 'remove':
+                order.remove_item(order.items[position(request, 'index', len(order.items))])
+            elif op == 'place':
+                order.place_new_orders()
+            elif op == 'cancel':
+                order.remove_unordered_items()
+            elif op == 'serve':
+                order.items[position(request, 'index', len(order.items))].mark_as_served()
+        return {'ok': True, 'version': self.versions[number]}
+
+    def broadcast(self, event):
+        if isinstance(event, RestaurantReconfigured):
+            self.versions.extend([0] * (len(self.restaurant.tables) - len(self.versions)))
+            return
+        record = encode_event(event)
+        if record is None:
+            return
+        self.versions[record['table']] += 1
+        self.outbox.append(encode({'delta': record, 'version': self.versions[record['table']]}))
+
+    def send_deltas(self):
+        """Sends the deltas of a request to every client in one write each."""
+        if not self.outbox:
+            return
+        message = b''.join(self.outbox)
+        self.outbox.clear()
+        for writer in self.clients:
+            writer.write(message)
+
+
+class RestaurantClient:
+    """
+    A terminal's connection to the service. self.restaurant is a replica
+    kept up to date from the deltas; its events can drive a view as usual.
+    Deltas always arrive before the response to a later request, so once a
+    request returns, the replica includes its effect.
+    """
+
+    def __init__(self):
+        self.restaurant = None
+        self.versions = None
+        self.reader = None
+        self.writer = None
+        self.pending = {}
+        self.ids = itertools.count()
+        self.listener = None
+
+    async def connect(self, host='127.0.0.1', port=None, path=None):
+        if path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+        hello = json.loads(await self.reader.readline())
+        self.restaurant = Restaurant(hello['tables'], hello['menu'])
+        load_state(self.restaurant, hello['state'])
+        self.versions = hello['versions']
+        self.listener = asyncio.create_task(self.listen())
+
+    async def listen(self):
+        async for line in self.reader:
+            message = json.loads(line)
+            if 'delta' in message:
+                apply_record(self.restaurant, message['delta'])
+                self.versions[message['delta']['table']] = message['version']
+            else:
+                self.pending.pop(message['id']).set_result(message)
+
+    VERSIONED_OPERATIONS = {'remove', 'serve', 'clear'}
+
+    async def request(self, op, table=None, version=None, **fields):
+        request_id = next(self.ids)
+        request = {'id': request_id, 'op': op, **fields}
+        if table is not None:
+            request['table'] = table
+            if version is not None:
+                request['version'] = version
+            elif op in self.VERSIONED_OPERATIONS:
+                request['version'] = self.versions[table]
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write(encode(request))
+        response = await future
+        if not response['ok']:
+            if response['error'] == 'conflict':
+                raise VersionConflict(f'table {table} is at version {response["version"]}')
+            raise ValueError(response['error'])
+        return response
+
+    async def sync(self):
+        """Returns once every change made before the call has reached the replica."""
+        await self.request('ping')
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        if self.listener is not None:
+            await asyncio.gather(self.listener, return_exceptions=True)
+
+
+async def simulate_terminal(client, operations, rnd):
+    """Random order entry on random tables; returns the number of conflicting requests."""
+    restaurant = client.restaurant
+    conflicts = 0
+    for _ in range(operations):
+        number = rnd.randrange(len(restaurant.tables))
+        seat = rnd.randrange(restaurant.tables[number].n_seats)
+        items = restaurant.tables[number].order_for(seat).items
+        choice = rnd.random()
+        if choice < 0.55:
+            op, fields = 'add', {'seat': seat, 'menu': rnd.choice(restaurant.menu_items).name}
+        elif choice < 0.75:
+            op, fields = 'place', {'seat': seat}
+        elif choice < 0.85:
+            op, fields = 'cancel', {'seat': seat}
+        elif choice < 0.97 and items:
+            op, fields = 'remove', {'seat': seat, 'index': rnd.randrange(len(items))}
+        else:
+            op, fields = 'clear', {}
+        try:
+            await client.request(op, number, **fields)
+        except VersionConflict:
+            conflicts += 1  # the item picked may no longer be there; pick again
+    return conflicts
+
+
+async def bench(clients=50, operations=200, seed=None, path=None):
+    """
+    Runs simulated terminals against a loopback service and returns
+    (operations, seconds, conflicts, seconds the service spent handling
+    requests, replicas consistent with the service). The terminals run in
+    the same process, so the elapsed time mostly measures them keeping
+    their replicas up to date.
+    """
+    server = RestaurantServer()
+    listener = await server.start(path=path)
+    port = None if path else listener.sockets[0].getsockname()[1]
+    terminals = [RestaurantClient() for _ in range(clients)]
+    for terminal in terminals:
+        await terminal.connect(port=port, path=path)
+    rnd = random.Random(seed)
+    start = time.perf_counter()
+    conflicts = await asyncio.gather(*(simulate_terminal(terminal, operations, random.Random(rnd.random()))
+                                       for terminal in terminals))
+    elapsed = time.perf_counter() - start
+    expected = encode_state(server.restaurant)
+    consistent = True
+    for terminal in terminals:
+        await terminal.sync()
+        replica = terminal.restaurant
+        consistent = consistent and encode_state(replica) == expected
+        await terminal.close()
+    listener.close()
+    await listener.wait_closed()
+    return clients * operations, elapsed, sum(conflicts), server.busy, consistent
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Share one restaurant between several terminals')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on this Unix socket instead of TCP')
+    parser.add_argument('--bench', action='store_true', help='measure throughput with simulated terminals')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--operations', type=int, default=200, help='operations per simulated terminal')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    if args.bench:
+        operations, elapsed, conflicts, busy, consistent = asyncio.run(
+            bench(args.clients, args.operations, args.seed, args.unix))
+        print(f'{args.clients} terminals, {operations} operations in {elapsed:.2f} s '
+              f'({operations / elapsed:,.0f} ops/s aggregate, {conflicts} conflicts)')
+        print(f'service time {busy / operations * 1e6:.1f} us per request '
+              f'({operations / busy:,.0f} ops/s capacity), '
+              f'replicas {"consistent" if consistent else "INCONSISTENT"}')
+        return
+
+    async def serve():
+        server = await RestaurantServer().start(args.host, args.port, args.unix)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
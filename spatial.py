@@ -0,0 +1,156 @@
+"""
+Floor-plan geometry and a grid spatial index for resolving a click on the
+floor plan to the table or seat under it.
+
+Geometry is in world coordinates: the unscaled layout coordinates of
+constants.TABLES. Screens that draw the floor smaller or larger convert
+canvas coordinates back to world coordinates before looking a point up.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import math
+
+from constants import TABLE_WIDTH, SEAT_DIAM, SEAT_SPACING, RESTAURANT_SCALE, FLOOR_INDEX_CELL_SIZE, \
+    FLOOR_MIN_SCALE, FLOOR_MAX_SCALE, FLOOR_DETAIL_SCALE
+
+
+def scale_and_offset(x0, y0, width, height, offset_x0, offset_y0, scale):
+    return ((offset_x0 + x0) * scale,
+            (offset_y0 + y0) * scale,
+            (offset_x0 + x0 + width) * scale,
+            (offset_y0 + y0 + height) * scale)
+
+
+def table_geometry(n_seats, location, scale=1):
+    """
+    Returns the bounding box of a table with n_seats seats whose top-left
+    corner is at location, and the list of the bounding boxes of its seats.
+    Seats alternate between the left and right sides of the table.
+    """
+    offset_x0, offset_y0 = location
+    seats_per_side = math.ceil(n_seats / 2)
+    table_height = SEAT_DIAM * seats_per_side + SEAT_SPACING * (seats_per_side - 1)
+    table_x0 = SEAT_DIAM + SEAT_SPACING
+    table_bbox = scale_and_offset(table_x0, 0, TABLE_WIDTH, table_height,
+                                  offset_x0, offset_y0, scale)
+    far_seat_x0 = table_x0 + TABLE_WIDTH + SEAT_SPACING
+    seat_bboxes = []
+    for ix in range(n_seats):
+        seat_x0 = (ix % 2) * far_seat_x0
+        seat_y0 = (ix // 2 * (SEAT_DIAM + SEAT_SPACING) +
+                   (n_seats % 2) * (ix % 2) * (SEAT_DIAM + SEAT_SPACING) / 2)
+        seat_bboxes.append(scale_and_offset(seat_x0, seat_y0, SEAT_DIAM, SEAT_DIAM,
+                                            offset_x0, offset_y0, scale))
+    return table_bbox, seat_bboxes
+
+
+class GridIndex:
+    """
+    Buckets bounding boxes into square cells of cell_size, so that finding
+    the boxes containing a point only looks at the boxes overlapping its
+    cell instead of at every box. With cells about the size of a table,
+    that is a handful of boxes however large the floor is.
+    """
+
+    def __init__(self, cell_size=FLOOR_INDEX_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def cell_range(self, low, high):
+        return range(math.floor(low / self.cell_size), math.floor(high / self.cell_size) + 1)
+
+    def insert(self, bbox, value):
+        x0, y0, x1, y1 = bbox
+        entry = (bbox, value)
+        for i in self.cell_range(x0, x1):
+            for j in self.cell_range(y0, y1):
+                self.cells.setdefault((i, j), []).append(entry)
+        self.size += 1
+
+    def find(self, x, y):
+        """Returns the value of the box containing (x, y) inserted last, or None."""
+        cell = self.cells.get((math.floor(x / self.cell_size), math.floor(y / self.cell_size)), ())
+        for (x0, y0, x1, y1), value in reversed(cell):
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                return value
+        return None
+
+    def overlapping(self, bbox):
+        """Returns the set of the values of the boxes that overlap bbox."""
+        x0, y0, x1, y1 = bbox
+        columns, rows = self.cell_range(x0, x1), self.cell_range(y0, y1)
+        if len(columns) * len(rows) <= len(self.cells):
+            cells = (self.cells.get((i, j), ()) for i in columns for j in rows)
+        else:  # zoomed far out: most of the cells in range are empty
+            cells = (cell for (i, j), cell in self.cells.items() if i in columns and j in rows)
+        found = set()
+        for cell in cells:
+            for (bx0, by0, bx1, by1), value in cell:
+                if bx0 <= x1 and x0 <= bx1 and by0 <= y1 and y0 <= by1:
+                    found.add(value)
+        return found
+
+
+def floor_index(tables, cell_size=FLOOR_INDEX_CELL_SIZE):
+    """
+    Returns a GridIndex of the tables and seats of a floor plan in world
+    coordinates. Looking up a point gives (table number, seat number) for a
+    seat, (table number, None) for a table top, or None.
+    """
+    index = GridIndex(cell_size)
+    for table in tables:
+        table_bbox, seat_bboxes = table_geometry(table.n_seats, table.location)
+        index.insert(table_bbox, (table.number, None))
+        for seat, seat_bbox in enumerate(seat_bboxes):
+            index.insert(seat_bbox, (table.number, seat))
+    return index
+
+
+class Viewport:
+    """
+    The part of the floor plan shown on a width x height canvas: the world
+    point origin is drawn at the canvas's top-left corner, and world
+    distances are multiplied by scale.
+    """
+
+    def __init__(self, width, height, scale=RESTAURANT_SCALE, origin=(0, 0)):
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.origin = origin
+
+    def to_world(self, x, y):
+        return self.origin[0] + x / self.scale, self.origin[1] + y / self.scale
+
+    def world_bounds(self):
+        x0, y0 = self.origin
+        return x0, y0, x0 + self.width / self.scale, y0 + self.height / self.scale
+
+    def shows_seats(self):
+        return self.scale >= FLOOR_DETAIL_SCALE
+
+    def pan(self, dx, dy):
+        """Moves the floor by (dx, dy) canvas pixels."""
+        self.origin = (self.origin[0] - dx / self.scale, self.origin[1] - dy / self.scale)
+
+    def zoom(self, factor, x, y):
+        """
+        Multiplies the scale by factor, within FLOOR_MIN_SCALE and
+        FLOOR_MAX_SCALE, keeping the world point under canvas (x, y) in place.
+        Returns True if the scale changed.
+        """
+        scale = min(max(self.scale * factor, FLOOR_MIN_SCALE), FLOOR_MAX_SCALE)
+        if scale == self.scale:
+            return False
+        world_x, world_y = self.to_world(x, y)
+        self.scale = scale
+        self.origin = (world_x - x / scale, world_y - y / scale)
+        return True
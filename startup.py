@@ -0,0 +1,81 @@
+"""
+Measures how long OORMS takes to start: which imports the time goes to,
+and how long until the server view has drawn its first frame.
+
+    python oorms.py --profile-startup
+
+runs the GUI in a child interpreter with -X importtime, has it exit as soon
+as the first frame is on screen, and prints the slowest imports followed by
+the time to first frame.
+
+Submitting lab group: [your names here]
+Submission date: [date here]
+
+Original code by EEE320 instructors.
+"""
+
+import subprocess
+import sys
+import time
+
+FIRST_FRAME_FLAG = '--exit-after-first-frame'
+
+
+class ImportTime:
+    """One line of -X importtime output; times are in microseconds."""
+
+    def __init__(self, module, self_us, cumulative_us, depth):
+        self.module = module
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+
+def parse_import_times(text):
+    """Returns the ImportTimes in the stderr of a python -X importtime run."""
+    times = []
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        depth = (len(name) - len(module) - 1) // 2
+        times.append(ImportTime(module, int(fields[0]), int(fields[1]), depth))
+    return times
+
+
+def report(times, stages, out=sys.stdout, top=15):
+    """Prints the slowest imports by cumulative time, then the startup stages in seconds."""
+    total = sum(t.self_us for t in times)
+    print(f'imports: {len(times)} modules, {total / 1000:.1f} ms', file=out)
+    print(f'{"cumulative ms":>14} {"self ms":>8}  module', file=out)
+    for t in sorted(times, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+        print(f'{t.cumulative_us / 1000:14.1f} {t.self_us / 1000:8.1f}  {"  " * t.depth}{t.module}', file=out)
+    for stage, seconds in stages:
+        print(f'{stage:>22}: {seconds * 1000:8.1f} ms', file=out)
+
+
+def profile_startup(script, argv, out=sys.stdout):
+    """
+    Starts script (oorms.py) with argv in a child interpreter and reports on
+    its startup. The child prints "stage <name> <seconds>" lines, measured
+    from the start of its main block, and exits after the first frame.
+    """
+    started = time.perf_counter()
+    child = subprocess.run([sys.executable, '-X', 'importtime', script, FIRST_FRAME_FLAG, *argv],
+                           capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if child.returncode:
+        sys.stderr.writelines(line for line in child.stderr.splitlines(keepends=True)
+                              if not line.startswith('import time:'))
+        raise SystemExit(child.returncode)
+    stages = []
+    for line in child.stdout.splitlines():
+        fields = line.split()
+        if len(fields) == 3 and fields[0] == 'stage':
+            stages.append((fields[1], float(fields[2])))
+    stages.append(('process to first frame', elapsed))
+    report(parse_import_times(child.stderr), stages, out)
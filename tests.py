@@ -7,49 +7,55 @@ Submission date: [date here]
 Original code by EEE320 instructors.
 """
 
+import asyncio
+import concurrent.futures
+import contextlib
+import gzip
+import io
+import json
+import os
+import pstats
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
 import unittest
-from enum import Enum, auto
-from controller import RestaurantController, TableController, OrderController
-from model import Restaurant, OrderItem
-
-
-class UI(Enum):
-    restaurant = auto()
-    table = auto()
-    order = auto()
-
-
-class ServerViewMock:
-
-    def __init__(self, restaurant):
-        self.controller = None
-        self.last_UI_created = None
-        self.restaurant = restaurant
-        restaurant.add_view(self)
-        self.set_controller(RestaurantController(self, self.restaurant))
-
-    def set_controller(self, controller):
-        self.controller = controller
-        self.controller.create_ui()
-
-    def create_restaurant_ui(self):
-        self.last_UI_created = UI.restaurant
-
-    def create_table_ui(self, table):
-        self.last_UI_created = (UI.table, table)
-
-    def create_order_ui(self, order):
-        self.last_UI_created = (UI.order, order)
-
-    def update(self):
-        self.controller.create_ui()
+from datetime import datetime
+import benchmarks
+from commands import CommandLog, AddItem
+from config import ConfigWatcher, load_config
+from constants import TABLES, MENU_ITEMS, RESTAURANT_SCALE, FULL_SEAT_STYLE, FLOOR_MAX_SCALE, \
+    MENU_PAGE_SIZE
+from controller import RestaurantController, TableController, OrderController, BillsController, \
+    FusionController
+from headless import HeadlessView, HeadlessKitchen, RecordingPrinter, UI
+from history import BillHistory, bill_lines
+from kitchen import KitchenQueue, QUEUED, FIRED, READY, SERVED, CANCELLED
+from loadtest import LoadGenerator, percentile
+from metrics import Histogram, Metrics, instrument_all
+from printing import PrintSpooler
+from persistence import Journal, encode_state
+from reprint import reprint, render_in_order, receipt_lines, main as reprint_main
+from receipts import Receipt, ReceiptEngine, TextFileBackend, EscPosBackend, compile_template, \
+    as_text, tax_cents, receipt_from_bill
+from scheduler import UpdateScheduler
+from spatial import GridIndex, Viewport, floor_index, table_geometry
+from startup import parse_import_times, profile_startup
+from service import RestaurantServer, RestaurantClient, VersionConflict, simulate_terminal
+from model import Restaurant, OrderItem, ItemState, Bill, format_money, merge_orders, \
+    allocate, split_item, move_item, split_bill, MenuCatalog, \
+    ModelEvent, ItemAdded, ItemRemoved, ItemStateChanged, TableCleared, BillsMerged, RestaurantReconfigured
 
 
 class OORMSTestCase(unittest.TestCase):
 
     def setUp(self):
         self.restaurant = Restaurant()
-        self.view = ServerViewMock(self.restaurant)
+        self.view = HeadlessView(self.restaurant)
 
     def test_initial_state(self):
         self.assertEqual(UI.restaurant, self.view.last_UI_created)
@@ -149,3 +155,1564 @@ class OORMSTestCase(unittest.TestCase):
         check_first_three_items(self.restaurant.menu_items, the_order.items)
         self.assertEqual(self.restaurant.menu_items[1], the_order.items[3].details)
         self.assertEqual(self.restaurant.menu_items[2], the_order.items[4].details)
+
+    def test_fusion_merges_selected_seats_into_current_bill(self):
+        table = self.restaurant.tables[6]
+        for seat in (0, 2, 5):
+            table.order_for(seat).add_item(self.restaurant.menu_items[seat])
+            table.order_for(seat).place_new_orders()
+        self.view.controller.table_touched(6)
+        self.view.controller.make_bills(printer=RecordingPrinter())
+        self.view.controller.fuse_bills()
+        self.assertIsInstance(self.view.controller, FusionController)
+        self.view.controller.seat_touched(HeadlessView.SEAT_ID_BASE + 0)
+        self.view.controller.seat_touched(HeadlessView.SEAT_ID_BASE + 5)
+        self.view.controller.seat_touched(HeadlessView.SEAT_ID_BASE + 2)
+        self.view.controller.seat_touched(HeadlessView.SEAT_ID_BASE + 2)
+        self.view.controller.done()
+        self.assertIsInstance(self.view.controller, BillsController)
+        bills = self.view.controller.bills
+        self.assertEqual(2, len(bills))
+        merged = self.view.controller.current_bill
+        self.assertIs(merged, bills[-1])
+        self.assertEqual([0, 5], [order.seat_number for order in merged.orders])
+        self.assertEqual((UI.bills, merged), self.view.last_UI_created)
+
+
+class CommandLogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.restaurant.commands = CommandLog(capacity=10)
+        self.view = HeadlessView(self.restaurant)
+        self.menu_items = self.restaurant.menu_items
+
+    def contents(self, table):
+        return [[(item.details.name, item.state) for item in order.items] for order in table.orders]
+
+    def test_undo_and_redo_add_item(self):
+        self.view.controller.table_touched(2)
+        self.view.controller.seat_touched(4)
+        order = self.view.controller.order
+        self.view.controller.add_item(self.menu_items[0])
+        self.view.controller.add_item(self.menu_items[1])
+        added = order.items[1]
+        self.view.controller.undo()
+        self.assertEqual([self.menu_items[0]], [item.details for item in order.items])
+        self.view.controller.redo()
+        self.assertIs(added, order.items[1])
+        self.assertEqual(self.menu_items[0].price_cents + self.menu_items[1].price_cents, order.total_cents)
+
+    def test_redo_after_clearing_adds_to_the_new_order(self):
+        table = self.restaurant.tables[2]
+        log = self.restaurant.commands
+        command = log.execute(AddItem(table.order_for(4), self.menu_items[0]))
+        log.undo()
+        table.clear_table()
+        log.redo()
+        self.assertEqual([command.item], table.order_for(4).items)
+        self.assertEqual({4}, table.occupied_seats)
+
+    def test_undo_remove_puts_item_back_in_place_and_state(self):
+        table = self.restaurant.tables[2]
+        order = table.order_for(4)
+        for ix in range(3):
+            order.add_item(self.menu_items[ix])
+        order.place_new_orders()
+        before = self.contents(table)
+        self.view.controller.table_touched(2)
+        self.view.controller.seat_touched(4)
+        self.view.controller.remove(order.items[1])
+        self.assertEqual(2, len(order.items))
+        self.view.controller.undo()
+        self.assertEqual(before, self.contents(table))
+        self.assertEqual(3, table.active_items)
+
+    def test_undo_settling_restores_table_and_history(self):
+        history = BillHistory(':memory:')
+        self.addCleanup(history.close)
+        self.restaurant.history = history
+        table = self.restaurant.tables[4]
+        for seat in (0, 1):
+            table.order_for(seat).add_item(self.menu_items[seat])
+            table.order_for(seat).place_new_orders()
+        table.order_for(1).items[0].mark_as_served()
+        before = self.contents(table)
+        self.view.controller.table_touched(4)
+        self.view.controller.make_bills(RecordingPrinter())
+        self.view.controller.done()
+        today = datetime.now().date().isoformat()
+        self.assertEqual([(4, 1)], history.table_turnover(today, today))
+        self.assertFalse(table.has_any_active_orders())
+
+        self.view.controller.undo()
+        self.assertEqual(before, self.contents(table))
+        self.assertEqual({0, 1}, table.occupied_seats)
+        self.assertEqual(1, table.active_items)
+        self.assertEqual([], history.table_turnover(today, today))
+        self.view.controller.redo()
+        self.assertEqual([[] for _ in range(table.n_seats)], self.contents(table))
+        self.assertEqual([(4, 1)], history.table_turnover(today, today))
+
+    def test_undo_merge_restores_bills(self):
+        table = self.restaurant.tables[6]
+        for seat in (0, 2, 5):
+            table.order_for(seat).add_item(self.menu_items[seat])
+            table.order_for(seat).place_new_orders()
+        self.view.controller.table_touched(6)
+        self.view.controller.make_bills(printer=RecordingPrinter())
+        bills = list(self.view.controller.bills)
+        totals = [bill.total_cents for bill in bills]
+        self.view.controller.fuse_bills()
+        self.view.controller.seat_touched(HeadlessView.SEAT_ID_BASE + 0)
+        self.view.controller.seat_touched(HeadlessView.SEAT_ID_BASE + 5)
+        self.view.controller.done()
+        self.assertEqual(2, len(self.view.controller.bills))
+
+        self.view.controller.undo()
+        self.assertEqual(bills, self.view.controller.bills)
+        self.assertEqual(totals, [bill.total_cents for bill in bills])
+        self.assertEqual([[0], [2], [5]], [[order.seat_number for order in bill.orders] for bill in bills])
+        self.assertEqual((UI.bills, bills[0]), self.view.last_UI_created)
+
+    def bills_for_three_seats(self):
+        table = self.restaurant.tables[6]
+        for seat in (0, 1, 2):
+            table.order_for(seat).add_item(self.menu_items[seat])
+            table.order_for(seat).place_new_orders()
+        self.view.controller.table_touched(6)
+        self.view.controller.make_bills(printer=RecordingPrinter())
+        return table
+
+    def test_split_and_move_are_undone_before_a_merge(self):
+        self.bills_for_three_seats()
+        bills = self.view.controller.bills
+        totals = [bill.total_cents for bill in bills]
+        self.view.controller.fuse_bills()
+        self.view.controller.seat_touched(HeadlessView.SEAT_ID_BASE + 0)
+        self.view.controller.seat_touched(HeadlessView.SEAT_ID_BASE + 1)
+        self.view.controller.done()
+        self.view.controller.move_to_next_bill(self.menu_items[0])
+        self.view.controller.split_current()
+        self.assertEqual(sum(totals), sum(bill.total_cents for bill in bills))
+        for _ in range(3):
+            self.view.controller.undo()
+        self.assertEqual(totals, [bill.total_cents for bill in bills])
+        self.assertEqual([[0], [1], [2]], [[order.seat_number for order in bill.orders] for bill in bills])
+        for _ in range(3):
+            self.view.controller.redo()
+        self.assertEqual(sum(totals), sum(bill.total_cents for bill in bills))
+        self.assertEqual(4, len(bills))
+
+    def test_making_bills_ends_undo_of_the_table_items(self):
+        self.view.controller.table_touched(6)
+        self.view.controller.seat_touched(0)
+        self.view.controller.add_item(self.menu_items[0])
+        self.view.controller.update_order()
+        unplaced = self.restaurant.tables[6].order_for(1)  # dropped when bills are made
+        self.restaurant.commands.execute(AddItem(unplaced, self.menu_items[1]))
+        other = self.restaurant.commands.execute(AddItem(self.restaurant.tables[1].order_for(0), self.menu_items[3]))
+        self.view.controller.make_bills(printer=RecordingPrinter())
+        self.assertEqual([other], list(self.restaurant.commands.done))
+        bill = self.view.controller.bills[0]
+        self.view.controller.undo()
+        self.assertIsNone(self.restaurant.commands.undo())
+        self.assertEqual(1, len(self.restaurant.tables[6].order_for(0).items))
+        self.assertEqual(self.menu_items[0].price_cents, bill.total_cents)
+
+    def test_log_is_bounded_and_new_commands_forget_redo(self):
+        order = self.restaurant.tables[1].order_for(0)
+        steps = []
+        self.restaurant.commands.listeners.append(lambda step, command: steps.append(step))
+        for _ in range(15):
+            self.restaurant.commands.execute(AddItem(order, self.menu_items[0]))
+        self.assertEqual(10, len(self.restaurant.commands))
+        while self.restaurant.commands.undo():
+            pass
+        self.assertEqual(5, len(order.items))
+        self.restaurant.commands.redo()
+        self.restaurant.commands.execute(AddItem(order, self.menu_items[1]))
+        self.assertIsNone(self.restaurant.commands.redo())
+        self.assertEqual(['do'] * 15 + ['undo'] * 10 + ['redo', 'do'], steps)
+
+    def test_undo_is_journaled(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        journal = Journal(directory)
+        journal.open(self.restaurant)
+        order = self.restaurant.tables[2].order_for(1)
+        for ix in range(3):
+            order.add_item(self.menu_items[ix])
+        order.place_new_orders()
+        self.view.controller.table_touched(2)
+        self.view.controller.seat_touched(1)
+        self.view.controller.remove(order.items[0])
+        self.view.controller.undo()
+        journal.close()
+
+        restored = Restaurant()
+        Journal(directory).open(restored)
+        self.assertEqual(self.contents(self.restaurant.tables[2]), self.contents(restored.tables[2]))
+
+
+class MergeOrdersTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.table = self.restaurant.tables[6]
+        menu_items = self.restaurant.menu_items
+        self.bills = []
+        for seat in range(self.table.n_seats):
+            order = self.table.order_for(seat)
+            order.add_item(menu_items[seat])
+            self.bills.append(Bill(order))
+
+    def test_merge_moves_orders_and_aggregates(self):
+        before = sum(bill.total_cents for bill in self.bills)
+        new_bill, emptied = merge_orders(self.bills, {1, 3, 4}, self.table)
+        self.assertEqual([1, 3, 4], [order.seat_number for order in new_bill.orders])
+        self.assertEqual(self.bills[1:2] + self.bills[3:5], emptied)
+        self.assertEqual(3, sum(new_bill.items.values()))
+        self.assertEqual(before, new_bill.total_cents + sum(bill.total_cents for bill in self.bills))
+
+    def test_merge_publishes_event(self):
+        received = []
+        self.restaurant.events.subscribe(BillsMerged, received.append)
+        new_bill, _ = merge_orders(self.bills, {0, 7}, self.table)
+        self.assertIs(new_bill, received[0].bill)
+        self.assertEqual({0, 7}, received[0].seats)
+
+
+class TableTrackingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.table = self.restaurant.tables[6]
+        self.menu_items = self.restaurant.menu_items
+
+    def test_occupied_seats_follow_added_and_removed_items(self):
+        order = self.table.order_for(3)
+        order.add_item(self.menu_items[0])
+        order.add_item(self.menu_items[1])
+        self.assertEqual({3}, self.table.occupied_seats)
+        order.remove_item(order.items[0])
+        self.assertTrue(self.table.has_order_for(3))
+        order.remove_unordered_items()
+        self.assertFalse(self.table.has_order_for(3))
+
+    def test_active_items_counted_when_placed_and_cleared(self):
+        first, second = self.table.order_for(0), self.table.order_for(5)
+        first.add_item(self.menu_items[0])
+        second.add_item(self.menu_items[1])
+        self.assertFalse(self.table.has_any_active_orders())
+        first.place_new_orders()
+        second.place_new_orders()
+        self.assertEqual(2, self.table.active_items)
+        first.remove_item(first.items[0])
+        self.assertEqual(1, self.table.active_items)
+        self.table.clear_table()
+        self.assertFalse(self.table.has_any_active_orders())
+        self.assertEqual(set(), self.table.occupied_seats)
+
+    def test_orders_cleared_off_a_table_no_longer_count_for_it(self):
+        old = self.table.order_for(0)
+        old.add_item(self.menu_items[0])
+        old.place_new_orders()
+        self.table.clear_table()
+        self.assertIsNone(old.table)
+        old.add_item(self.menu_items[1])
+        old.items[0].mark_as_served()
+        old.remove_item(old.items[1])
+        self.assertEqual((0, set()), (self.table.active_items, self.table.occupied_seats))
+
+
+class OrderItemStateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.table = self.restaurant.tables[0]
+        self.order = self.table.order_for(1)
+        self.order.add_item(self.restaurant.menu_items[2])
+        self.item = self.order.items[0]
+
+    def test_item_goes_through_ordered_to_served(self):
+        self.item.mark_as_ordered()
+        self.assertTrue(self.table.has_any_active_orders())
+        self.item.mark_as_served()
+        self.assertTrue(self.item.has_been_ordered())
+        self.assertTrue(self.item.has_been_served())
+        self.assertFalse(self.item.can_be_cancelled())
+        self.assertFalse(self.table.has_any_active_orders())
+        self.assertFalse(self.order.is_empty())
+
+    def test_invalid_transitions_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.item.mark_as_served()
+        self.item.mark_as_ordered()
+        with self.assertRaises(ValueError):
+            self.item.mark_as_ordered()
+        self.assertEqual(ItemState.ORDERED, self.item.state)
+
+    def test_items_and_orders_have_no_instance_dict(self):
+        self.assertFalse(hasattr(self.item, '__dict__'))
+        self.assertFalse(hasattr(self.order, '__dict__'))
+
+
+class RunningTotalsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.burger, self.club = self.restaurant.menu_items[0], self.restaurant.menu_items[1]
+        table = self.restaurant.tables[0]
+        self.first, self.second = table.order_for(0), table.order_for(1)
+
+    def test_prices_are_integer_cents(self):
+        self.assertEqual(1600, self.burger.price_cents)
+        self.assertEqual(1450, self.club.price_cents)
+        self.assertEqual(14.5, self.club.price)
+
+    def test_order_total_follows_adds_and_removes(self):
+        for _ in range(3):
+            self.first.add_item(self.club)
+        self.first.remove_item(self.first.items[1])
+        self.assertEqual(2900, self.first.total_cents)
+        self.assertEqual('29.00', format_money(self.first.total_cents))
+
+    def test_bill_aggregates_follow_orders(self):
+        self.first.add_item(self.burger)
+        self.first.add_item(self.club)
+        self.second.add_item(self.club)
+        bill = Bill(self.first)
+        bill.add_order(self.second)
+        self.assertEqual({self.burger: 1, self.club: 2}, bill.items)
+        self.assertEqual(4500, bill.total_cents)
+        bill.remove_order(self.first)
+        self.assertEqual({self.club: 1}, bill.items)
+        self.assertEqual(1450, bill.total_cents)
+
+    def test_format_money(self):
+        self.assertEqual('0.05', format_money(5))
+        self.assertEqual('-12.30', format_money(-1230))
+
+
+class MenuCatalogTestCase(unittest.TestCase):
+
+    def test_ids_and_indexes(self):
+        menu = MenuCatalog([('Tea', 2), ('Soup', 7, 'Starters'), ('Pie', 9, 'Desserts'), ('Salad', 8, 'Starters')])
+        self.assertEqual([0, 1, 2, 3], [item.item_id for item in menu.items])
+        self.assertIs(menu.items[2], menu.by_id[2])
+        self.assertIs(menu.items[1], menu.find('Soup'))
+        self.assertIsNone(menu.find('Steak'))
+        self.assertEqual(['Soup', 'Salad'], [item.name for item in menu.in_category('Starters')])
+        self.assertEqual([], menu.in_category('Mains'))
+
+    def test_update_keeps_ids_and_bumps_version_only_on_change(self):
+        menu = MenuCatalog([('Tea', 2), ('Soup', 7)])
+        tea, soup = menu.items
+        self.assertFalse(menu.update([('Tea', 2), ('Soup', 7)]))
+        self.assertEqual(1, menu.version)
+        self.assertTrue(menu.update([('Soup', 7.5), ('Cake', 6)]))
+        self.assertEqual(2, menu.version)
+        self.assertIs(soup, menu.items[0])
+        self.assertEqual(750, soup.price_cents)
+        self.assertEqual(2, menu.items[1].item_id)
+        self.assertIsNone(menu.find('Tea'))
+        menu.update([('Tea', 2)])
+        self.assertIs(tea, menu.find('Tea'))
+
+    def test_restaurant_menu_items_follow_catalog(self):
+        restaurant = Restaurant()
+        self.assertIs(restaurant.menu.items, restaurant.menu_items)
+        self.assertEqual([name for name, _ in MENU_ITEMS], [item.name for item in restaurant.menu_items])
+        burger = restaurant.menu_items[0]
+        restaurant.reconfigure(TABLES, [('Poutine', 9)] + MENU_ITEMS)
+        self.assertIs(burger, restaurant.menu.by_id[0])
+        self.assertEqual(len(MENU_ITEMS), restaurant.menu_items[0].item_id)
+
+    def test_menu_buttons_are_laid_out_once_per_version_and_paged(self):
+        restaurant = Restaurant()
+        view = benchmarks.offscreen_server_view(restaurant)
+        order = restaurant.tables[0].order_for(0)
+        pages = view.menu_pages()
+        view.create_order_ui(order)
+        self.assertIs(pages, view.menu_pages())
+        self.assertEqual(1, len(pages))
+        restaurant.menu.update(benchmarks.synthetic_menu(300))
+        pages = view.menu_pages()
+        self.assertEqual(-(-300 // MENU_PAGE_SIZE), len(pages))
+        view.screen = None
+        view.create_order_ui(order)
+        buttons = [options for kind, _, options in view.canvas.items.values() if kind == 'text']
+        self.assertIn({'text': 'Dish 0', 'fill': '#fff'}, buttons)
+        self.assertNotIn({'text': f'Dish {MENU_PAGE_SIZE}', 'fill': '#fff'}, buttons)
+        view.menu_page = 1
+        view.create_order_ui(order)
+        buttons = [options['text'] for kind, _, options in view.canvas.items.values() if kind == 'text']
+        self.assertIn(f'Dish {MENU_PAGE_SIZE}', buttons)
+        self.assertIn(f'2/{len(pages)} >', buttons)
+
+
+class SplitBillTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.burger, self.club = self.restaurant.menu_items[0], self.restaurant.menu_items[1]
+        table = self.restaurant.tables[0]
+        self.first, self.second = table.order_for(0), table.order_for(1)
+        self.first.add_item(self.burger)
+        self.first.add_item(self.club)
+        self.second.add_item(self.club)
+        self.bill = Bill(self.first)
+
+    def test_allocate_is_exact(self):
+        self.assertEqual([334, 333, 333], allocate(1000, [1, 1, 1]))
+        self.assertEqual([333, 334, 333], allocate(1000, [1, 1, 1], offset=1))
+        self.assertEqual([250, 750], allocate(1000, [1, 3]))
+        self.assertEqual([1, 0, 1], allocate(2, [2, 1, 2]))
+        self.assertEqual([0, 0], allocate(0, [1, 1]))
+        with self.assertRaises(ValueError):
+            allocate(100, [0, 0])
+
+    def test_move_item_updates_both_bills(self):
+        other = Bill(self.second)
+        move_item(self.first.items[0], self.bill, other)
+        self.assertEqual({self.club: 1}, self.bill.items)
+        self.assertEqual(1450, self.bill.total_cents)
+        self.assertEqual({self.club: 1, self.burger: 1}, other.items)
+        self.assertEqual(3050, other.total_cents)
+
+    def test_split_item_three_ways_and_rejoin(self):
+        others = [Bill(None), Bill(None)]
+        burger = self.first.items[0]
+        split_item(burger, self.bill, [self.bill] + others)
+        self.assertEqual({self.club: 1}, self.bill.items)
+        self.assertEqual([534, 533, 533], [b.shares[burger].cents for b in [self.bill] + others])
+        self.assertEqual(1450 + 534, self.bill.total_cents)
+        self.assertEqual('1/3', str(others[0].shares[burger].fraction))
+        for other in others:
+            move_item(burger, other, self.bill)
+        self.assertEqual({self.burger: 1, self.club: 1}, self.bill.items)
+        self.assertEqual(3050, self.bill.total_cents)
+        self.assertEqual([], self.bill.partial_shares())
+
+    def test_proportional_split_bill(self):
+        self.bill.add_order(self.second)
+        bills = split_bill(self.bill, [2, 1])
+        self.assertEqual([3000, 1500], [b.total_cents for b in bills])
+        self.assertEqual([1067, 533], [b.shares[self.first.items[0]].cents for b in bills])
+        self.assertEqual(0, self.bill.total_cents)
+        self.assertEqual({}, self.bill.shares)
+        with self.assertRaises(ValueError):
+            split_bill(bills[0], 1)
+
+    def test_seats_of_split_bills_can_be_fused(self):
+        self.bill.add_order(self.second)
+        bills = split_bill(self.bill, 2)
+        merged, emptied = merge_orders(bills, {0})
+        self.assertEqual([self.first], merged.orders)
+        self.assertEqual({self.burger: 1, self.club: 1}, merged.items)
+        self.assertEqual(3050, merged.total_cents)
+        self.assertEqual([], emptied)
+        self.assertEqual([725, 725], [bill.total_cents for bill in bills])
+        self.assertEqual([[self.second], [self.second]], [bill.orders for bill in bills])
+
+    def test_even_split_of_many_items_is_exact(self):
+        order = self.restaurant.tables[6].order_for(0)
+        for ix in range(40):
+            order.add_item(self.restaurant.menu_items[ix % len(self.restaurant.menu_items)])
+        bill = Bill(order)
+        total = bill.total_cents
+        bills = split_bill(bill, 3)
+        self.assertEqual(allocate(total, [1, 1, 1]), [b.total_cents for b in bills])
+        for item in order.items:
+            self.assertEqual(item.details.price_cents, sum(b.shares[item].cents for b in bills))
+
+    def test_merge_keeps_moved_items_where_they_are(self):
+        other = Bill(self.second)
+        move_item(self.first.items[1], self.bill, other)
+        merged, emptied = merge_orders([self.bill, other], {0})
+        self.assertEqual({self.burger: 1}, merged.items)
+        self.assertEqual({self.club: 2}, other.items)
+        self.assertEqual([self.bill], emptied)
+
+    def test_receipt_and_history_show_shares(self):
+        others = [Bill(None), Bill(None)]
+        split_item(self.first.items[1], self.bill, [self.bill, others[0]])
+        receipt = receipt_from_bill(self.bill, 0, datetime(2026, 10, 18))
+        self.assertIn(('1/2', 'Chicken club', 725), receipt.lines)
+        self.assertEqual(2325, receipt.subtotal_cents())
+        self.assertEqual([(0, 'House burger', 1, 1, 1600), (0, 'Chicken club', 0.5, 1, 725)],
+                         list(bill_lines(self.bill)))
+
+    def test_bills_controller_splits_current_bill(self):
+        view = HeadlessView(self.restaurant)
+        self.first.place_new_orders()
+        self.second.place_new_orders()
+        controller = BillsController(view, self.restaurant, self.restaurant.tables[0])
+        controller.split_current(2)
+        self.assertEqual(3, len(controller.bills))
+        self.assertEqual([1525, 1525, 1450], [b.total_cents for b in controller.bills])
+        controller.change_current(controller.bills[2])
+        controller.move_to_next_bill(self.club)
+        self.assertEqual([1525, 1525, 0, 1450], [b.total_cents for b in controller.bills])
+
+
+class ModelEventTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.received = []
+        self.restaurant.events.subscribe(ModelEvent, self.received.append)
+        self.table = self.restaurant.tables[1]
+        self.order = self.table.order_for(2)
+
+    def test_add_and_place_item_events(self):
+        self.order.add_item(self.restaurant.menu_items[0])
+        self.order.place_new_orders()
+        added, changed = self.received
+        self.assertIsInstance(added, ItemAdded)
+        self.assertEqual((self.table, 2, self.order.items[0]), (added.table, added.seat, added.item))
+        self.assertIsInstance(changed, ItemStateChanged)
+        self.assertEqual((ItemState.UNORDERED, ItemState.ORDERED), (changed.old_state, changed.new_state))
+
+    def test_remove_item_event_records_index(self):
+        self.order.add_item(self.restaurant.menu_items[0])
+        self.order.add_item(self.restaurant.menu_items[1])
+        second = self.order.items[1]
+        self.order.remove_unordered_items()
+        removed = [event for event in self.received if isinstance(event, ItemRemoved)]
+        self.assertEqual(2, len(removed))
+        self.assertEqual((second, 0), (removed[1].item, removed[1].index))
+
+    def test_subscribers_only_receive_their_event_type(self):
+        cleared = []
+        self.restaurant.events.subscribe(TableCleared, cleared.append)
+        self.order.add_item(self.restaurant.menu_items[0])
+        self.table.clear_table()
+        self.assertEqual(1, len(cleared))
+        self.assertIs(self.table, cleared[0].table)
+        self.assertEqual(2, len(self.received))
+
+
+class KitchenQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant()
+        self.now = 0
+        self.queue = KitchenQueue(self.restaurant, clock=lambda: self.now)
+        self.menu_items = self.restaurant.menu_items
+
+    def place(self, table_number, seat, *menu_indexes):
+        order = self.restaurant.tables[table_number].order_for(seat)
+        for ix in menu_indexes:
+            order.add_item(self.menu_items[ix])
+        order.place_new_orders()
+        return order
+
+    def test_kitchen_view_ignores_taps_on_closed_tickets(self):
+        from oorms import KitchenView
+
+        view = types.SimpleNamespace(queue=self.queue)
+        order = self.place(1, 0, 2)
+        ticket = self.queue.fire_next()
+        KitchenView.advance(view, ticket)
+        self.assertEqual(READY, ticket.state)
+        order.items[0].mark_as_served()  # served without the kitchen: the ticket is cancelled
+        KitchenView.advance(view, ticket)
+        self.assertEqual(CANCELLED, ticket.state)
+
+    def test_placed_items_are_grouped_by_table_and_fired_oldest_first(self):
+        self.place(3, 0, 0, 1)
+        self.now = 1
+        self.place(1, 0, 2)
+        self.place(3, 1, 4)
+        self.assertEqual(2, len(self.queue))
+        first = self.queue.fire_next()
+        self.assertEqual((3, 3, FIRED), (first.table.number, len(first.items), first.state))
+        self.place(3, 1, 5)  # the table's ticket has been fired, so this starts a new one
+        self.assertEqual([1, 3], [self.queue.fire_next().table.number for _ in range(2)])
+        self.assertIsNone(self.queue.fire_next())
+
+    def test_expedited_ticket_goes_first(self):
+        self.place(3, 0, 0)
+        self.now = 1
+        self.place(1, 0, 2)
+        self.queue.expedite(self.queue.tickets()[1])
+        self.assertEqual(1, self.queue.fire_next().table.number)
+        with self.assertRaises(ValueError):
+            self.queue.expedite(self.queue.tickets()[1])  # already fired
+        self.assertEqual(3, self.queue.fire_next().table.number)
+
+    def test_serving_a_ticket_serves_its_items(self):
+        order = self.place(2, 1, 0, 1)
+        ticket = self.queue.fire_next()
+        with self.assertRaises(ValueError):
+            self.queue.serve(ticket)
+        self.queue.ready(ticket)
+        self.queue.serve(ticket)
+        self.assertEqual(SERVED, ticket.state)
+        self.assertTrue(all(item.has_been_served() for item in order.items))
+        self.assertFalse(self.restaurant.tables[2].has_any_active_orders())
+        self.assertEqual(0, len(self.queue))
+
+    def test_cancelled_items_leave_their_ticket(self):
+        order = self.place(2, 1, 0, 1)
+        ticket = self.queue.tickets()[0]
+        order.remove_item(order.items[0])
+        self.assertEqual([order.items[0]], ticket.items)
+        order.remove_item(order.items[0])
+        self.assertEqual(CANCELLED, ticket.state)
+        self.place(4, 0, 3)
+        self.queue.fire_next()
+        self.restaurant.tables[4].clear_table()
+        self.assertEqual(0, len(self.queue))
+        self.assertIsNone(self.queue.fire_next())
+
+    def test_item_served_elsewhere_leaves_its_ticket(self):
+        order = self.place(2, 1, 0, 1)
+        order.items[0].mark_as_served()
+        self.assertEqual([order.items[1]], self.queue.tickets()[0].items)
+
+    def test_open_orders_are_queued_on_creation(self):
+        self.place(5, 0, 0)
+        self.assertEqual(1, len(KitchenQueue(self.restaurant)))
+
+    def test_headless_kitchen_drains_queue(self):
+        kitchen = HeadlessKitchen(self.queue)
+        for table in self.restaurant.tables:
+            for seat in range(table.n_seats):
+                self.place(table.number, seat, seat)
+        self.assertEqual(len(self.restaurant.tables), kitchen.run())
+        self.assertEqual(0, len(self.queue))
+        self.assertFalse(any(t.has_any_active_orders() for t in self.restaurant.tables))
+
+
+class UpdateSchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.pending = []
+        self.redraws = 0
+        self.scheduler = UpdateScheduler(lambda delay, callback: self.pending.append((delay, callback)),
+                                         self.redraw, max_per_second=10, clock=lambda: self.now)
+
+    def redraw(self):
+        self.redraws += 1
+
+    def run_pending(self):
+        pending, self.pending = self.pending, []
+        for _, callback in pending:
+            callback()
+
+    def test_burst_of_requests_is_coalesced(self):
+        for _ in range(5):
+            self.scheduler.request()
+        self.assertEqual(1, len(self.pending))
+        self.assertEqual(0, self.pending[0][0])
+        self.assertEqual(0, self.redraws)
+        self.run_pending()
+        self.assertEqual(1, self.redraws)
+
+    def test_redraws_are_rate_limited(self):
+        self.scheduler.request()
+        self.run_pending()
+        self.now = 0.04
+        self.scheduler.request()
+        self.assertEqual(60, self.pending[0][0])
+        self.run_pending()
+        self.assertEqual(2, self.redraws)
+
+    def test_explicit_flush_makes_scheduled_call_a_no_op(self):
+        self.scheduler.request()
+        self.scheduler.flush()
+        self.run_pending()
+        self.assertEqual(1, self.redraws)
+
+
+class ConcurrentModelTestCase(unittest.TestCase):
+
+    def test_no_lost_updates_on_shared_table(self):
+        restaurant = Restaurant()
+        table = restaurant.tables[6]
+        menu_item = restaurant.menu_items[1]
+        start_line = threading.Barrier(8)
+
+        def worker(seat):
+            order = table.order_for(seat)
+            start_line.wait()
+            for _ in range(500):
+                order.add_item(menu_item)
+                order.place_new_orders()
+            for item in order.items[::2]:
+                order.remove_item(item)
+
+        threads = [threading.Thread(target=worker, args=(seat,)) for seat in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(8 * 250, table.active_items)
+        self.assertEqual(set(range(8)), table.occupied_seats)
+        self.assertEqual(8 * 250 * menu_item.price_cents, sum(order.total_cents for order in table.orders))
+
+    def test_threads_on_separate_tables(self):
+        restaurant = Restaurant(benchmarks.synthetic_floor(16, 2))
+        benchmarks.concurrent_order_entry(restaurant, 4, 400)
+        for table in restaurant.tables:
+            self.assertEqual(0, table.active_items)
+            self.assertEqual(set(), table.occupied_seats)
+
+
+class PrintSpoolerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.spooler = PrintSpooler()
+        self.addCleanup(self.spooler.close)
+
+    def wait_for(self, count):
+        texts = []
+        deadline = time.monotonic() + 5
+        while len(texts) < count and time.monotonic() < deadline:
+            texts.extend(self.spooler.take_completed())
+            time.sleep(0.001)
+        return texts
+
+    def test_jobs_complete_in_submission_order(self):
+        self.spooler.submit('header')
+        self.spooler.submit(lambda: 'formatted ' * 2)
+        self.spooler.submit('footer')
+        self.assertEqual(['header', 'formatted formatted ', 'footer'], self.wait_for(3))
+        self.assertEqual(0, self.spooler.outstanding)
+
+    def test_failing_job_does_not_stop_the_spooler(self):
+        self.spooler.submit(lambda: 1 / 0)
+        self.spooler.submit('next')
+        failed, following = self.wait_for(2)
+        self.assertIn('failed', failed)
+        self.assertEqual('next', following)
+
+    def test_bill_printed_as_one_job(self):
+        restaurant = Restaurant()
+        view = HeadlessView(restaurant)
+        order = restaurant.tables[0].order_for(0)
+        order.add_item(restaurant.menu_items[1])
+        order.add_item(restaurant.menu_items[1])
+        order.place_new_orders()
+        view.controller.table_touched(0)
+        view.controller.make_bills(view.printer_window)
+        view.controller.print_bill(view.controller.current_bill)
+        receipt = view.printer_window.lines[-1]
+        self.assertIn('Table 0', receipt)
+        self.assertIn('2     Chicken club                29.00$', receipt)
+        self.assertIn('Total                             32.77$', receipt)
+
+
+class ReceiptTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.receipt = Receipt(5, [(2, 'Chicken club', 2900), (1, 'Beef Cheek', 2400)],
+                               datetime(2026, 10, 18, 19, 5))
+
+    def test_template_is_compiled_once(self):
+        self.assertIs(compile_template(), compile_template())
+        self.assertIsNot(compile_template(), compile_template(tax_rate_percent=5))
+
+    def test_totals_and_tax_are_exact(self):
+        text = as_text(compile_template().render(self.receipt))
+        self.assertIn('Table 5                 2026-10-18 19:05', text)
+        self.assertIn('Subtotal                          53.00$', text)
+        self.assertIn('HST 13%                            6.89$', text)
+        self.assertIn('Total                             59.89$', text)
+        self.assertEqual(1, tax_cents(5, 13))
+        self.assertEqual(0, tax_cents(3, 13))
+
+    def test_every_line_fits_the_tape(self):
+        long_name = Receipt(1, [(12, 'x' * 60, 123456)], datetime(2026, 1, 1))
+        for _, line in compile_template().render(long_name):
+            self.assertLessEqual(len(line), 40)
+
+    def test_backends(self):
+        text, device = io.StringIO(), io.BytesIO()
+        ReceiptEngine(TextFileBackend(text)).print_many([self.receipt, self.receipt])
+        ReceiptEngine(EscPosBackend(device)).print(self.receipt)
+        self.assertEqual(2, text.getvalue().count('Méthode de paiement'))
+        data = device.getvalue()
+        self.assertTrue(data.startswith(EscPosBackend.INITIALIZE))
+        self.assertTrue(data.endswith(EscPosBackend.FEED_AND_CUT))
+        self.assertIn('Méthode'.encode('cp858'), data)
+        self.assertIn(EscPosBackend.BOLD_ON + b'Total', data)
+
+
+class JournalTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def populate(self, restaurant):
+        menu_items = restaurant.menu_items
+        first, second = restaurant.tables[2].order_for(1), restaurant.tables[6].order_for(7)
+        for ix in range(4):
+            first.add_item(menu_items[ix])
+        first.remove_item(first.items[1])
+        first.place_new_orders()
+        first.items[0].mark_as_served()
+        second.add_item(menu_items[9])
+        restaurant.tables[0].order_for(0).add_item(menu_items[0])
+        restaurant.tables[0].clear_table()
+
+    def assertSameState(self, expected, actual):
+        def state(restaurant):
+            return [[[(item.details.name, item.state) for item in order.items] for order in table.orders]
+                    for table in restaurant.tables]
+        self.assertEqual(state(expected), state(actual))
+        for expected_table, actual_table in zip(expected.tables, actual.tables):
+            self.assertEqual(expected_table.occupied_seats, actual_table.occupied_seats)
+            self.assertEqual(expected_table.active_items, actual_table.active_items)
+
+    def test_replays_journal_after_crash(self):
+        original = Restaurant()
+        journal = Journal(self.directory)
+        journal.open(original)
+        self.populate(original)
+        journal.file.close()  # crash: no snapshot, no final fsync
+
+        restored = Restaurant()
+        replayed = Journal(self.directory).open(restored)
+        self.assertEqual(journal.seq, replayed)
+        self.assertSameState(original, restored)
+
+    def test_snapshot_then_journal_tail(self):
+        original = Restaurant()
+        journal = Journal(self.directory, snapshot_every=5)
+        journal.open(original)
+        self.populate(original)
+        journal.close()
+
+        restored = Restaurant()
+        self.assertEqual(0, Journal(self.directory).open(restored))
+        self.assertSameState(original, restored)
+
+    def test_torn_last_record_is_ignored(self):
+        original = Restaurant()
+        journal = Journal(self.directory)
+        journal.open(original)
+        original.tables[1].order_for(0).add_item(original.menu_items[3])
+        journal.file.write('{"op": "add", "tab')
+        journal.file.close()
+
+        restored = Restaurant()
+        self.assertEqual(1, Journal(self.directory).open(restored))
+        self.assertSameState(original, restored)
+
+
+    def test_records_after_a_torn_record_survive_a_second_crash(self):
+        original = Restaurant()
+        journal = Journal(self.directory)
+        journal.open(original)
+        original.tables[1].order_for(0).add_item(original.menu_items[3])
+        journal.file.write('{"op": "add", "tab')
+        journal.file.close()  # first crash, mid-record
+
+        recovered = Restaurant()
+        journal = Journal(self.directory)
+        journal.open(recovered)
+        recovered.tables[1].order_for(1).add_item(recovered.menu_items[4])
+        recovered.tables[1].order_for(1).add_item(recovered.menu_items[5])
+        journal.file.close()  # second crash
+
+        restored = Restaurant()
+        self.assertEqual(3, Journal(self.directory).open(restored))
+        self.assertSameState(recovered, restored)
+
+
+class ConfigTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_shipped_file_matches_constants(self):
+        config = load_config(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'restaurant.json'))
+        self.assertEqual(TABLES, config.tables)
+        self.assertEqual(MENU_ITEMS, config.menu_items)
+
+    def test_loads_toml_and_caches_until_changed(self):
+        path = self.write('floor.toml', '[[tables]]\nseats = 2\nlocation = [10, 10]\n'
+                                        '[[menu]]\nname = "Tea"\nprice = 2.5\n')
+        config = load_config(path)
+        self.assertEqual([(2, (10, 10))], config.tables)
+        self.assertEqual([('Tea', 2.5)], config.menu_items)
+        self.assertIs(config, load_config(path))
+        self.write('floor.toml', '[[tables]]\nseats = 4\nlocation = [10, 10]\n'
+                                 '[[menu]]\nname = "Tea"\nprice = 2.5\n')
+        self.assertEqual([(4, (10, 10))], load_config(path).tables)
+
+    def test_menu_categories_are_optional(self):
+        path = self.write('menu.json', '{"tables": [{"seats": 2, "location": [0, 0]}], '
+                                       '"menu": [{"name": "Tea", "price": 2, "category": "Drinks"}, '
+                                       '{"name": "Pie", "price": 6}]}')
+        config = load_config(path)
+        self.assertEqual([('Tea', 2, 'Drinks'), ('Pie', 6)], config.menu_items)
+        restaurant = Restaurant(config.tables, config.menu_items)
+        self.assertEqual(['Tea'], [item.name for item in restaurant.menu.in_category('Drinks')])
+
+    def test_rejects_invalid_files(self):
+        for text in ('[', '{"tables": [], "menu": [{"name": "Tea", "price": 1}]}',
+                     '{"tables": [{"seats": 0, "location": [0, 0]}], "menu": [{"name": "Tea", "price": 1}]}',
+                     '{"tables": [{"seats": 2, "location": [0]}], "menu": [{"name": "Tea", "price": 1}]}',
+                     '{"tables": [{"seats": 2, "location": [0, 0]}], "menu": [{"name": "Tea", "price": -1}]}',
+                     '{"tables": [{"seats": 2, "location": [0, 0]}], '
+                     '"menu": [{"name": "Tea", "price": 1}, {"name": "Tea", "price": 2}]}'):
+            with self.assertRaises(ValueError):
+                load_config(self.write('bad.json', text))
+
+    def test_reconfigure_keeps_open_orders(self):
+        restaurant = Restaurant()
+        events = []
+        restaurant.events.subscribe(ModelEvent, events.append)
+        burger = restaurant.menu_items[0]
+        order = restaurant.tables[1].order_for(0)
+        order.add_item(burger)
+        tables = [(seats, location) for seats, location in TABLES[:-1]]
+        tables[1] = (2, (150, 150))
+        menu = [(name, price + 1) for name, price in MENU_ITEMS[:-1]] + [('Poutine', 9)]
+        changed = restaurant.reconfigure(tables, menu)
+        self.assertEqual([restaurant.tables[1]], changed)
+        self.assertEqual(len(TABLES) - 1, len(restaurant.tables))
+        self.assertEqual(2, len(restaurant.tables[1].orders))
+        self.assertIs(order, restaurant.tables[1].order_for(0))
+        self.assertIs(burger, restaurant.menu_items[0])
+        self.assertEqual(MENU_ITEMS[0][1] + 1, order.items[0].details.price)
+        self.assertEqual('Poutine', restaurant.menu_items[-1].name)
+        self.assertEqual(1, restaurant.layout_version)
+        self.assertIsInstance(events[-1], RestaurantReconfigured)
+
+    def test_price_change_reprices_open_orders(self):
+        restaurant = Restaurant()
+        burger = restaurant.menu_items[0]
+        order = restaurant.tables[0].order_for(0)
+        order.add_item(burger)
+        bill = Bill(order)
+        restaurant.reconfigure(TABLES, [(MENU_ITEMS[0][0], 18)] + MENU_ITEMS[1:])
+        self.assertEqual(1800, order.total_cents)
+        self.assertEqual(1600, bill.total_cents)
+        bill.discharge(order.items[0])
+        order.remove_item(order.items[0])
+        self.assertEqual(0, order.total_cents)
+        self.assertEqual(0, bill.total_cents)
+
+    def test_reconfigure_refuses_to_drop_orders(self):
+        restaurant = Restaurant()
+        restaurant.tables[1].order_for(3).add_item(restaurant.menu_items[-1])
+        tables = list(TABLES)
+        tables[1] = (2, TABLES[1][1])
+        for new_tables, menu in ((tables, MENU_ITEMS), (TABLES[:1], MENU_ITEMS), (TABLES, MENU_ITEMS[:-1])):
+            with self.assertRaises(ValueError):
+                restaurant.reconfigure(new_tables, menu)
+        self.assertEqual(len(TABLES), len(restaurant.tables))
+        self.assertEqual(TABLES[1][0], restaurant.tables[1].n_seats)
+        self.assertEqual(0, restaurant.layout_version)
+
+    def test_watcher_applies_changes(self):
+        path = self.write('floor.json', '{"tables": [{"seats": 2, "location": [0, 0]}], '
+                                        '"menu": [{"name": "Tea", "price": 2}]}')
+        config = load_config(path)
+        restaurant = Restaurant(config.tables, config.menu_items)
+        errors = []
+        watcher = ConfigWatcher(path, restaurant, on_error=errors.append)
+        self.assertFalse(watcher.poll())
+        self.write('floor.json', '{"tables": [{"seats": 2, "location": [0, 0]}, {"seats": 4, "location": [90, 0]}], '
+                                 '"menu": [{"name": "Tea", "price": 2}, {"name": "Coffee", "price": 3}]}')
+        self.assertTrue(watcher.poll())
+        self.assertEqual(2, len(restaurant.tables))
+        self.assertEqual(['Tea', 'Coffee'], [item.name for item in restaurant.menu_items])
+        self.write('floor.json', '{"tables": []}')
+        self.assertFalse(watcher.poll())
+        self.assertEqual(1, len(errors))
+
+    def test_journal_follows_new_menu(self):
+        restaurant = Restaurant()
+        journal = Journal(self.directory)
+        journal.open(restaurant)
+        restaurant.reconfigure(TABLES, [('Poutine', 9)] + MENU_ITEMS)
+        restaurant.tables[0].order_for(0).add_item(restaurant.menu_items[0])
+        journal.close()
+        restored = Restaurant(TABLES, [('Poutine', 9)] + MENU_ITEMS)
+        Journal(self.directory).open(restored)
+        self.assertEqual('Poutine', restored.tables[0].order_for(0).items[0].details.name)
+
+    def test_journal_survives_menu_reordered_while_down(self):
+        restaurant = Restaurant()
+        journal = Journal(self.directory, snapshot_every=3)
+        journal.open(restaurant)
+        for ix in range(4):
+            restaurant.tables[1].order_for(0).add_item(restaurant.menu_items[ix])
+        journal.close()
+        reordered = Restaurant(TABLES, MENU_ITEMS[::-1])
+        Journal(self.directory).open(reordered)
+        self.assertEqual([name for name, _ in MENU_ITEMS[:4]],
+                         [item.details.name for item in reordered.tables[1].order_for(0).items])
+
+    def test_journal_refuses_dish_missing_from_menu(self):
+        restaurant = Restaurant()
+        journal = Journal(self.directory)
+        journal.open(restaurant)
+        restaurant.tables[1].order_for(0).add_item(restaurant.menu_items[3])
+        journal.close()
+        with self.assertRaisesRegex(ValueError, 'not on the menu'):
+            Journal(self.directory).open(Restaurant(TABLES, MENU_ITEMS[:1]))
+
+
+class BillHistoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.history = BillHistory(':memory:')
+        self.addCleanup(self.history.close)
+        self.restaurant = Restaurant()
+        self.menu_items = self.restaurant.menu_items
+
+    def settle(self, table_number, seats_items, closed_at):
+        table = self.restaurant.tables[table_number]
+        bills = []
+        for seat, item_indices in seats_items.items():
+            order = table.order_for(seat)
+            for ix in item_indices:
+                order.add_item(self.menu_items[ix])
+            bills.append(Bill(order))
+        self.history.record_bills(table_number, bills, closed_at)
+        table.clear_table()
+
+    def test_reports(self):
+        self.settle(1, {0: [0, 0, 1], 1: [2]}, datetime(2026, 10, 1, 19, 30))
+        self.settle(1, {2: [0]}, datetime(2026, 10, 1, 21, 0))
+        self.settle(3, {0: [1]}, datetime(2026, 10, 2, 12, 0))
+        self.assertEqual([('2026-10-01', 3, 1600 * 3 + 1450 * 2), ('2026-10-02', 1, 1450)],
+                         self.history.revenue_by_day('2026-10-01', '2026-10-31'))
+        self.assertEqual([('House burger', 3, 4800), ('Chicken club', 1, 1450)],
+                         self.history.item_popularity('2026-10-01', '2026-10-01', limit=2))
+        self.assertEqual([(1, 2)], self.history.table_turnover('2026-10-01', '2026-10-01'))
+
+    def test_split_item_is_sold_once(self):
+        table = self.restaurant.tables[2]
+        order = table.order_for(0)
+        order.add_item(self.menu_items[0])
+        bills = split_bill(Bill(order), 3)
+        self.history.record_bills(2, bills, datetime(2026, 10, 4, 20, 0))
+        self.assertEqual([('House burger', 1, 1600)], self.history.item_popularity('2026-10-04', '2026-10-04'))
+        lines = [lines for *_, lines in self.history.closed_bills('2026-10-04', '2026-10-04')]
+        self.assertEqual([[('House burger', 1 / 3, 1, cents)] for cents in (534, 533, 533)], lines)
+        self.assertEqual([('1/3', 'House burger', 534)], list(receipt_lines(lines[0])))
+
+    def test_settlements_in_the_same_second_count_separately(self):
+        closed_at = datetime(2026, 10, 3, 20, 0)
+        self.settle(2, {0: [0], 1: [1]}, closed_at)
+        self.settle(2, {0: [2]}, closed_at)
+        self.assertEqual([(2, 2)], self.history.table_turnover('2026-10-03', '2026-10-03'))
+
+    def test_bills_controller_done_records_bills(self):
+        self.restaurant.history = self.history
+        view = HeadlessView(self.restaurant)
+        order = self.restaurant.tables[4].order_for(1)
+        order.add_item(self.menu_items[5])
+        order.place_new_orders()
+        view.controller.table_touched(4)
+        view.controller.make_bills(RecordingPrinter())
+        view.controller.done()
+        today = datetime.now().date().isoformat()
+        self.assertEqual([(4, 1)], self.history.table_turnover(today, today))
+
+
+class LoadGeneratorTestCase(unittest.TestCase):
+
+    def test_random_sessions_keep_model_consistent(self):
+        generator = LoadGenerator(seed=3)
+        generator.run(200)
+        report = generator.recorder.report()
+        self.assertIn('OrderController.add_item', report)
+        self.assertIn('FusionController.done', report)
+        self.assertEqual(generator.recorder.operations(), sum(row[0] for row in report.values()))
+        for table in generator.restaurant.tables:
+            active = sum(item.is_active() for order in table.orders for item in order.items)
+            self.assertEqual(active, table.active_items)
+            self.assertEqual({order.seat_number for order in table.orders if order.items},
+                             table.occupied_seats)
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(50, percentile(samples, 50))
+        self.assertEqual(99, percentile(samples, 99))
+        self.assertEqual(1, percentile([1], 90))
+
+
+class SpatialIndexTestCase(unittest.TestCase):
+
+    def test_finds_last_inserted_box_containing_point(self):
+        index = GridIndex(cell_size=10)
+        index.insert((0, 0, 25, 25), 'big')
+        index.insert((12, 12, 14, 14), 'small')
+        self.assertEqual('small', index.find(13, 13))
+        self.assertEqual('big', index.find(24, 3))
+        self.assertIsNone(index.find(26, 3))
+        self.assertIsNone(index.find(-5, -5))
+        self.assertEqual(2, len(index))
+
+    def test_agrees_with_linear_scan_on_large_floor(self):
+        restaurant = Restaurant(benchmarks.synthetic_floor(300, 12))
+        index = floor_index(restaurant.tables)
+        boxes = []
+        for table in restaurant.tables:
+            table_bbox, seat_bboxes = table_geometry(table.n_seats, table.location)
+            boxes.append((table_bbox, (table.number, None)))
+            boxes.extend((bbox, (table.number, seat)) for seat, bbox in enumerate(seat_bboxes))
+        rnd = random.Random(3)
+        width = max(bbox[2] for bbox, _ in boxes)
+        height = max(bbox[3] for bbox, _ in boxes)
+        for _ in range(2000):
+            x, y = rnd.uniform(0, width), rnd.uniform(0, height)
+            expected = [value for (x0, y0, x1, y1), value in boxes if x0 <= x <= x1 and y0 <= y <= y1]
+            self.assertEqual(expected[-1] if expected else None, index.find(x, y))
+
+    def test_floor_clicks_resolve_without_item_bindings(self):
+        restaurant = Restaurant()
+        view = benchmarks.offscreen_server_view(restaurant)
+        ops_before = view.canvas.ops
+        view.create_restaurant_ui()
+        self.assertEqual(len(view.canvas.items) + 1, view.canvas.ops - ops_before)  # one delete, no tag_binds
+        table_bbox, seat_bboxes = table_geometry(restaurant.tables[2].n_seats, restaurant.tables[2].location,
+                                                 RESTAURANT_SCALE)
+        x0, y0, x1, y1 = seat_bboxes[3]
+        self.assertEqual((2, 3), view.floor_at((x0 + x1) / 2, (y0 + y1) / 2))
+        x0, y0, x1, y1 = table_bbox
+        self.assertEqual((2, None), view.floor_at((x0 + x1) / 2, (y0 + y1) / 2))
+        index = view.floor
+        view.floor_at(0, 0)
+        self.assertIs(index, view.floor)
+        restaurant.reconfigure(TABLES[:2], MENU_ITEMS)
+        self.assertIsNone(view.floor_at((x0 + x1) / 2, (y0 + y1) / 2))
+
+
+class FloorViewportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.restaurant = Restaurant(benchmarks.synthetic_floor(300, 12))
+        self.view = benchmarks.offscreen_server_view(self.restaurant)
+        self.viewport = self.view.viewport
+
+    def drawn_tables(self):
+        return set(self.view.retained['tables'])
+
+    def visible_tables(self):
+        x0, y0, x1, y1 = self.viewport.world_bounds()
+        visible = set()
+        for table in self.restaurant.tables:
+            table_bbox, seat_bboxes = table_geometry(table.n_seats, table.location)
+            if any(bx0 <= x1 and x0 <= bx1 and by0 <= y1 and y0 <= by1
+                   for bx0, by0, bx1, by1 in [table_bbox] + seat_bboxes):
+                visible.add(table.number)
+        return visible
+
+    def test_zoom_keeps_point_under_cursor(self):
+        viewport = Viewport(400, 300, scale=1, origin=(50, 80))
+        before = viewport.to_world(100, 60)
+        self.assertTrue(viewport.zoom(2, 100, 60))
+        self.assertEqual(before, viewport.to_world(100, 60))
+        self.assertEqual(2, viewport.scale)
+        viewport.zoom(1000, 0, 0)
+        self.assertEqual(FLOOR_MAX_SCALE, viewport.scale)
+        self.assertFalse(viewport.zoom(2, 0, 0))
+
+    def test_draws_only_visible_tables(self):
+        self.view.create_restaurant_ui()
+        self.assertEqual(self.visible_tables(), self.drawn_tables())
+        self.assertLess(len(self.drawn_tables()), 20)
+        self.assertEqual(sum(1 + self.restaurant.tables[n].n_seats for n in self.drawn_tables()),
+                         len(self.view.canvas.items))
+
+    def test_pan_moves_and_culls_without_rebuilding(self):
+        self.view.create_restaurant_ui()
+        self.viewport.pan(-300, -200)
+        ops_before = self.view.canvas.ops
+        self.view.create_restaurant_ui()
+        self.assertEqual(self.visible_tables(), self.drawn_tables())
+        self.assertLess(self.view.canvas.ops - ops_before, len(self.view.canvas.items))
+        x, y = self.restaurant.tables[max(self.drawn_tables())].location
+        self.assertEqual((max(self.drawn_tables()), None),
+                         self.view.floor_at((x + 70 - self.viewport.origin[0]) * self.viewport.scale,
+                                            (y + 10 - self.viewport.origin[1]) * self.viewport.scale))
+
+    def test_zoomed_out_floor_shows_occupied_tables_without_seats(self):
+        self.viewport.zoom(0.01, 0, 0)
+        self.view.create_restaurant_ui()
+        self.assertFalse(self.viewport.shows_seats())
+        self.assertEqual(len(self.drawn_tables()), len(self.view.canvas.items))
+        self.assertGreater(len(self.drawn_tables()), 100)
+        table = self.restaurant.tables[5]
+        table.order_for(0).add_item(self.restaurant.menu_items[0])
+        ops_before = self.view.canvas.ops
+        self.view.create_restaurant_ui()
+        self.assertEqual(1, self.view.canvas.ops - ops_before)
+        table_id = self.view.retained['tables'][5][0]
+        self.assertEqual(FULL_SEAT_STYLE['fill'], self.view.canvas.itemcget(table_id, 'fill'))
+
+    def test_press_on_another_screen_does_not_touch_the_floor(self):
+        touched = []
+        self.view.controller = types.SimpleNamespace(table_touched=touched.append)
+        x, y = self.restaurant.tables[0].location
+        event = types.SimpleNamespace(x=x + 70, y=y + 10)
+        self.view.create_table_ui(self.restaurant.tables[0])
+        self.view.floor_pressed(event)
+        self.view.create_restaurant_ui()
+        self.view.floor_touched(event)
+        self.assertEqual([], touched)
+        self.view.floor_pressed(event)
+        self.assertIsNotNone(self.view.press)
+        self.view.create_table_ui(self.restaurant.tables[0])
+        self.assertIsNone(self.view.press)
+
+    def test_old_screen_ignores_touches_until_redrawn(self):
+        bindings = {}
+
+        class BindingCanvas(benchmarks.RecordingCanvas):
+            def tag_bind(self, item_id, sequence, func, add=None):
+                bindings[self.items[item_id][2].get('text')] = func
+
+        view = benchmarks.offscreen_server_view(self.restaurant, BindingCanvas())
+        view.scheduler = types.SimpleNamespace(request=lambda: None)
+        order = self.restaurant.tables[0].order_for(0)
+        order.add_item(self.restaurant.menu_items[0])
+        order.place_new_orders()
+        view.set_controller(BillsController(view, self.restaurant, self.restaurant.tables[0]))
+        view.controller.create_ui()
+        bindings['Done'](None)
+        bindings['Print Bill'](None)
+        self.assertIsInstance(view.controller, RestaurantController)
+        self.assertEqual([], view.printer_window.lines)
+        view.controller.create_ui()
+        self.assertFalse(view.screen_stale)
+
+
+class BenchmarkTestCase(unittest.TestCase):
+
+    def test_compare_flags_only_regressions_beyond_threshold(self):
+        baseline = {'a': {'median_s': 1.0}, 'b': {'median_s': 1.0}, 'c': {'median_s': 1.0}}
+        results = {'a': {'median_s': 1.1}, 'b': {'median_s': 1.5}, 'd': {'median_s': 9.0}}
+        self.assertEqual([('b', 1.0, 1.5, 1.5)], benchmarks.compare(baseline, results, 0.2))
+
+    def test_offscreen_order_screen_is_updated_in_place(self):
+        restaurant = Restaurant(benchmarks.synthetic_floor(50, 6))
+        view = benchmarks.offscreen_server_view(restaurant)
+        order = restaurant.tables[49].order_for(5)
+        view.create_order_ui(order)
+        drawn = len(view.canvas.items)
+        order.add_item(restaurant.menu_items[0])
+        view.create_order_ui(order)
+        self.assertEqual(drawn + 4, len(view.canvas.items))
+
+    def test_metrics_benchmark_leaves_no_wrappers(self):
+        screen = HeadlessView.create_order_ui
+        results = benchmarks.bench_metrics()
+        self.assertEqual(3, len(results))
+        self.assertIs(screen, HeadlessView.create_order_ui)
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def instrumented(self, metrics):
+        instrument_all(metrics, HeadlessView)
+        self.addCleanup(metrics.restore)
+        restaurant = Restaurant()
+        view = HeadlessView(restaurant)
+        view.controller.table_touched(2)
+        view.controller.seat_touched(1)
+        return restaurant, view
+
+    def test_histogram_buckets_durations(self):
+        histogram = Histogram()
+        for us in [1] * 98 + [100, 5000]:
+            histogram.add(us / 1e6)
+        self.assertEqual(100, histogram.count)
+        self.assertEqual(2e-6, histogram.percentile(0.5))
+        self.assertEqual(128e-6, histogram.percentile(0.99))
+        self.assertEqual(5e-3, histogram.percentile(1))
+
+    def test_times_controllers_and_screens(self):
+        metrics = Metrics()
+        restaurant, view = self.instrumented(metrics)
+        view.controller.add_item(restaurant.menu_items[0])
+        view.controller.add_item(restaurant.menu_items[1])
+        histograms = metrics.histograms
+        self.assertEqual(2, histograms['OrderController.add_item'].count)
+        self.assertEqual(3, histograms['HeadlessView.create_order_ui'].count)
+        self.assertEqual(1, histograms['RestaurantController.table_touched'].count)
+        out = io.StringIO()
+        metrics.report(out)
+        self.assertIn('OrderController.add_item', out.getvalue())
+
+    def test_times_the_printer_tape(self):
+        class Tape:
+            def print(self, text):
+                pass
+
+            def poll(self):
+                self.write_tape('text')
+
+            def write_tape(self, text):
+                pass
+
+        metrics = Metrics()
+        instrument_all(metrics, HeadlessView, Tape)
+        self.addCleanup(metrics.restore)
+        Tape().poll()
+        self.assertEqual(1, metrics.histograms['Tape.write_tape'].count)
+        self.assertNotIn('Tape.print', metrics.histograms)
+
+    def test_restore_puts_original_methods_back(self):
+        before = {name: vars(OrderController).get(name) for name in ('add_item', 'undo')}
+        screen = HeadlessView.create_order_ui
+        metrics = Metrics()
+        instrument_all(metrics, HeadlessView)
+        self.assertIsNot(screen, HeadlessView.create_order_ui)
+        metrics.restore()
+        self.assertIs(screen, HeadlessView.create_order_ui)
+        self.assertEqual(before, {name: vars(OrderController).get(name) for name in ('add_item', 'undo')})
+
+    def test_slow_calls_are_profiled(self):
+        metrics = Metrics(slow_s=0, profile_dir=self.directory)
+        self.instrumented(metrics)
+        # only the outermost calls: the first screen, then the two taps
+        self.assertEqual(['RestaurantController.create_ui', 'RestaurantController.table_touched',
+                          'TableController.seat_touched'],
+                         [os.path.basename(path).split('-', 2)[2][:-len('.prof')] for path in metrics.slow_profiles])
+        stats = pstats.Stats(metrics.slow_profiles[2])
+        self.assertTrue(any(function == 'create_order_ui' for _, _, function in stats.stats))
+
+    def test_fast_calls_are_not_profiled(self):
+        metrics = Metrics(slow_s=3600, profile_dir=self.directory)
+        self.instrumented(metrics)
+        self.assertEqual([], metrics.slow_profiles)
+        self.assertEqual([], os.listdir(self.directory))
+        self.assertEqual(1, metrics.histograms['TableController.seat_touched'].count)
+
+    def test_profile_on_demand(self):
+        metrics = Metrics(profile_dir=self.directory)
+        restaurant, view = self.instrumented(metrics)
+        self.assertIsNone(metrics.toggle_profile())
+        view.controller.add_item(restaurant.menu_items[0])
+        path = metrics.toggle_profile()
+        stats = pstats.Stats(path)
+        self.assertTrue(any(function == 'add_item' for _, _, function in stats.stats))
+
+
+class RestaurantServiceTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = RestaurantServer()
+        self.listener = await self.server.start()
+        port = self.listener.sockets[0].getsockname()[1]
+        self.terminals = [RestaurantClient() for _ in range(3)]
+        for terminal in self.terminals:
+            await terminal.connect(port=port)
+
+    async def asyncTearDown(self):
+        for terminal in self.terminals:
+            await terminal.close()
+        self.listener.close()
+        await self.listener.wait_closed()
+
+    async def test_changes_reach_every_replica(self):
+        first, second, third = self.terminals
+        await first.request('add', 2, seat=1, menu='Butter Chicken Tacos')
+        await second.request('add', 2, seat=1, menu='Roasted Squash')
+        await first.request('place', 2, seat=1)
+        await third.sync()
+        order = third.restaurant.tables[2].order_for(1)
+        self.assertEqual(['Butter Chicken Tacos', 'Roasted Squash'], [item.details.name for item in order.items])
+        self.assertTrue(third.restaurant.tables[2].has_any_active_orders())
+        self.assertEqual(self.server.versions, third.versions)
+
+    async def test_stale_positional_request_is_refused(self):
+        first, second = self.terminals[:2]
+        await first.request('add', 0, seat=0, menu=MENU_ITEMS[0][0])
+        await second.sync()
+        stale = second.versions[0]
+        await first.request('add', 0, seat=0, menu=MENU_ITEMS[1][0])
+        with self.assertRaises(VersionConflict):
+            await second.request('remove', 0, seat=0, index=0, version=stale)
+        self.assertEqual(2, len(self.server.restaurant.tables[0].order_for(0).items))
+
+    async def test_malformed_requests_get_an_error_reply(self):
+        port = self.listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        self.addAsyncCleanup(writer.wait_closed)
+        self.addCleanup(writer.close)
+        await reader.readline()  # hello
+        requests = [b'{not json', b'[1, 2]', b'{"id": 1, "op": "add", "seat": 0, "menu": "Tea"}',
+                    b'{"id": 2, "op": "place", "table": 99, "seat": 0}',
+                    b'{"id": 3, "op": "add", "table": 0, "seat": -1, "menu": "Tea"}',
+                    b'{"id": 4, "op": "add", "table": 0, "seat": 0, "menu": -1}',
+                    b'{"id": 5, "op": "remove", "table": 0, "seat": 0, "index": -1}',
+                    b'{"id": 6, "op": ["add"], "table": 0, "seat": 0}',
+                    b'{"id": 7, "op": "place", "table": 0, "seat": 0, "version": "0"}',
+                    b'{"id": 8, "op": "ping"}']
+        for request in requests:
+            writer.write(request + b'\n')
+        responses = [json.loads(await reader.readline()) for _ in requests]
+        self.assertEqual([False] * 9 + [True], [response['ok'] for response in responses])
+        self.assertEqual([None, None, 1, 2, 3, 4, 5, 6, 7, 8], [response['id'] for response in responses])
+        self.assertIn("'table'", responses[2]['error'])
+        self.assertIn('nothing to choose from', responses[6]['error'])
+        self.assertIn('Unknown operation', responses[7]['error'])
+        self.assertIn("'version'", responses[8]['error'])
+        self.assertEqual(0, sum(len(order.items) for order in self.server.restaurant.tables[0].orders))
+
+    async def test_simulated_terminals_stay_consistent(self):
+        await asyncio.gather(*(simulate_terminal(terminal, 50, random.Random(ix))
+                               for ix, terminal in enumerate(self.terminals)))
+        expected = self.server.hello()['state']
+        for terminal in self.terminals:
+            await terminal.sync()
+            self.assertEqual(expected, encode_state(terminal.restaurant))
+
+
+class ReprintTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.history = BillHistory(os.path.join(self.directory, 'history.sqlite'))
+        self.addCleanup(self.history.close)
+        restaurant = Restaurant()
+        for ix in range(30):
+            table = restaurant.tables[ix % len(restaurant.tables)]
+            order = table.order_for(0)
+            order.add_item(restaurant.menu_items[ix % 12])
+            order.add_item(restaurant.menu_items[ix % 12])
+            self.history.record_bills(table.number, [Bill(order)], datetime(2026, 10, 1 + ix % 2, 18, ix))
+            table.clear_table()
+
+    def read_archive(self, directory):
+        archive = {}
+        for name in sorted(os.listdir(directory)):
+            with gzip.open(os.path.join(directory, name), 'rt', encoding='utf-8') as f:
+                archive[name] = f.read()
+        return archive
+
+    def test_parallel_and_serial_archives_match(self):
+        serial, parallel = os.path.join(self.directory, 'serial'), os.path.join(self.directory, 'parallel')
+        progress = []
+        self.assertEqual(30, reprint(self.history, '2026-10-01', '2026-10-31', serial, workers=0,
+                                     progress=lambda done, total: progress.append(done)))
+        reprint(self.history, '2026-10-01', '2026-10-31', parallel, workers=2)
+        archive = self.read_archive(serial)
+        self.assertEqual(['receipts-2026-10-01.txt.gz', 'receipts-2026-10-02.txt.gz'], list(archive))
+        self.assertEqual(archive, self.read_archive(parallel))
+        self.assertEqual(15, archive['receipts-2026-10-01.txt.gz'].count('Méthode de paiement'))
+        self.assertIn('2     House burger                32.00$', archive['receipts-2026-10-01.txt.gz'])
+        self.assertEqual(30, progress[-1])
+
+    def test_bills_without_lines_are_not_counted(self):
+        self.history.record_bills(5, [Bill(None)], datetime(2026, 10, 1, 23, 0))
+        progress = []
+        self.assertEqual(30, reprint(self.history, '2026-10-01', '2026-10-31', self.directory, workers=0,
+                                     progress=lambda done, total: progress.append((done, total))))
+        self.assertEqual((30, 30), progress[-1])
+
+    def test_compare_serial_keeps_the_parallel_archive(self):
+        out = os.path.join(self.directory, 'archive')
+        path = os.path.join(self.directory, 'history.sqlite')
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            reprint_main([path, '2026-10-01', '2026-10-31', '--out', out, '--workers', '1', '--compare-serial'])
+        self.assertEqual(['receipts-2026-10-01.txt.gz', 'receipts-2026-10-02.txt.gz'], sorted(os.listdir(out)))
+
+    def test_chunks_are_read_as_workers_need_them(self):
+        class InlineExecutor:
+            def submit(self, function, *args):
+                future = concurrent.futures.Future()
+                future.set_result(function(*args))
+                return future
+
+        read = []
+
+        def chunks():
+            for ix in range(10):
+                read.append(ix)
+                yield '2026-10-01', []
+
+        in_flight = []
+        for _ in render_in_order(InlineExecutor(), chunks(), limit=3):
+            in_flight.append(len(read))
+        self.assertEqual([3, 4, 5, 6, 7, 8, 9, 10, 10, 10], in_flight)
+
+
+class StartupTestCase(unittest.TestCase):
+
+    def test_headless_modules_do_not_import_tkinter(self):
+        code = ('import sys, model, controller, headless, persistence, history, loadtest, config, reprint; '
+                'print(sorted(m for m in ("tkinter", "_tkinter", "receipts") if m in sys.modules))')
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        self.assertEqual("['receipts']", result.stdout.strip())  # reprint needs receipts; nothing needs Tk
+
+    def test_parses_import_times(self):
+        times = parse_import_times('import time: self [us] | cumulative | imported package\n'
+                                   'import time:       120 |        120 |     _tkinter\n'
+                                   'import time:      5700 |       5820 |   tkinter\n'
+                                   'unrelated line\n')
+        self.assertEqual([('_tkinter', 120, 120, 2), ('tkinter', 5700, 5820, 1)],
+                         [(t.module, t.self_us, t.cumulative_us, t.depth) for t in times])
+
+    def test_profiles_a_script(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        script = os.path.join(directory, 'app.py')
+        with open(script, 'w') as f:
+            f.write('import sys, json\nassert sys.argv[1:] == ["--exit-after-first-frame", "--x"]\n'
+                    'print("stage first_frame 0.25")\n')
+        out = io.StringIO()
+        profile_startup(script, ['--x'], out)
+        report = out.getvalue()
+        self.assertIn('json', report)
+        self.assertIn('first_frame:    250.0 ms', report)
+        self.assertIn('process to first frame', report)
+
+
+class ServerViewRedrawTestCase(unittest.TestCase):
+
+    def setUp(self):
+        import tkinter as tk
+        try:
+            self.root = tk.Tk()
+        except tk.TclError:
+            self.skipTest('no display available')
+        from oorms import ServerView, Printer
+        self.restaurant = Restaurant()
+        self.view = ServerView(self.root, self.restaurant, Printer(tk.Toplevel(self.root)))
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def test_unchanged_screen_costs_no_canvas_operations(self):
+        self.view.update()
+        self.view.scheduler.flush()
+        self.assertEqual(0, self.view.last_update_ops)
+
+    def test_adding_item_only_draws_new_order_line(self):
+        self.view.controller.table_touched(2)
+        self.view.controller.seat_touched(4)
+        self.view.scheduler.flush()
+        full_rebuild_ops = self.view.last_update_ops
+        self.view.controller.add_item(self.restaurant.menu_items[0])
+        self.view.scheduler.flush()
+        self.assertLess(self.view.last_update_ops, full_rebuild_ops / 4)
+        self.assertEqual(1, len(self.view.retained['lines']))